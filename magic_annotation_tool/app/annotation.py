@@ -2,23 +2,138 @@
 import panel as pn
 import param
 import openslide
+import numpy as np
 from panel.reactive import ReactiveHTML
 from PIL import Image
 import logging
 import os
-import json
-import glob
+import bisect
 import time
 from datetime import datetime
+from enum import IntEnum
 from dotenv import load_dotenv
-from redis_cache import cache
 from utility import *
 from leaflet_viewer import SVSLeafletViewer
 
 
 # Get port configuration from environment variables
 DZI_SERVER_PORT = os.getenv('DZI_SERVER_PORT', '10566')
-cache_key = "annotation_tool_cache_v1"
+
+# Live tracking polls the viewer every AUTO_SAVE_PERIOD_MS, backing off by doubling
+# (up to AUTO_SAVE_MAX_BACKOFF times) after every AUTO_SAVE_IDLE_TICKS unchanged polls
+AUTO_SAVE_PERIOD_MS = 1000
+AUTO_SAVE_IDLE_TICKS = 3
+AUTO_SAVE_MAX_BACKOFF = 3
+
+# Live tracking keeps the newest LIVE_TRACKING_MAX_FILES states, pruned once
+# LIVE_TRACKING_CLEANUP_INTERVAL files over the cap
+LIVE_TRACKING_MAX_FILES = 1000
+LIVE_TRACKING_CLEANUP_INTERVAL = 50
+
+# Minimum seconds between two dispatches of the same keyboard shortcut; presses
+# inside the window (mostly key repeat) are dropped. Disk-heavy actions get longer windows.
+SHORTCUT_DEBOUNCE_WINDOWS = {
+    'undo': 0.08,
+    'redo': 0.08,
+    'next': 0.25,
+    'prev': 0.25,
+    'save': 0.3,
+    'done': 0.3,
+    'next_image': 0.4,
+    'prev_image': 0.4,
+    'recenter': 0.15,
+    'toggle_minimap': 0.2,
+}
+
+# Bits of SVSAnnotationTool._status_bits
+STATUS_DONE = 1
+STATUS_INK_FOUND = 2
+
+# Done/ink toggles within this many ms are written to the ink status store once
+INK_STATUS_SAVE_DELAY_MS = 250
+
+# Polylines with more vertices than this are rounded with NumPy in one vectorized pass
+NUMPY_COORDS_THRESHOLD = 32
+
+
+class NavState(IntEnum):
+    """Progress of loading a stored state (undo/redo, saved views) into the viewer"""
+    IDLE = 0     # Nothing being loaded; live tracking runs normally
+    LOADING = 1  # A state is being read; further navigation is dropped
+    LOADED = 2   # Sent to the viewer; live tracking waits for it to render
+    ERROR = 3    # The last load failed; behaves like IDLE
+
+
+def _rounded_coords_key(coords):
+    """Hashable key for a coordinate list, rounded to 0.001"""
+    if len(coords) > NUMPY_COORDS_THRESHOLD:
+        return np.round(np.asarray(coords, dtype=np.float64), 3).tobytes()
+    # NumPy's setup cost outweighs the loop for short lists
+    return tuple((round(x, 3), round(y, 3)) for x, y in coords)
+
+
+# Stylesheet shared by the dashboard buttons; each button sets the variables
+# through button_css_vars instead of carrying its own copy of the rules
+BUTTON_CSS = """
+:host(.solid) .bk-btn {
+    background-color: var(--btn-bg, #6c757d) !important;
+    color: var(--btn-color, #ffffff) !important;
+    border: 3px solid #ffffff !important;
+    font-weight: bold !important;
+    font-size: var(--btn-font-size, 13px) !important;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
+    position: relative;
+}
+:host(.solid) .bk-btn:hover {
+    background-color: var(--btn-hover-bg, var(--btn-bg, #6c757d)) !important;
+    box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
+}
+/* One tooltip rule for every button; the text comes from --btn-tip */
+:host(.solid) .bk-btn::after {
+    content: var(--btn-tip, '');
+    position: absolute;
+    top: 100%;
+    left: 50%;
+    transform: translateX(-50%);
+    margin-top: 8px;
+    padding: 6px 10px;
+    background-color: #000000;
+    color: #ffffff;
+    font-size: 11px;
+    font-weight: normal;
+    white-space: nowrap;
+    border-radius: 4px;
+    opacity: 0;
+    pointer-events: none;
+    transition: opacity 0.3s;
+    z-index: 10000;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.5);
+}
+:host(.solid) .bk-btn:hover::after {
+    opacity: 1;
+}
+"""
+
+
+# Settings modal mount points, part of every dashboard's initial main area
+MODAL_PLACEHOLDER_HTML = """
+<div id="settings-backdrop"></div>
+<div id="settings-modal-wrapper-container"></div>
+"""
+
+
+def button_css_vars(background, hover, tooltip, color='#ffffff', font_size='13px', padding=None):
+    """Inline styles setting the BUTTON_CSS variables for one button"""
+    styles = {
+        '--btn-bg': background,
+        '--btn-hover-bg': hover,
+        '--btn-color': color,
+        '--btn-font-size': font_size,
+        '--btn-tip': f"'{tooltip}'",
+    }
+    if padding:
+        styles['--btn-padding'] = padding
+    return styles
 
 
 class SVSAnnotationTool:
@@ -31,9 +146,7 @@ class SVSAnnotationTool:
         self.dzi_path = dzi_path
         self.shortcut_manager = shortcut_manager
         
-        print(f"Initializing DZI Viewer")
-        print(f"Base path: {svs_path}")
-        print(f"DZI path: {dzi_path}")
+        logger.info("Initializing DZI Viewer (base path: %s, DZI path: %s)", svs_path, dzi_path)
         
         # Load metadata for this specific image
         base_name = os.path.basename(svs_path).replace('.svs', '')
@@ -43,19 +156,10 @@ class SVSAnnotationTool:
         if dzi_path:
             metadata_path = dzi_path.replace('.dzi', '_metadata.json')
         else:
-            # Find metadata file - check all possible locations
-            metadata_path = None
-            for collection in ['BRACS', 'TCGA', 'BACH']:
-                potential_path = f"/data/dzi_datasets/{collection}/{base_name}_metadata.json"
-                if os.path.exists(potential_path):
-                    metadata_path = potential_path
-                    break
-            
-            # Fallback to old location
-            if not metadata_path:
-                metadata_path = f"/data/dzi_output/{base_name}_metadata.json"
+            # Find metadata file - check all collections, then the old location
+            metadata_path = find_metadata_path(base_name)
         
-        print(f"Loading metadata from: {metadata_path}")
+        logger.info("Loading metadata from: %s", metadata_path)
         metadata = load_metadata(metadata_path)
 
         # Load scalebar metadata (mpp_x → mm_per_pixel)
@@ -68,45 +172,75 @@ class SVSAnnotationTool:
         self.objective_power = 40.0  # Default
         self.level_downsamples = [1.0, 4.0, 16.0, 32.0]  # Default
         
-        if os.path.exists(svs_metadata_path):
-            try:
-                with open(svs_metadata_path, 'r') as f:
-                    svs_metadata = json.load(f)
-                    self.objective_power = float(svs_metadata.get('objective_power', 40.0))
-                    self.level_downsamples = svs_metadata.get('level_downsamples', [1.0, 4.0, 16.0, 32.0])
-                    logger.info(f"✓ Loaded SVS metadata: {self.objective_power}× objective, {len(self.level_downsamples)} levels")
-            except Exception as e:
-                logger.warning(f"⚠ Error loading SVS metadata: {e}")
+        try:
+            with open(svs_metadata_path, 'rb') as f:
+                svs_metadata = json_loads(f.read())
+            self.objective_power = float(svs_metadata.get('objective_power', 40.0))
+            self.level_downsamples = svs_metadata.get('level_downsamples', [1.0, 4.0, 16.0, 32.0])
+            logger.info("✓ Loaded SVS metadata: %s× objective, %d levels", self.objective_power, len(self.level_downsamples))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠ Error loading SVS metadata: {e}")
         
         # Initialize annotation directories
         self.live_dir, self.saved_dir = ensure_annotation_directories(self.image_name)
         
-        # Live tracking state
-        self.live_tracking_index = get_next_live_tracking_number(self.live_dir)
+        # Live tracking state - the sorted file numbers are scanned once and then
+        # kept up to date by _save_live_tracking_state, so undo/redo never list the directory
+        self._live_numbers = get_live_tracking_numbers(self.live_dir)
+        self.live_tracking_index = self._live_numbers[-1] + 1 if self._live_numbers else 0
+        self._live_filename = f"{self.live_tracking_index:05d}.json"  # Name of the next save
+        self._live_pos = len(self._live_numbers) - 1  # Position of current_live_index in _live_numbers
         self.current_live_index = self.live_tracking_index - 1 if self.live_tracking_index > 0 else -1
         
         # Track last saved state for change detection
         self.last_saved_state = None
+        self._last_saved_digest = None  # _state_digest of last_saved_state
         self.initial_state_saved = False
+        self._idle_ticks = 0  # Consecutive polls without a view change
+        self._last_raw_state = None  # Last viewer payload that was compared, minus its timestamp
         
-        # Saved views state
-        self.saved_views = get_saved_views_list(self.saved_dir)
+        # Saved views state - listed lazily once, then appended to on each save
+        self.saved_views = []
+        self._saved_views_dirty = True
         self.current_saved_index = -1  # -1 means no saved view loaded
         self._manual_save_pending = False
         
         # Navigation state tracking - prevents duplicate saves during undo/redo
-        self._is_loading_state = False  # Flag to prevent auto-save during navigation
-        self._navigation_timestamp = 0  # Track when navigation occurred
+        self._nav_state = NavState.IDLE  # Prevents auto-save during navigation
+        self._navigation_timestamp = 0  # When the last loaded state was sent to the viewer
+        self._nav_resume_state = NavState.IDLE  # State to return to if a navigation loads nothing
+        self._self_written = None  # Last annotation_data we sent, ignored when it echoes back
+        self._last_shortcut_time = {}  # Shortcut -> time.monotonic() of its last dispatch
+        
+        # Action name -> handler, shared by keyboard shortcuts and dashboard buttons (via tags)
+        self._actions = {
+            'undo': self._undo_annotation,
+            'redo': self._redo_annotation,
+            'save': self._save_current_view,
+            'prev': self._load_prev_saved,
+            'next': self._load_next_saved,
+            'recenter': self._recenter_map,
+            'prev_image': self._load_prev_image,
+            'next_image': self._load_next_image,
+            'toggle_minimap': self._toggle_minimap,
+            'done': self._mark_done,
+            # ink_found shortcut removed - button is disabled and only updated by Done/Save
+        }
         
         # Ink status tracking (simple attributes, not Panel parameters)
-        status_data = load_ink_status(self.image_name)
-        self.done_status = status_data.get('done', False)
-        self.ink_found_status = status_data.get('ink_found', False)
+        self.reload_status()
+        self._ink_save_callback = None  # Pending debounced save_ink_status
         self.parent_app = None  # Will be set by InteractiveSVSApp
+        self.button_row_live_tracking = None  # Header rows, built by create_controls
+        self.button_row_saved_views = None
         
         # Get dimensions from metadata (no need to open SVS file)
         orig_dims = metadata.get('original_dimensions', {})
         self.dimensions = (orig_dims.get('width', 100000), orig_dims.get('height', 100000))
+        # Shared by every saved state; treat as read-only (states are serialized when saved)
+        self._image_dims_dict = {'width': int(self.dimensions[0]), 'height': int(self.dimensions[1])}
         
         # DZI levels from metadata
         dzi_levels = metadata.get('dzi_levels', 18)
@@ -124,8 +258,8 @@ class SVSAnnotationTool:
         logger.info(f"Image dimensions: {self.dimensions}")
         logger.info(f"DZI levels: {self.level_count}")
         
-        # Convert level dimensions to list format for JavaScript
-        level_dims_list = [[int(w), int(h)] for w, h in self.level_dimensions]
+        # Serialize level dimensions once for JavaScript, so Panel syncs a plain string
+        level_dims_json = json_dumps([[int(w), int(h)] for w, h in self.level_dimensions]).decode('utf-8')
         
         # Get DZI relative path for tile server
         if self.dzi_path:
@@ -135,114 +269,152 @@ class SVSAnnotationTool:
             # Fallback to just filename
             dzi_relative = os.path.basename(svs_path).replace('.svs', '.dzi')
         
-        print(f"DZI relative path for viewer: {dzi_relative}")
+        logger.info("DZI relative path for viewer: %s", dzi_relative)
         
         # Get metadata values or use defaults
         #start_level = metadata.get('recommended_start_level', 9)
         start_level = 8
         center_offset = metadata.get('center_offset_y', -1.15)
+        
+        # Initial view center used by _recenter_map (same math as the viewer's initial view)
+        scale_at_start = 2 ** (dzi_levels - 1 - start_level)
+        self._reset_center = [
+            self.dimensions[1] / scale_at_start / 2 * center_offset,
+            self.dimensions[0] / scale_at_start / 2
+        ]
+        # _recenter_map payload, serialized once and split around the timestamp (the last key)
+        reset_json = json_dumps({
+            'image_name': self.image_name,
+            'zoom': 0,  # Reset to zoom level 0
+            'center': self._reset_center,
+            'annotations': [],  # Will be populated by JavaScript
+            'timestamp': '__TIMESTAMP__'
+        }).decode('utf-8')
+        self._reset_prefix, _, self._reset_suffix = reset_json.rpartition('__TIMESTAMP__')
 
         # Get shortcuts configuration as JSON string
         shortcuts_json = ''
         if self.shortcut_manager:
-            shortcuts_json = json.dumps(self.shortcut_manager.shortcuts)
+            shortcuts_json = json_dumps(self.shortcut_manager.shortcuts).decode('utf-8')
             logger.info("Passing keyboard shortcuts config to viewer")
         
-        # Create viewer with DZI configuration using metadata
-        self.viewer = SVSLeafletViewer(
-            dzi_url=dzi_relative,
+        # Per-image viewer settings, kept so adopt_viewer can apply them to a displayed viewer.
+        # dzi_url stays last: changing it re-initializes the map with the other values in place
+        self._viewer_settings = dict(
             max_zoom=dzi_levels - 1,  # DZI has dzi_levels (0 to dzi_levels-1)
             width_px=self.dimensions[0],
             height_px=self.dimensions[1],
-            level_dimensions=level_dims_list,
+            level_dimensions_json=level_dims_json,
+            tile_format=metadata.get('tile_format', 'png'),  # Written by convert_to_dzi.py
             start_level=start_level,
             center_offset_y=center_offset,
-            dzi_server_port=DZI_SERVER_PORT,
             image_name=self.image_name,
             mm_per_pixel=self.mm_per_pixel,  # Pass to viewer
             objective_power=self.objective_power,  # Pass SVS metadata for magnification display
             level_downsamples=self.level_downsamples,  # Pass SVS downsample factors
+            dzi_url=dzi_relative,
+        )
+        
+        # Create viewer with DZI configuration using metadata
+        self.viewer = SVSLeafletViewer(
+            **self._viewer_settings,
+            dzi_server_port=DZI_SERVER_PORT,
             shortcuts_config=shortcuts_json,  # Pass keyboard shortcuts configuration
             min_height=600,
             sizing_mode='stretch_both'
         )
         
         # Watch for annotation data changes from JavaScript
-        self.viewer.param.watch(self._on_annotation_data_change, 'annotation_data')
+        self._viewer_watch_specs = []  # (handler, parameter) pairs, re-applied by adopt_viewer
+        self._viewer_watchers = []
+        self._watch_viewer(self._on_annotation_data_change, 'annotation_data')
         
-        # Set up periodic check (every 1 second) - only saves if changed AND not navigating
+        # Set up periodic check (every 1 second, slower while idle) - only saves if changed AND not navigating
         self.auto_save_callback = pn.state.add_periodic_callback(
             self._check_and_save_if_changed,
-            period=1000  # 1000 ms = 1 second
+            period=AUTO_SAVE_PERIOD_MS
         )
         
-        logger.info(f"✓ Live tracking enabled (1-second interval, saves only when view changes)")
+        logger.info(f"✓ Live tracking enabled (1-second interval backing off to 8 s when idle, saves only when view changes)")
+    
+    def _watch_viewer(self, fn, parameter_name):
+        """Watch a viewer parameter, remembering it so adopt_viewer/release can move the watcher"""
+        self._viewer_watch_specs.append((fn, parameter_name))
+        self._viewer_watchers.append(self.viewer.param.watch(fn, parameter_name))
+    
+    def adopt_viewer(self, viewer):
+        """
+        Take over an already displayed viewer instead of the one built in __init__.
+    
+        Also resumes a tool that was released earlier, so cached tools can be shown again.
+        The image settings are applied in one batched update and the watchers move along.
+        """
+        for watcher in self._viewer_watchers:
+            self.viewer.param.unwatch(watcher)
+        viewer.param.update(**self._viewer_settings)
+        self.viewer = viewer
+        self._viewer_watchers = [viewer.param.watch(fn, name) for fn, name in self._viewer_watch_specs]
+    
+        self._nav_state = NavState.IDLE
+        if not self.auto_save_callback.running:
+            self.auto_save_callback.start()
+    
+    def release(self):
+        """Stop periodic work and detach from the viewer before another tool takes it over"""
+        self.auto_save_callback.stop()
+        if self._ink_save_callback is not None:
+            self._ink_save_callback.stop()
+            self._flush_ink_status()
+        for watcher in self._viewer_watchers:
+            self.viewer.param.unwatch(watcher)
+        self._viewer_watchers = []
     
     def _check_and_save_if_changed(self):
         """Check if view has changed and save only if different from last save"""
         try:
             # CRITICAL: Skip if we're currently loading a state (undo/redo/prev/next)
-            if self._is_loading_state:
+            if self._nav_state == NavState.LOADING:
                 return
             
             # CRITICAL: Skip if navigation happened less than 2 seconds ago
             # This gives JavaScript time to load and render the state
-            time_since_navigation = time.time() - self._navigation_timestamp
-            if time_since_navigation < 2.0:  # 2 second grace period
-                return
+            if self._nav_state == NavState.LOADED:
+                time_since_navigation = time.time() - self._navigation_timestamp
+                if time_since_navigation < 2.0:  # 2 second grace period
+                    return
+                self._nav_state = NavState.IDLE
             
             # Trigger JavaScript to get current state
             self.viewer.save_annotation_trigger += 1
+            
+            # Poll less often while nothing changes: 1 s, 2 s, 4 s, then 8 s
+            period = AUTO_SAVE_PERIOD_MS << min(self._idle_ticks // AUTO_SAVE_IDLE_TICKS, AUTO_SAVE_MAX_BACKOFF)
+            if self.auto_save_callback.period != period:
+                self.auto_save_callback.period = period
         except Exception as e:
             logger.error(f"Error in change detection: {e}")
     
+    def _state_digest(self, state):
+        """Hash the parts of a view state that count as a change
+        
+        Values are rounded to the change tolerances (zoom 0.01, center 0.1,
+        coordinates 0.001), so two states compare as a single integer instead
+        of a walk over every vertex.
+        """
+        normalized = (
+            round(state.get('zoom', 0), 2),
+            tuple(round(value, 1) for value in state.get('center', [0, 0])),
+            tuple((anno.get('type'), anno.get('color'), anno.get('weight'),
+                   _rounded_coords_key(anno.get('coordinates', [])))
+                  for anno in state.get('annotations', [])),
+        )
+        return hash(normalized)
+    
     def _compare_states(self, state1, state2):
         """Compare two annotation states to detect changes"""
         if state1 is None or state2 is None:
             return True  # Consider changed if either is None
-        
-        # Compare zoom level
-        if abs(state1.get('zoom', 0) - state2.get('zoom', 0)) > 0.01:
-            return True
-        
-        # Compare center position (with small tolerance for floating point)
-        center1 = state1.get('center', [0, 0])
-        center2 = state2.get('center', [0, 0])
-        if abs(center1[0] - center2[0]) > 0.1 or abs(center1[1] - center2[1]) > 0.1:
-            return True
-        
-        # Compare annotations
-        annos1 = state1.get('annotations', [])
-        annos2 = state2.get('annotations', [])
-        
-        # Different number of annotations
-        if len(annos1) != len(annos2):
-            return True
-        
-        # Compare each annotation
-        for a1, a2 in zip(annos1, annos2):
-            # Different type
-            if a1.get('type') != a2.get('type'):
-                return True
-            
-            # Different style
-            if a1.get('color') != a2.get('color') or a1.get('weight') != a2.get('weight'):
-                return True
-            
-            # Different coordinates
-            coords1 = a1.get('coordinates', [])
-            coords2 = a2.get('coordinates', [])
-            if len(coords1) != len(coords2):
-                return True
-            
-            # For polylines, check if coordinates are different
-            # (allow small tolerance for floating point differences)
-            for c1, c2 in zip(coords1, coords2):
-                if abs(c1[0] - c2[0]) > 0.001 or abs(c1[1] - c2[1]) > 0.001:
-                    return True
-        
-        # No changes detected
-        return False
+        return self._state_digest(state1) != self._state_digest(state2)
     
     def _on_annotation_data_change(self, event):
         """Handle when annotation_data is populated from JavaScript"""
@@ -250,7 +422,21 @@ class SVSAnnotationTool:
             if not event.new or event.new == event.old:
                 return
             
-            annotation_json = json.loads(event.new)
+            # Our own writes (loads, recenter) are already accounted for by the sender
+            if event.new is self._self_written or event.new == self._self_written:
+                self._self_written = None
+                return
+            
+            # Viewer payloads end with a fresh "timestamp", so compare everything before it;
+            # an idle view then sends the same text every tick and needs no parsing
+            raw_state = event.new.rpartition('"timestamp":')[0] or event.new
+            if (raw_state == self._last_raw_state
+                    and not self._manual_save_pending and self._nav_state != NavState.LOADING):
+                self._idle_ticks += 1
+                return
+            
+            # Our own loads (undo/redo, saved views) come back through here packed
+            annotation_json = decode_annotation_payload(json_loads(event.new))
             
             # Check if this is a manual save request
             if hasattr(self, '_manual_save_pending') and self._manual_save_pending:
@@ -259,30 +445,40 @@ class SVSAnnotationTool:
             
             # CRITICAL: If we're loading a state, just update last_saved_state and return
             # This prevents the loaded state from being saved as a new file
-            if self._is_loading_state:
+            if self._nav_state == NavState.LOADING:
                 logger.info("🔄 State loaded during navigation - updating reference without saving")
                 self.last_saved_state = annotation_json
-                self._is_loading_state = False  # Clear the flag
+                self._last_saved_digest = self._state_digest(annotation_json)
+                self._last_raw_state = None
+                self._idle_ticks = 0
+                self._nav_state = NavState.LOADED
+                self._navigation_timestamp = time.time()
                 return
             
             # Live tracking logic: only save if changed
+            digest = self._state_digest(annotation_json)
             
             # First time - save initial state
             if not self.initial_state_saved:
                 logger.info("💾 Saving initial state")
                 self._save_live_tracking_state(annotation_json)
                 self.last_saved_state = annotation_json
+                self._last_saved_digest = digest
                 self.initial_state_saved = True
+                self._last_raw_state = raw_state
                 return
             
             # Compare with last saved state
-            if self._compare_states(annotation_json, self.last_saved_state):
+            if digest != self._last_saved_digest:
                 logger.info("✏️  View changed - saving new state")
                 self._save_live_tracking_state(annotation_json)
                 self.last_saved_state = annotation_json
+                self._last_saved_digest = digest
+                self._idle_ticks = 0
             else:
                 # No changes - skip saving
-                pass
+                self._idle_ticks += 1
+            self._last_raw_state = raw_state
             
         except Exception as e:
             logger.error(f"Error in annotation data change handler: {e}")
@@ -291,73 +487,86 @@ class SVSAnnotationTool:
         """Save a live tracking state to disk"""
         try:
             #annotation_json['image_name'] = self.image_name
-            annotation_json['image_dimensions'] = {
-                'width': self.dimensions[0],
-                'height': self.dimensions[1]
-            }
+            annotation_json['image_dimensions'] = self._image_dims_dict
             
-            filename = f"{self.live_tracking_index:05d}.json"
+            filename = self._live_filename
 
             filepath = os.path.join(self.live_dir, filename)
-            cached_filepath = str(cache.get(cache_key)).replace(".svs","")
-            print(f"11111: {filepath} 21111: {cached_filepath}")
-            save_annotation_json(filepath, annotation_json)
+            save_annotation_json(filepath, annotation_json, background=True)
             
             # Update current index to track the latest save
             self.current_live_index = self.live_tracking_index
+            self._live_numbers.append(self.live_tracking_index)
             
             # Increment for next save
             self.live_tracking_index += 1
+            self._live_filename = f"{self.live_tracking_index:05d}.json"
             
-            # Cleanup old files
-            cleanup_old_live_tracking(self.live_dir, max_files=1000)
+            # Cleanup old files - batched, and taken from the sorted in-memory list
+            # so no pass has to list the directory
+            excess = len(self._live_numbers) - LIVE_TRACKING_MAX_FILES
+            if excess >= LIVE_TRACKING_CLEANUP_INTERVAL:
+                remove_live_tracking_files(self.live_dir, self._live_numbers[:excess])
+                del self._live_numbers[:excess]
+            self._live_pos = len(self._live_numbers) - 1
             
             logger.info(f"✓ Live tracking saved: {filename}")
             
         except Exception as e:
             logger.error(f"Error saving live tracking state: {e}")
     
+    def _send_annotation_data(self, payload):
+        """Load a payload in the viewer; the watcher skips it when it echoes back"""
+        self._self_written = payload
+        # Data and trigger in one batch: one message to the browser, and the
+        # trigger script always sees the new data
+        self.viewer.param.update(
+            annotation_data=payload,
+            load_annotation_trigger=self.viewer.load_annotation_trigger + 1,
+        )
+    
+    def _load_state(self, annotation_json, payload=None):
+        """Load a stored state in the viewer and make it the change-detection reference"""
+        if payload is None:
+            payload = encode_annotation_payload(annotation_json)
+        self._send_annotation_data(payload)
+        self.last_saved_state = annotation_json
+        self._last_saved_digest = self._state_digest(annotation_json)
+        self._last_raw_state = None
+        self._idle_ticks = 0
+        # Loaded - nothing left for the watcher to do; live tracking waits for the render
+        self._nav_state = NavState.LOADED
+        self._navigation_timestamp = time.time()
+    
+    def _begin_navigation(self):
+        """Enter NavState.LOADING, or return False to drop this navigation while another loads"""
+        if self._nav_state == NavState.LOADING:
+            logger.info("Navigation already in progress - ignoring")
+            return False
+        self._nav_resume_state = self._nav_state
+        self._nav_state = NavState.LOADING
+        return True
+    
+    def _end_navigation(self):
+        """Leave NavState.LOADING when a navigation ended without loading anything"""
+        if self._nav_state == NavState.LOADING:
+            # e.g. already at the first/last state, or the file is gone; a
+            # previous load keeps its render grace period
+            self._nav_state = self._nav_resume_state
+    
     def _recenter_map(self, event=None):
         """Reset map to initial view (center + zoom 0)"""
         try:
             logger.info("🎯 Recentering map to initial view...")
             
-            # Get initial view parameters from metadata
-            metadata_path = f"/data/dzi_output/{self.image_name}_metadata.json"
-            metadata = load_metadata(metadata_path)
-            
-            #start_level = metadata.get('recommended_start_level', 9)
-            start_level = 8
-            center_offset_y = metadata.get('center_offset_y', -1.15)
-            
-            # Calculate center coordinates (same as initial view)
-            dzi_levels = metadata.get('dzi_levels', 18)
-            scaleAtStart = 2 ** (dzi_levels - 1 - start_level)
-            widthAtStartLevel = self.dimensions[0] / scaleAtStart
-            heightAtStartLevel = self.dimensions[1] / scaleAtStart
-            
-            centerY = heightAtStartLevel / 2
-            centerX = widthAtStartLevel / 2
-            adjustedCenterY = centerY * center_offset_y
-            
-            # Create annotation data with reset view
-            reset_data = {
-                'image_name': self.image_name,
-                'zoom': 0,  # Reset to zoom level 0
-                'center': [adjustedCenterY, centerX],
-                'annotations': [],  # Will be populated by JavaScript
-                'timestamp': datetime.now().isoformat()
-            }
-            
             # Load the reset view (JavaScript will preserve existing annotations)
-            self.viewer.annotation_data = json.dumps(reset_data)
-            self.viewer.load_annotation_trigger += 1
+            self._send_annotation_data(self._reset_prefix + datetime.now().isoformat() + self._reset_suffix)
             
             # Reset saved views counter since we're not loading from saved views
             self.current_saved_index = -1
             self._update_saved_views_counter()
             
-            logger.info(f"✓ Map recentered to: zoom=0, center=[{adjustedCenterY:.1f}, {centerX:.1f}]")
+            logger.info("✓ Map recentered to: zoom=0, center=[%.1f, %.1f]", *self._reset_center)
             
         except Exception as e:
             logger.error(f"Error recentering map: {e}")
@@ -367,48 +576,60 @@ class SVSAnnotationTool:
         try:
             logger.info("🗺️  Toggling minimap visibility...")
             
-            # Send special action to JavaScript via annotation_data
-            self.viewer.annotation_data = json.dumps({
-                'action': 'toggle_minimap',
-                'timestamp': datetime.now().isoformat()
-            })
-            
-            # Trigger the load annotation handler which will execute the toggle
-            self.viewer.load_annotation_trigger += 1
+            # Dedicated trigger, so annotation_data only ever carries view states
+            self.viewer.minimap_trigger += 1
             
             logger.info("✓ Minimap toggle triggered")
             
         except Exception as e:
             logger.error(f"Error toggling minimap: {e}")
     
+    @property
+    def done_status(self):
+        """Whether the image is marked Done"""
+        return bool(self._status_bits & STATUS_DONE)
+    
+    @done_status.setter
+    def done_status(self, value):
+        self._status_bits = (self._status_bits | STATUS_DONE) if value else (self._status_bits & ~STATUS_DONE)
+    
+    @property
+    def ink_found_status(self):
+        """Whether the image is marked as having ink"""
+        return bool(self._status_bits & STATUS_INK_FOUND)
+    
+    @ink_found_status.setter
+    def ink_found_status(self, value):
+        self._status_bits = (self._status_bits | STATUS_INK_FOUND) if value else (self._status_bits & ~STATUS_INK_FOUND)
+    
+    def reload_status(self):
+        """Read the done/ink status of this image from the ink status store"""
+        status_data = load_ink_status(self.image_name)
+        self._status_bits = ((STATUS_DONE if status_data.get('done', False) else 0)
+                             | (STATUS_INK_FOUND if status_data.get('ink_found', False) else 0))
+    
+    def _apply_status(self, status_bits):
+        """Set the done/ink status bits; save and refresh the buttons only if they changed"""
+        if status_bits == self._status_bits:
+            return False
+        self._status_bits = status_bits
+        
+        # Save shortly, so rapid toggles only write the final state
+        self._schedule_ink_status_save()
+        
+        # Update button styling now; the status title follows the save
+        if self.parent_app:
+            self.parent_app._update_status_buttons()
+        return True
+    
     def _mark_done(self, event=None):
         """Toggle Done status (Done=True sets Ink=False, Done=False sets Ink=False)"""
         try:
             logger.info("✓ Toggling done status...")
             
-            # Toggle done status
-            self.done_status = not self.done_status
-            
-            # When Done is toggled to True, set Ink Found to False (no ink)
-            # When Done is toggled to False, also set Ink Found to False (blank state)
-            if self.done_status:
-                # Done=True, Ink=False (Done with no ink)
-                self.ink_found_status = False
-            else:
-                # Done=False, Ink=False (To Do state, blank ink status)
-                self.ink_found_status = False
-            
-            # Save to JSON file
-            save_ink_status(
-                self.image_name,
-                done=self.done_status,
-                ink_found=self.ink_found_status
-            )
-            
-            # Update button styling and status title in parent app
-            if self.parent_app:
-                self.parent_app._update_status_buttons()
-                self.parent_app._update_status_title()
+            # Done=True, Ink=False (Done with no ink), or
+            # Done=False, Ink=False (To Do state, blank ink status)
+            self._apply_status(0 if self.done_status else STATUS_DONE)
             
             logger.info(f"✓ Done status: done={self.done_status}, ink_found={self.ink_found_status}")
             
@@ -416,163 +637,147 @@ class SVSAnnotationTool:
             logger.error(f"Error marking done: {e}")
     
     def _mark_ink_found(self, event=None):
-        """Mark current image as having ink found - toggles between all true and all false"""
+        """Mark current image as having ink found - toggles ink found, leaving done as is"""
         try:
             logger.info("🖊️  Toggling ink found status...")
             
-            # If ink_found is already true, set both to false
-            # Otherwise, set both to true
-            if self.ink_found_status:
-                #self.done_status = False
-                self.ink_found_status = False
-                logger.info("✓ Ink found status: OFF (both statuses set to false)")
-            else:
-                #self.done_status = True
-                self.ink_found_status = True
-                logger.info("✓ Ink found status: ON (both statuses set to true)")
+            self._apply_status(self._status_bits ^ STATUS_INK_FOUND)
+            logger.info(f"✓ Ink found status: {'ON' if self.ink_found_status else 'OFF'}")
             
-            # Save to JSON file
+        except Exception as e:
+            logger.error(f"Error marking ink found: {e}")
+    
+    def _schedule_ink_status_save(self):
+        """Save done/ink status after INK_STATUS_SAVE_DELAY_MS unless a save is already pending"""
+        if self._ink_save_callback is None:
+            self._ink_save_callback = pn.state.add_periodic_callback(
+                self._flush_ink_status,
+                period=INK_STATUS_SAVE_DELAY_MS,
+                count=1
+            )
+    
+    def _flush_ink_status(self):
+        """Write the current done/ink status and refresh the status counts"""
+        self._ink_save_callback = None
+        try:
             save_ink_status(
                 self.image_name,
                 done=self.done_status,
                 ink_found=self.ink_found_status
             )
             
-            # Update button styling and status title in parent app
+            # Counts come from the ink status store, so refresh them after the write
             if self.parent_app:
-                self.parent_app._update_status_buttons()
                 self.parent_app._update_status_title()
-            
         except Exception as e:
-            logger.error(f"Error marking ink found: {e}")
+            logger.error(f"Error saving ink status: {e}")
+    
+    def _live_position(self):
+        """Position of current_live_index in _live_numbers, or -1 if it is not there"""
+        numbers = self._live_numbers
+        pos = self._live_pos
+        # The remembered position is usually right; it goes stale only after pruning or a rescan
+        if not (0 <= pos < len(numbers) and numbers[pos] == self.current_live_index):
+            pos = bisect.bisect_left(numbers, self.current_live_index)
+            if pos == len(numbers) or numbers[pos] != self.current_live_index:
+                return -1
+            self._live_pos = pos
+        return pos
     
     def _undo_annotation(self, event=None):
         """Load previous live tracking state (undo) - go back one file"""
+        if not self._begin_navigation():
+            return
         try:
-            # Get all existing live tracking files
-            existing_files = glob.glob(os.path.join(self.live_dir, "*.json"))
-            if not existing_files:
-                logger.info("No live tracking files available")
-                return
-            
-            # Get file numbers
-            file_numbers = []
-            for f in existing_files:
-                basename = os.path.basename(f)
-                try:
-                    num = int(basename.replace('.json', ''))
-                    file_numbers.append(num)
-                except ValueError:
-                    continue
-            
+            file_numbers = self._live_numbers
+            if not file_numbers:
+                # Nothing saved by this tool yet - rescan in case the directory has files
+                file_numbers = self._live_numbers = get_live_tracking_numbers(self.live_dir)
             if not file_numbers:
-                logger.info("No valid live tracking files")
+                logger.info("No live tracking files available")
                 return
             
-            file_numbers.sort()
-            
             # If current_live_index is -1 or not in list, start from the latest
-            if self.current_live_index == -1 or self.current_live_index not in file_numbers:
-                self.current_live_index = file_numbers[-1]
-            
-            # Find current position and go back one
-            try:
-                current_pos = file_numbers.index(self.current_live_index)
-                if current_pos > 0:
-                    # CRITICAL: Set navigation flags BEFORE loading
-                    self._is_loading_state = True
-                    self._navigation_timestamp = time.time()
+            current_pos = self._live_position()
+            if current_pos < 0:
+                current_pos = len(file_numbers) - 1
+                self.current_live_index = file_numbers[current_pos]
+            
+            # Go back one from the current position
+            if current_pos > 0:
+                # Go to previous file (it may still be queued for writing)
+                flush_annotation_writes()
+                prev_index = file_numbers[current_pos - 1]
+                filename = f"{prev_index:05d}.json"
+                filepath = os.path.join(self.live_dir, filename)
+                
+                raw, annotation_json = load_annotation_raw_and_json(filepath)
+                if annotation_json:
+                    # Load the state into viewer
+                    self._load_state(annotation_json, encode_annotation_payload(annotation_json, raw))
+                    self.current_live_index = prev_index
+                    self._live_pos = current_pos - 1
                     
-                    # Go to previous file
-                    prev_index = file_numbers[current_pos - 1]
-                    filename = f"{prev_index:05d}.json"
-                    filepath = os.path.join(self.live_dir, filename)
+                    # Reset saved views counter since we're loading from live tracking
+                    self.current_saved_index = -1
+                    self._update_saved_views_counter()
                     
-                    annotation_json = load_annotation_json(filepath)
-                    if annotation_json:
-                        # Load the state into viewer
-                        self.viewer.annotation_data = json.dumps(annotation_json)
-                        self.viewer.load_annotation_trigger += 1
-                        self.current_live_index = prev_index
-                        
-                        # Update last saved state reference (will also be updated in _on_annotation_data_change)
-                        self.last_saved_state = annotation_json
-                        
-                        # Reset saved views counter since we're loading from live tracking
-                        self.current_saved_index = -1
-                        self._update_saved_views_counter()
-                        
-                        logger.info(f"⟲ Undo: Loaded {filename} (state {current_pos}/{len(file_numbers)-1})")
-                else:
-                    logger.info("Already at the first live tracking state")
-            except ValueError:
-                logger.info("Current index not found in file list")
+                    logger.info(f"⟲ Undo: Loaded {filename} (state {current_pos}/{len(file_numbers)-1})")
+            else:
+                logger.info("Already at the first live tracking state")
             
         except Exception as e:
             logger.error(f"Error in undo: {e}")
-            self._is_loading_state = False  # Clear flag on error
+            self._nav_state = NavState.ERROR
+        finally:
+            self._end_navigation()
     
     def _redo_annotation(self, event=None):
         """Load next live tracking state (redo) - go forward one file"""
+        if not self._begin_navigation():
+            return
         try:
-            # Get all existing live tracking files
-            existing_files = glob.glob(os.path.join(self.live_dir, "*.json"))
-            if not existing_files:
+            file_numbers = self._live_numbers
+            if not file_numbers:
+                # Nothing saved by this tool yet - rescan in case the directory has files
+                file_numbers = self._live_numbers = get_live_tracking_numbers(self.live_dir)
+            if not file_numbers:
                 logger.info("No live tracking files available for redo")
                 return
             
-            # Get file numbers
-            file_numbers = []
-            for f in existing_files:
-                basename = os.path.basename(f)
-                try:
-                    num = int(basename.replace('.json', ''))
-                    file_numbers.append(num)
-                except ValueError:
-                    continue
-            
-            if not file_numbers:
-                logger.info("No valid live tracking files")
+            # Find current position and go forward one
+            current_pos = self._live_position()
+            if current_pos < 0:
+                logger.info("Current index not found in file list")
                 return
             
-            file_numbers.sort()
-            
-            # Find current position and go forward one
-            try:
-                current_pos = file_numbers.index(self.current_live_index)
-                if current_pos < len(file_numbers) - 1:
-                    # CRITICAL: Set navigation flags BEFORE loading
-                    self._is_loading_state = True
-                    self._navigation_timestamp = time.time()
+            if current_pos < len(file_numbers) - 1:
+                # Go to next file (it may still be queued for writing)
+                flush_annotation_writes()
+                next_index = file_numbers[current_pos + 1]
+                filename = f"{next_index:05d}.json"
+                filepath = os.path.join(self.live_dir, filename)
+                
+                raw, annotation_json = load_annotation_raw_and_json(filepath)
+                if annotation_json:
+                    # Load the state into viewer
+                    self._load_state(annotation_json, encode_annotation_payload(annotation_json, raw))
+                    self.current_live_index = next_index
+                    self._live_pos = current_pos + 1
                     
-                    # Go to next file
-                    next_index = file_numbers[current_pos + 1]
-                    filename = f"{next_index:05d}.json"
-                    filepath = os.path.join(self.live_dir, filename)
+                    # Reset saved views counter since we're loading from live tracking
+                    self.current_saved_index = -1
+                    self._update_saved_views_counter()
                     
-                    annotation_json = load_annotation_json(filepath)
-                    if annotation_json:
-                        # Load the state into viewer
-                        self.viewer.annotation_data = json.dumps(annotation_json)
-                        self.viewer.load_annotation_trigger += 1
-                        self.current_live_index = next_index
-                        
-                        # Update last saved state reference
-                        self.last_saved_state = annotation_json
-                        
-                        # Reset saved views counter since we're loading from live tracking
-                        self.current_saved_index = -1
-                        self._update_saved_views_counter()
-                        
-                        logger.info(f"⟳ Redo: Loaded {filename} (state {current_pos+2}/{len(file_numbers)})")
-                else:
-                    logger.info("Already at the latest live tracking state")
-            except ValueError:
-                logger.info("Current index not found in file list")
+                    logger.info(f"⟳ Redo: Loaded {filename} (state {current_pos+2}/{len(file_numbers)})")
+            else:
+                logger.info("Already at the latest live tracking state")
             
         except Exception as e:
             logger.error(f"Error in redo: {e}")
-            self._is_loading_state = False  # Clear flag on error
+            self._nav_state = NavState.ERROR
+        finally:
+            self._end_navigation()
     
     def _save_current_view(self, event=None):
         """Save current view to saved_views"""
@@ -581,20 +786,7 @@ class SVSAnnotationTool:
             self._manual_save_pending = True
             
             # When saving, mark both done=True and ink_found=True
-            self.done_status = True
-            self.ink_found_status = True
-            
-            # Save ink status
-            save_ink_status(
-                self.image_name,
-                done=self.done_status,
-                ink_found=self.ink_found_status
-            )
-            
-            # Update button styling in parent app
-            if self.parent_app:
-                self.parent_app._update_status_buttons()
-                self.parent_app._update_status_title()
+            self._apply_status(STATUS_DONE | STATUS_INK_FOUND)
             
             logger.info(f"✓ Save: Set done=True, ink_found=True")
             
@@ -612,22 +804,24 @@ class SVSAnnotationTool:
         try:
             # Add image metadata
             annotation_json['image_name'] = self.image_name
-            annotation_json['image_dimensions'] = {
-                'width': self.dimensions[0],
-                'height': self.dimensions[1]
-            }
+            annotation_json['image_dimensions'] = self._image_dims_dict
             annotation_json['saved_at'] = datetime.now().isoformat()
             
-            # Get next saved view number
-            saved_views = get_saved_views_list(self.saved_dir)
+            # Get next saved view number from a fresh listing: saved_dir is shared by every
+            # session on this image, so the cached list may miss other sessions' saves
+            saved_views = self.saved_views = get_saved_views_list(self.saved_dir)
+            self._saved_views_dirty = False
             next_num = saved_views[-1][0] + 1 if saved_views else 0
             
-            filename = f"{next_num:05d}.json"
-            filepath = os.path.join(self.saved_dir, filename)
-            save_annotation_json(filepath, annotation_json)
+            # Another session may still take next_num first; the save then moves up to a free number
+            saved_num, filepath = save_numbered_annotation_json(self.saved_dir, next_num, annotation_json)
+            filename = os.path.basename(filepath)
             
-            # Update saved views list
-            self.saved_views = get_saved_views_list(self.saved_dir)
+            if saved_num == next_num:
+                # The new file is the highest number, so the sorted list just grows by one
+                saved_views.append((saved_num, filepath))
+            else:
+                self._saved_views_dirty = True
             #self.current_saved_index = len(self.saved_views) - 1
             
             logger.info(f"✓ Saved view {filename}")
@@ -641,11 +835,20 @@ class SVSAnnotationTool:
             logger.error(f"Error completing manual save: {e}")
             self._manual_save_pending = False
     
+    def _get_saved_views(self):
+        """Return the saved views list for navigation and the counter, reading saved_dir on first use only
+        
+        Saving does not use it to pick a number; see _complete_manual_save.
+        """
+        if self._saved_views_dirty:
+            self.saved_views = get_saved_views_list(self.saved_dir)
+            self._saved_views_dirty = False
+        return self.saved_views
+    
     def _update_saved_views_counter(self):
         """Update saved views counter display"""
         try:
-            self.saved_views = get_saved_views_list(self.saved_dir)
-            total_views = len(self.saved_views)
+            total_views = len(self._get_saved_views())
             # current_saved_index is 0-based, display as 1-based (or 0 if no view loaded)
             current_num = self.current_saved_index + 1 if self.current_saved_index >= 0 else 0
             
@@ -658,8 +861,10 @@ class SVSAnnotationTool:
     
     def _load_prev_saved(self, event=None):
         """Load previous saved view"""
+        if not self._begin_navigation():
+            return
         try:
-            self.saved_views = get_saved_views_list(self.saved_dir)
+            self._get_saved_views()
             
             if not self.saved_views:
                 logger.info("No saved views available")
@@ -675,29 +880,27 @@ class SVSAnnotationTool:
                 self._update_saved_views_counter()
                 return
             
-            # CRITICAL: Set navigation flags BEFORE loading
-            self._is_loading_state = True
-            self._navigation_timestamp = time.time()
-            
             # Load the view
             _, filepath = self.saved_views[self.current_saved_index]
-            annotation_json = load_annotation_json(filepath)
+            annotation_json, payload = load_saved_view(filepath)
             
             if annotation_json:
-                self.viewer.annotation_data = json.dumps(annotation_json)
-                self.viewer.load_annotation_trigger += 1
-                self.last_saved_state = annotation_json
+                self._load_state(annotation_json, payload)
                 logger.info(f"◀ Loaded previous saved view: {os.path.basename(filepath)}")
                 self._update_saved_views_counter()
             
         except Exception as e:
             logger.error(f"Error loading previous saved view: {e}")
-            self._is_loading_state = False  # Clear flag on error
+            self._nav_state = NavState.ERROR
+        finally:
+            self._end_navigation()
     
     def _load_next_saved(self, event=None):
         """Load next saved view"""
+        if not self._begin_navigation():
+            return
         try:
-            self.saved_views = get_saved_views_list(self.saved_dir)
+            self._get_saved_views()
             
             if not self.saved_views:
                 logger.info("No saved views available")
@@ -713,24 +916,51 @@ class SVSAnnotationTool:
                 self._update_saved_views_counter()
                 return
             
-            # CRITICAL: Set navigation flags BEFORE loading
-            self._is_loading_state = True
-            self._navigation_timestamp = time.time()
-            
             # Load the view
             _, filepath = self.saved_views[self.current_saved_index]
-            annotation_json = load_annotation_json(filepath)
+            annotation_json, payload = load_saved_view(filepath)
             
             if annotation_json:
-                self.viewer.annotation_data = json.dumps(annotation_json)
-                self.viewer.load_annotation_trigger += 1
-                self.last_saved_state = annotation_json
+                self._load_state(annotation_json, payload)
                 logger.info(f"▶ Loaded next saved view: {os.path.basename(filepath)}")
                 self._update_saved_views_counter()
             
         except Exception as e:
             logger.error(f"Error loading next saved view: {e}")
-            self._is_loading_state = False  # Clear flag on error
+            self._nav_state = NavState.ERROR
+        finally:
+            self._end_navigation()
+    
+    def _load_prev_image(self, event=None):
+        """Trigger prev image in InteractiveSVSApp if available"""
+        if self.parent_app:
+            self.parent_app._load_prev_image()
+    
+    def _load_next_image(self, event=None):
+        """Trigger next image in InteractiveSVSApp if available"""
+        if self.parent_app:
+            self.parent_app._load_next_image()
+    
+    def _run_action(self, action):
+        """Dispatch an action from _actions, dropping repeats inside its debounce window"""
+        handler = self._actions.get(action)
+        if handler is None:
+            return
+        
+        now = time.monotonic()
+        last = self._last_shortcut_time.get(action)
+        if last is not None and now - last < SHORTCUT_DEBOUNCE_WINDOWS.get(action, 0):
+            logger.debug("Action %s debounced", action)
+            return
+        self._last_shortcut_time[action] = now
+        handler()
+    
+    def _on_button_click(self, event):
+        """Handle dashboard button clicks; the action name is the button's first tag"""
+        try:
+            self._run_action(event.obj.tags[0])
+        except Exception as e:
+            logger.error(f"Error handling button click: {e}")
     
     def _on_keyboard_shortcut(self, event):
         """Handle keyboard shortcuts from JavaScript"""
@@ -740,71 +970,16 @@ class SVSAnnotationTool:
                 return
             
             logger.info(f"⌨️  Keyboard shortcut: {shortcut}")
-            
-            if shortcut == 'undo':
-                self._undo_annotation()
-            elif shortcut == 'redo':
-                self._redo_annotation()
-            elif shortcut == 'save':
-                self._save_current_view()
-            elif shortcut == 'prev':
-                self._load_prev_saved()
-            elif shortcut == 'next':
-                self._load_next_saved()
-            elif shortcut == 'recenter':
-                self._recenter_map()
-            elif shortcut == 'prev_image':
-                # Trigger prev image in InteractiveSVSApp if available
-                if hasattr(self, 'parent_app'):
-                    self.parent_app._load_prev_image()
-            elif shortcut == 'next_image':
-                # Trigger next image in InteractiveSVSApp if available
-                if hasattr(self, 'parent_app'):
-                    self.parent_app._load_next_image()
-            elif shortcut == 'toggle_minimap':
-                # Toggle minimap via JavaScript
-                self._toggle_minimap()
-            elif shortcut == 'done':
-                self._mark_done()
-            # ink_found shortcut removed - button is disabled and only updated by Done/Save
-            
-            # Reset trigger
-            self.viewer.keyboard_trigger = ''
+            self._run_action(shortcut)
             
         except Exception as e:
             logger.error(f"Error handling keyboard shortcut: {e}")
+        finally:
+            # Reset trigger so the next press fires again
+            self.viewer.keyboard_trigger = ''
     
-    def create_dashboard(self):
-        # Common tooltip stylesheet for all buttons
-        tooltip_style = """
-            :host(.solid) .bk-btn {
-                position: relative;
-            }
-            :host(.solid) .bk-btn::after {
-                content: attr(title);
-                position: absolute;
-                top: 100%;
-                left: 50%;
-                transform: translateX(-50%);
-                margin-top: 8px;
-                padding: 6px 10px;
-                background-color: #000000;
-                color: #ffffff;
-                font-size: 11px;
-                font-weight: normal;
-                white-space: nowrap;
-                border-radius: 4px;
-                opacity: 0;
-                pointer-events: none;
-                transition: opacity 0.3s;
-                z-index: 10000;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-            }
-            :host(.solid) .bk-btn:hover::after {
-                opacity: 1;
-            }
-        """
-        
+    def create_controls(self):
+        """Create the control buttons and their header rows"""
         # Create recenter button
         recenter_button = pn.widgets.Button(
             name='Reset View',
@@ -812,46 +987,11 @@ class SVSAnnotationTool:
             width=120,
             height=35,
             margin=(5, 5),
-            stylesheets=["""  
-            :host(.solid) .bk-btn {
-                background-color: #17a2b8 !important;
-                color: #ffffff !important;
-                border: 3px solid #ffffff !important;
-                font-weight: bold !important;
-                font-size: 16px !important;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                position: relative;
-            }
-            :host(.solid) .bk-btn:hover {
-                background-color: #1fc8e3 !important;
-                box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-            }
-            :host(.solid) .bk-btn::after {
-                content: 'Ctrl+R / Cmd+R';
-                position: absolute;
-                top: 100%;
-                left: 50%;
-                transform: translateX(-50%);
-                margin-top: 8px;
-                padding: 6px 10px;
-                background-color: #000000;
-                color: #ffffff;
-                font-size: 11px;
-                font-weight: normal;
-                white-space: nowrap;
-                border-radius: 4px;
-                opacity: 0;
-                pointer-events: none;
-                transition: opacity 0.3s;
-                z-index: 10000;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-            }
-            :host(.solid) .bk-btn:hover::after {
-                opacity: 1;
-            }
-            """]
+            tags=['recenter'],
+            stylesheets=[BUTTON_CSS],
+            styles=button_css_vars('#17a2b8', '#1fc8e3', 'Ctrl+R / Cmd+R', font_size='16px')
         )
-        recenter_button.on_click(self._recenter_map)
+        recenter_button.on_click(self._on_button_click)
         
         # Create control buttons with inline styling using stylesheets
         undo_button = pn.widgets.Button(
@@ -860,46 +1000,11 @@ class SVSAnnotationTool:
             width=80,
             height=35,
             margin=(5, 5),
-            stylesheets=["""
-            :host(.solid) .bk-btn {
-                background-color: #ffc107 !important;
-                color: #000000 !important;
-                border: 3px solid #ffffff !important;
-                font-weight: bold !important;
-                font-size: 13px !important;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                position: relative;
-            }
-            :host(.solid) .bk-btn:hover {
-                background-color: #ffcd39 !important;
-                box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-            }
-            :host(.solid) .bk-btn::after {
-                content: 'Ctrl+Z / Cmd+Z';
-                position: absolute;
-                top: 100%;
-                left: 50%;
-                transform: translateX(-50%);
-                margin-top: 8px;
-                padding: 6px 10px;
-                background-color: #000000;
-                color: #ffffff;
-                font-size: 11px;
-                font-weight: normal;
-                white-space: nowrap;
-                border-radius: 4px;
-                opacity: 0;
-                pointer-events: none;
-                transition: opacity 0.3s;
-                z-index: 10000;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-            }
-            :host(.solid) .bk-btn:hover::after {
-                opacity: 1;
-            }
-            """]
+            tags=['undo'],
+            stylesheets=[BUTTON_CSS],
+            styles=button_css_vars('#ffc107', '#ffcd39', 'Ctrl+Z / Cmd+Z', color='#000000')
         )
-        undo_button.on_click(self._undo_annotation)
+        undo_button.on_click(self._on_button_click)
         
         redo_button = pn.widgets.Button(
             name='⟳ REDO',
@@ -907,46 +1012,11 @@ class SVSAnnotationTool:
             width=80,
             height=35,
             margin=(5, 5),
-            stylesheets=["""
-            :host(.solid) .bk-btn {
-                background-color: #ffc107 !important;
-                color: #000000 !important;
-                border: 3px solid #ffffff !important;
-                font-weight: bold !important;
-                font-size: 13px !important;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                position: relative;
-            }
-            :host(.solid) .bk-btn:hover {
-                background-color: #ffcd39 !important;
-                box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-            }
-            :host(.solid) .bk-btn::after {
-                content: 'Ctrl+A / Cmd+A';
-                position: absolute;
-                top: 100%;
-                left: 50%;
-                transform: translateX(-50%);
-                margin-top: 8px;
-                padding: 6px 10px;
-                background-color: #000000;
-                color: #ffffff;
-                font-size: 11px;
-                font-weight: normal;
-                white-space: nowrap;
-                border-radius: 4px;
-                opacity: 0;
-                pointer-events: none;
-                transition: opacity 0.3s;
-                z-index: 10000;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-            }
-            :host(.solid) .bk-btn:hover::after {
-                opacity: 1;
-            }
-            """]
+            tags=['redo'],
+            stylesheets=[BUTTON_CSS],
+            styles=button_css_vars('#ffc107', '#ffcd39', 'Ctrl+A / Cmd+A', color='#000000')
         )
-        redo_button.on_click(self._redo_annotation)
+        redo_button.on_click(self._on_button_click)
         
         save_button = pn.widgets.Button(
             name='💾 Save',
@@ -954,46 +1024,11 @@ class SVSAnnotationTool:
             width=80,
             height=35,
             margin=(5, 5),
-            stylesheets=["""
-            :host(.solid) .bk-btn {
-                background-color: #28a745 !important;
-                color: #ffffff !important;
-                border: 3px solid #ffffff !important;
-                font-weight: bold !important;
-                font-size: 13px !important;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                position: relative;
-            }
-            :host(.solid) .bk-btn:hover {
-                background-color: #34ce57 !important;
-                box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-            }
-            :host(.solid) .bk-btn::after {
-                content: 'Key "S" (Done + Ink Found)';
-                position: absolute;
-                top: 100%;
-                left: 50%;
-                transform: translateX(-50%);
-                margin-top: 8px;
-                padding: 6px 10px;
-                background-color: #000000;
-                color: #ffffff;
-                font-size: 11px;
-                font-weight: normal;
-                white-space: nowrap;
-                border-radius: 4px;
-                opacity: 0;
-                pointer-events: none;
-                transition: opacity 0.3s;
-                z-index: 10000;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-            }
-            :host(.solid) .bk-btn:hover::after {
-                opacity: 1;
-            }
-            """]
+            tags=['save'],
+            stylesheets=[BUTTON_CSS],
+            styles=button_css_vars('#28a745', '#34ce57', 'Key "S" (Done + Ink Found)')
         )
-        save_button.on_click(self._save_current_view)
+        save_button.on_click(self._on_button_click)
         
         prev_button = pn.widgets.Button(
             name='◀ ',
@@ -1001,46 +1036,11 @@ class SVSAnnotationTool:
             width=40,
             height=35,
             margin=(5, 5),
-            stylesheets=["""
-            :host(.solid) .bk-btn {
-                background-color: #007bff !important;
-                color: #ffffff !important;
-                border: 3px solid #ffffff !important;
-                font-weight: bold !important;
-                font-size: 13px !important;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                position: relative;
-            }
-            :host(.solid) .bk-btn:hover {
-                background-color: #0d8aff !important;
-                box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-            }
-            :host(.solid) .bk-btn::after {
-                content: 'Ctrl+← / Cmd+←';
-                position: absolute;
-                top: 100%;
-                left: 50%;
-                transform: translateX(-50%);
-                margin-top: 8px;
-                padding: 6px 10px;
-                background-color: #000000;
-                color: #ffffff;
-                font-size: 11px;
-                font-weight: normal;
-                white-space: nowrap;
-                border-radius: 4px;
-                opacity: 0;
-                pointer-events: none;
-                transition: opacity 0.3s;
-                z-index: 10000;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-            }
-            :host(.solid) .bk-btn:hover::after {
-                opacity: 1;
-            }
-            """]
+            tags=['prev'],
+            stylesheets=[BUTTON_CSS],
+            styles=button_css_vars('#007bff', '#0d8aff', 'Ctrl+← / Cmd+←')
         )
-        prev_button.on_click(self._load_prev_saved)
+        prev_button.on_click(self._on_button_click)
         
         next_button = pn.widgets.Button(
             name=' ▶',
@@ -1048,69 +1048,11 @@ class SVSAnnotationTool:
             width=40,
             height=35,
             margin=(5, 5),
-            stylesheets=["""
-            :host(.solid) .bk-btn {
-                background-color: #007bff !important;
-                color: #ffffff !important;
-                border: 3px solid #ffffff !important;
-                font-weight: bold !important;
-                font-size: 13px !important;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                position: relative;
-            }
-            :host(.solid) .bk-btn:hover {
-                background-color: #0d8aff !important;
-                box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-            }
-            :host(.solid) .bk-btn::after {
-                content: 'Ctrl+→ / Cmd+→';
-                position: absolute;
-                top: 100%;
-                left: 50%;
-                transform: translateX(-50%);
-                margin-top: 8px;
-                padding: 6px 10px;
-                background-color: #000000;
-                color: #ffffff;
-                font-size: 11px;
-                font-weight: normal;
-                white-space: nowrap;
-                border-radius: 4px;
-                opacity: 0;
-                pointer-events: none;
-                transition: opacity 0.3s;
-                z-index: 10000;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-            }
-            :host(.solid) .bk-btn:hover::after {
-                opacity: 1;
-            }
-            """]
-        )
-        next_button.on_click(self._load_next_saved)
-        
-        # Create modal placeholder HTML that will be in the initial template
-        # Must NOT use width=0 height=0 as Panel may not render those
-        modal_placeholder_html = pn.pane.HTML(
-            """
-            <div id="settings-backdrop"></div>
-            <div id="settings-modal-wrapper-container"></div>
-            """,
-            sizing_mode='stretch_width',
-            height=0,
-            margin=0
-        )
-        
-        # Create layout without sidebar - INCLUDE modal placeholder in initial main list
-        template = pn.template.FastListTemplate(
-            title="",  # Empty title
-            sidebar=[],  # Empty sidebar
-            main=[self.viewer, modal_placeholder_html],  # Add placeholder to initial template
-            header_background="#170f90",
-            sidebar_width=0,  # Hide sidebar completely
-            theme_toggle=False,  # Remove theme toggle button
-            busy_indicator=None
+            tags=['next'],
+            stylesheets=[BUTTON_CSS],
+            styles=button_css_vars('#007bff', '#0d8aff', 'Ctrl+→ / Cmd+→')
         )
+        next_button.on_click(self._on_button_click)
         
         # Add buttons to header
         self.button_row_live_tracking = pn.Row(
@@ -1120,7 +1062,6 @@ class SVSAnnotationTool:
             sizing_mode='fixed',
             align='center'
             )
-        #template.header.append(self.button_row_live_tracking)
         
         self.button_row_saved_views = pn.Row(
             pn.layout.HSpacer(width=100),
@@ -1139,6 +1080,29 @@ class SVSAnnotationTool:
         self.next_button = next_button
         
         # Watch for keyboard triggers from viewer
-        self.viewer.param.watch(self._on_keyboard_shortcut, 'keyboard_trigger')
+        self._watch_viewer(self._on_keyboard_shortcut, 'keyboard_trigger')
+    
+    def create_dashboard(self):
+        self.create_controls()
+        
+        # Create modal placeholder HTML that will be in the initial template
+        # Must NOT use width=0 height=0 as Panel may not render those
+        modal_placeholder_html = pn.pane.HTML(
+            MODAL_PLACEHOLDER_HTML,
+            sizing_mode='stretch_width',
+            height=0,
+            margin=0
+        )
+        
+        # Create layout without sidebar - INCLUDE modal placeholder in initial main list
+        template = pn.template.FastListTemplate(
+            title="",  # Empty title
+            sidebar=[],  # Empty sidebar
+            main=[self.viewer, modal_placeholder_html],  # Add placeholder to initial template
+            header_background="#170f90",
+            sidebar_width=0,  # Hide sidebar completely
+            theme_toggle=False,  # Remove theme toggle button
+            busy_indicator=None
+        )
         
         return template
\ No newline at end of file
@@ -12,13 +12,16 @@ import panel as pn
 import param
 import logging
 import os
-import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import parse_qs
 from dotenv import load_dotenv
 
 # Import modules
 from utility import *
-from annotation import SVSAnnotationTool
+from annotation import SVSAnnotationTool, BUTTON_CSS, button_css_vars
 from redis_cache import cache
 from keyboard_shortcuts import KeyboardShortcutManager
 from settings_modal import create_settings_button_and_modal
@@ -28,6 +31,9 @@ from redis_helper import redis_helper
 cache_key = "annotation_tool_cache_v1"
 session_key_prefix = "active_session:" 
 
+# Last-image cache writes happen here, off the selection callback; one worker keeps them in order
+_cache_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -59,6 +65,260 @@ pn.extension(sizing_mode="stretch_width",
              })
 
 
+# Image names longer than this are shown as start...end in the header
+MAX_DISPLAY_NAME_LENGTH = 60
+
+# Recently shown images keep their SVSAnnotationTool, so going back to one is a lookup
+TOOL_CACHE_SIZE = 4
+
+# Header buttons reuse the dashboard BUTTON_CSS with a thinner border and
+# room for the status row above them
+HEADER_BUTTON_CSS = """
+:host(.solid) .bk-btn {
+    border-width: 2px !important;
+    padding: var(--btn-padding, 6px 10px);
+    margin-top: 54px;
+}
+"""
+
+# Previous/next image buttons grey out at either end of the image list
+IMAGE_NAV_BUTTON_CSS = """
+:host(.solid) .bk-btn:disabled {
+    --btn-bg: #cccccc;
+    --btn-hover-bg: #cccccc;
+    --btn-color: #666666;
+    cursor: not-allowed !important;
+}
+"""
+
+# (done, ink_found) -> (done button_type, done name, ink button_type, ink name).
+# Ink status is blank until the image is done
+STATUS_BUTTON_STATES = {
+    (False, False): ('default', 'To Do', 'default', ''),
+    (False, True): ('default', 'To Do', 'default', ''),
+    (True, False): ('success', 'Done', 'success', 'Ink Not Found'),
+    (True, True): ('success', 'Done', 'success', 'Ink Found'),
+}
+
+# Done/ink buttons turn green when _update_status_buttons sets button_type='success'
+STATUS_BUTTON_CSS = """
+:host(.solid) .bk-btn-success {
+    --btn-bg: #28a745;
+    --btn-hover-bg: #218838;
+}
+"""
+
+IMAGE_INDEX_INPUT_CSS = """
+:host {
+    --design-background-text-color: #000000;
+}
+input {
+    background-color: #ffc107 !important;
+    color: #000000 !important;
+    border: 3px solid #ffffff !important;
+    font-weight: bold !important;
+    font-size: 16px !important;
+    text-align: center !important;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
+    padding: 6px 10px !important;
+    margin-top: 24px !important;
+}
+input:focus {
+    background-color: #ffc107 !important;
+    color: #000000 !important;
+    outline: 2px solid #ffffff !important;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.6) !important;
+}
+"""
+
+# Template-wide CSS: index input, image name tooltip and settings modal
+APP_RAW_CSS = """
+.custom-number-input input[type="text"] {
+    background-color: #ffc107 !important;
+    color: #000000 !important;
+    border: 3px solid #ffffff !important;
+    font-weight: bold !important;
+    font-size: 14px !important;
+    text-align: center !important;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
+    padding: 6px 10px !important;
+    margin-top: 54px !important;
+}
+.custom-number-input input[type="text"]:focus {
+    background-color: #ffc107 !important;
+    color: #000000 !important;
+    outline: 2px solid #ffffff !important;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.6) !important;
+}
+
+/* Image name with tooltip */
+.image-name-tooltip {
+    position: relative;
+    cursor: help;
+}
+.image-name-tooltip:hover::after {
+    content: attr(data-full-name);
+    position: absolute;
+    top: 100%;
+    left: 0;
+    margin-top: 5px;
+    padding: 8px 12px;
+    background-color: #000000;
+    color: #ffffff;
+    font-size: 12px;
+    white-space: nowrap;
+    border-radius: 4px;
+    z-index: 10000;
+    box-shadow: 0 2px 8px rgba(0,0,0,0.5);
+}
+
+/* Settings Modal Styles */
+#settings-modal-placeholder {
+    position: fixed !important;
+    top: 50% !important;
+    left: 50% !important;
+    transform: translate(-50%, -50%) !important;
+    z-index: 10000 !important;
+    background: white !important;
+    border-radius: 8px !important;
+    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.4) !important;
+    max-height: 90vh !important;
+    max-width: 90vw !important;
+    overflow: auto !important;
+    display: none !important;
+    width: 850px;
+    padding: 20px;
+}
+#settings-modal-placeholder.show {
+    display: block !important;
+}
+#settings-backdrop {
+    display: none;
+    position: fixed;
+    top: 0;
+    left: 0;
+    width: 100vw;
+    height: 100vh;
+    background: rgba(0, 0, 0, 0.6);
+    z-index: 9998;
+}
+#settings-backdrop.show {
+    display: block !important;
+}
+"""
+
+
+# Script that adds the keyboard shortcut help modal to the page (or shows it if it
+# is already there); formatted with a timestamp per click so the browser re-executes it
+HELP_MODAL_SCRIPT = '''
+<script id="help-script-{timestamp}">
+(function() {{
+    // Show the existing modal if present
+    const existing = document.getElementById('help-modal-overlay');
+    if (existing) {{
+        existing.style.display = 'flex';
+        return;
+    }}
+    
+    // Create modal HTML
+    const modalHTML = `
+        <div id="help-modal-overlay" style="
+            position: fixed;
+            top: 0;
+            left: 0;
+            width: 100%;
+            height: 100%;
+            background-color: rgba(0, 0, 0, 0.8);
+            z-index: 99999;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            font-family: Arial, sans-serif;
+        ">
+            <div style="
+                background-color: white;
+                border-radius: 10px;
+                box-shadow: 0 4px 20px rgba(0,0,0,0.5);
+                max-width: 700px;
+                max-height: 90vh;
+                overflow-y: auto;
+                position: relative;
+            ">
+                <div style="
+                    background-color: #170f90;
+                    color: white;
+                    padding: 20px;
+                    border-radius: 10px 10px 0 0;
+                    position: sticky;
+                    top: 0;
+                    z-index: 1;
+                ">
+                    <h2 style="margin: 0; font-size: 24px;">⌨️ Keyboard Shortcuts </h2>
+                    <button onclick="document.getElementById('help-modal-overlay').style.display = 'none'" style="
+                        position: absolute;
+                        top: 15px;
+                        right: 15px;
+                        background-color: #dc3545;
+                        color: white;
+                        border: none;
+                        border-radius: 5px;
+                        padding: 8px 15px;
+                        cursor: pointer;
+                        font-size: 16px;
+                        font-weight: bold;
+                    ">✕</button>
+                </div>
+                <div style="padding: 30px; line-height: 1.8;">
+                    <h3 style="color: #170f90; margin-top: 0;">Navigation</h3>
+                    <ul style="list-style: none; padding-left: 0;">
+                        <li><strong>←</strong> [◀ Button] : Switch to previous image in dataset</li>
+                        <li><strong>→</strong> [▶ Button] : Switch to next image in dataset</li>
+                        <li><strong>Ctrl/Cmd + R</strong> [Reset View Button] : Reset zoom and center view</li>
+                        <li><strong>V</strong> : Show/hide overview minimap</li>
+                    </ul>
+                    
+                    <h3 style="color: #170f90;">Annotation and StatusControl</h3>
+                    <ul style="list-style: none; padding-left: 0;">
+                        <li><strong>Ctrl/Cmd + Z</strong> [⟲ UNDO Button] : Revert to previous annotation state</li>
+                        <li><strong>Ctrl/Cmd + A</strong></strong> [⟳ REDO Button] : Restore undone annotation</li>
+                        <li><strong>S</strong> [💾 SAVE Button] : Save current annotation and Mark image as complete and Ink found</li>
+                        <!-- <li><strong>Ctrl/Cmd + ←</strong> [◀ Button] : Load previous saved annotation view</li> --> 
+                        <!-- <li><strong>Ctrl/Cmd + →</strong> [▶ Button] : Load next saved annotation view</li> -->
+                        <li><strong>D</strong> [Done Button] : Mark image as complete/incomplete</li>
+                    </ul>
+                    
+                    <h3 style="color: #170f90;">Drawing Tools</h3>
+                    <ul style="list-style: none; padding-left: 0;">
+                        <li><strong>Shift</strong> : Hold while dragging to draw annotations</li>
+                        <li><strong>Click + Backspace</strong> : Remove selected annotation line</li>
+                        <li><strong>Ctrl/Cmd + Alt + Backspace</strong> [🗑️ Clear All Button] : Clear all drawings</li>
+                        <li><strong>1-5</strong> : Adjust drawing line width (1=thin, 5=thick)</li>
+                        <li><strong>C</strong> : Change annotation line color</li>
+                    </ul>
+                    
+                    <hr style="margin: 20px 0; border: none; border-top: 2px solid #ddd;">
+                    <p style="text-align: center; color: #666;"><strong>Total Shortcuts: 16</strong></p>
+                </div>
+            </div>
+        </div>
+    `;
+    
+    // Add modal to body
+    document.body.insertAdjacentHTML('beforeend', modalHTML);
+    
+    console.log('Help modal displayed - timestamp: {timestamp}');
+}})();
+</script>
+'''
+
+# Shows the help modal once HELP_MODAL_SCRIPT has added it, without resending the markup
+HELP_MODAL_SHOW_SCRIPT = '''
+<script id="help-script-{timestamp}">
+document.getElementById('help-modal-overlay').style.display = 'flex';
+</script>
+'''
+
+
 ###############################################################
 
 # Create interactive application with image selector
@@ -79,18 +339,32 @@ class InteractiveSVSApp:
         self.available_images = get_available_images()
         self.current_tool = None
         self.current_image_index = 0  # Track current image index
+        self._suppress_selection_cb = False  # Set while _go_to_image writes image_selector.value
+        self._tool_cache = OrderedDict()  # svs_path -> SVSAnnotationTool, least recently shown first
         
         logger.info(f"0007_Found {len(self.available_images)} available images")
         
         # Create image selector
-        print("0008_Creating image_options dictionary", flush=True)
-        image_options = {img['display_name']: img['svs_path'] for img in self.available_images}
-        print(f"DEBUG: image_options created with {len(image_options)} items", flush=True)
+        logger.info("0008_Creating image_options dictionary")
+        # Paths/names by image index, so navigation never walks available_images or the options dict
+        self._image_paths = tuple(img['svs_path'] for img in self.available_images)
+        self._image_display_names = tuple(img['display_name'] for img in self.available_images)
+        self._basenames = tuple(os.path.basename(path).replace('.svs', '') for path in self._image_paths)
+        # Header names, shortened to the first 30 and last 25 chars beyond MAX_DISPLAY_NAME_LENGTH
+        self._display_short = tuple(
+            name[:30] + '...' + name[-25:] if len(name) > MAX_DISPLAY_NAME_LENGTH else name
+            for name in self._basenames
+        )
+        image_options = dict(zip(self._image_display_names, self._image_paths))
+        # Reverse lookups (first occurrence wins, as with the old linear scans)
+        self._name_to_index = {}
+        self._path_to_index = {}
+        for idx, img in enumerate(self.available_images):
+            self._name_to_index.setdefault(img['name'], idx)
+            self._path_to_index.setdefault(img['svs_path'], idx)
         logger.info(f"Image options: {list(image_options.keys())}")
         
-        print("DEBUG: Checking if image_options is empty", flush=True)
         if not image_options:
-            print("DEBUG: NO IMAGES - entering if block", flush=True)
             logger.error("No DZI images found!")
             self.image_selector = pn.pane.Markdown("**No images available.**")
             self.template = pn.template.FastListTemplate(
@@ -98,7 +372,6 @@ class InteractiveSVSApp:
                 sidebar=[pn.pane.Markdown("Run: `docker exec ink_annotation_tool python /app/convert_to_dzi.py`")]
             )
         else:
-            print("DEBUG: Images found - entering else block", flush=True)
             # Default to first available image
             image_name_in_cache = cache.get(cache_key)
 
@@ -108,7 +381,7 @@ class InteractiveSVSApp:
             else:
                 self.current_image_index = 0
 
-            default_image = list(image_options.values())[self.current_image_index]
+            default_image = self._image_paths[self.current_image_index]
             
             self.image_selector = pn.widgets.Select(
                 name='Select',
@@ -127,51 +400,8 @@ class InteractiveSVSApp:
                 width=40,
                 height=35,
                 margin=(10, 10),
-                stylesheets=["""
-                :host(.solid) .bk-btn {
-                    background-color: #6c757d !important;
-                    color: #ffffff !important;
-                    border: 2px solid #ffffff !important;
-                    font-weight: bold !important;
-                    font-size: 14px !important;
-                    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                    padding: 6px 10px;
-                    margin-top: 54px;
-                    position: relative;
-                }
-                :host(.solid) .bk-btn:hover {
-                    background-color: #5a6268 !important;
-                    box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-                }
-                :host(.solid) .bk-btn:disabled {
-                    background-color: #cccccc !important;
-                    color: #666666 !important;
-                    cursor: not-allowed !important;
-                }
-                :host(.solid) .bk-btn::after {
-                    content: 'Key "←"';
-                    position: absolute;
-                    top: 100%;
-                    left: 50%;
-                    transform: translateX(-50%);
-                    margin-top: 8px;
-                    padding: 6px 10px;
-                    background-color: #000000;
-                    color: #ffffff;
-                    font-size: 11px;
-                    font-weight: normal;
-                    white-space: nowrap;
-                    border-radius: 4px;
-                    opacity: 0;
-                    pointer-events: none;
-                    transition: opacity 0.3s;
-                    z-index: 10000;
-                    box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-                }
-                :host(.solid) .bk-btn:hover::after {
-                    opacity: 1;
-                }
-                """]
+                stylesheets=[BUTTON_CSS, HEADER_BUTTON_CSS, IMAGE_NAV_BUTTON_CSS],
+                styles=button_css_vars('#6c757d', '#5a6268', 'Key "←"', font_size='14px', padding='6px 10px')
             )
             self.prev_image_button.on_click(self._load_prev_image)
 
@@ -183,31 +413,11 @@ class InteractiveSVSApp:
                 height=35,
                 margin=(10, 10),
                 css_classes=['custom-number-input'],
-                stylesheets=["""
-                :host {
-                    --design-background-text-color: #000000;
-                }
-                input {
-                    background-color: #ffc107 !important;
-                    color: #000000 !important;
-                    border: 3px solid #ffffff !important;
-                    font-weight: bold !important;
-                    font-size: 16px !important;
-                    text-align: center !important;
-                    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                    padding: 6px 10px !important;
-                    margin-top: 24px !important;
-                }
-                input:focus {
-                    background-color: #ffc107 !important;
-                    color: #000000 !important;
-                    outline: 2px solid #ffffff !important;
-                    box-shadow: 0 2px 8px rgba(0,0,0,0.6) !important;
-                }
-                """]
+                stylesheets=[IMAGE_INDEX_INPUT_CSS]
             )
 
-            # Add callback for input box
+            # Add callback for input box. TextInput.value only changes on Enter/blur
+            # (value_input is the per-keystroke one), so typing "125" loads one image
             self.image_index_input.param.watch(self._on_index_text_change, 'value')
 
             # Create Next Image button
@@ -217,51 +427,8 @@ class InteractiveSVSApp:
                 width=40,
                 height=35,
                 margin=(10, 10),
-                stylesheets=["""
-                :host(.solid) .bk-btn {
-                    background-color: #6c757d !important;
-                    color: #ffffff !important;
-                    border: 2px solid #ffffff !important;
-                    font-weight: bold !important;
-                    font-size: 14px !important;
-                    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                    padding: 6px 10px;
-                    margin-top: 54px;
-                    position: relative;
-                }
-                :host(.solid) .bk-btn:hover {
-                    background-color: #5a6268 !important;
-                    box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-                }
-                :host(.solid) .bk-btn:disabled {
-                    background-color: #cccccc !important;
-                    color: #666666 !important;
-                    cursor: not-allowed !important;
-                }
-                :host(.solid) .bk-btn::after {
-                    content: 'Key "→"';
-                    position: absolute;
-                    top: 100%;
-                    left: 50%;
-                    transform: translateX(-50%);
-                    margin-top: 8px;
-                    padding: 6px 10px;
-                    background-color: #000000;
-                    color: #ffffff;
-                    font-size: 11px;
-                    font-weight: normal;
-                    white-space: nowrap;
-                    border-radius: 4px;
-                    opacity: 0;
-                    pointer-events: none;
-                    transition: opacity 0.3s;
-                    z-index: 10000;
-                    box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-                }
-                :host(.solid) .bk-btn:hover::after {
-                    opacity: 1;
-                }
-                """]
+                stylesheets=[BUTTON_CSS, HEADER_BUTTON_CSS, IMAGE_NAV_BUTTON_CSS],
+                styles=button_css_vars('#6c757d', '#5a6268', 'Key "→"', font_size='14px', padding='6px 10px')
             )
             self.next_image_button.on_click(self._load_next_image)
 
@@ -269,18 +436,8 @@ class InteractiveSVSApp:
             self._update_navigation_buttons()
 
             # Add a text display for the current image name with smart truncation
-            current_image_name = os.path.basename(default_image).replace('.svs', '')
-            
-            # Smart truncation - show start and end of name
-            max_display_length = 60
-            if len(current_image_name) > max_display_length:
-                # Show first 30 and last 25 chars with ... in middle
-                display_name = current_image_name[:30] + '...' + current_image_name[-25:]
-            else:
-                display_name = current_image_name
-            
             self.image_name_display = pn.pane.Markdown(
-                f"**Image:** {display_name}",
+                f"**Image:** {self._display_short[self.current_image_index]}",
                 styles={
                     'font-size': '14px',
                     'font-weight': 'bold',
@@ -329,52 +486,8 @@ class InteractiveSVSApp:
                 width=90,
                 height=35,
                 margin=(10, 10),
-                stylesheets=["""
-                :host(.solid) .bk-btn {
-                    background-color: #6c757d !important;
-                    color: #ffffff !important;
-                    border: 2px solid #ffffff !important;
-                    font-weight: bold !important;
-                    font-size: 14px !important;
-                    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                    padding: 6px 16px;
-                    margin-top: 54px;
-                    position: relative;
-                }
-                :host(.solid) .bk-btn:hover {
-                    background-color: #5a6268 !important;
-                    box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-                }
-                :host(.solid) .bk-btn-success {
-                    background-color: #28a745 !important;
-                }
-                :host(.solid) .bk-btn-success:hover {
-                    background-color: #218838 !important;
-                }
-                :host(.solid) .bk-btn::after {
-                    content: 'Key "D" (Done, no ink)';
-                    position: absolute;
-                    top: 100%;
-                    left: 50%;
-                    transform: translateX(-50%);
-                    margin-top: 8px;
-                    padding: 6px 10px;
-                    background-color: #000000;
-                    color: #ffffff;
-                    font-size: 11px;
-                    font-weight: normal;
-                    white-space: nowrap;
-                    border-radius: 4px;
-                    opacity: 0;
-                    pointer-events: none;
-                    transition: opacity 0.3s;
-                    z-index: 10000;
-                    box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-                }
-                :host(.solid) .bk-btn:hover::after {
-                    opacity: 1;
-                }
-                """]
+                stylesheets=[BUTTON_CSS, HEADER_BUTTON_CSS, STATUS_BUTTON_CSS],
+                styles=button_css_vars('#6c757d', '#5a6268', 'Key "D" (Done, no ink)', font_size='14px', padding='6px 16px')
             )
             
             # Create Ink Found button with dynamic styling (disabled - only updated by Done/Save)
@@ -385,52 +498,8 @@ class InteractiveSVSApp:
                 height=35,
                 margin=(10, 10),
                 disabled=True,  # Disabled - only updated by Done/Save buttons
-                stylesheets=["""
-                :host(.solid) .bk-btn {
-                    background-color: #6c757d !important;
-                    color: #ffffff !important;
-                    border: 2px solid #ffffff !important;
-                    font-weight: bold !important;
-                    font-size: 14px !important;
-                    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                    padding: 6px 16px;
-                    margin-top: 54px;
-                    position: relative;
-                }
-                :host(.solid) .bk-btn:hover {
-                    background-color: #5a6268 !important;
-                    box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-                }
-                :host(.solid) .bk-btn-success {
-                    background-color: #28a745 !important;
-                }
-                :host(.solid) .bk-btn-success:hover {
-                    background-color: #218838 !important;
-                }
-                :host(.solid) .bk-btn::after {
-                    content: 'Auto-updated by Done/Save';
-                    position: absolute;
-                    top: 100%;
-                    left: 50%;
-                    transform: translateX(-50%);
-                    margin-top: 8px;
-                    padding: 6px 10px;
-                    background-color: #000000;
-                    color: #ffffff;
-                    font-size: 11px;
-                    font-weight: normal;
-                    white-space: nowrap;
-                    border-radius: 4px;
-                    opacity: 0;
-                    pointer-events: none;
-                    transition: opacity 0.3s;
-                    z-index: 10000;
-                    box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-                }
-                :host(.solid) .bk-btn:hover::after {
-                    opacity: 1;
-                }
-                """]
+                stylesheets=[BUTTON_CSS, HEADER_BUTTON_CSS, STATUS_BUTTON_CSS],
+                styles=button_css_vars('#6c757d', '#5a6268', 'Auto-updated by Done/Save', font_size='14px', padding='6px 16px')
             )
             
             logger.info(f"Image selector created with default: {default_image}")
@@ -455,62 +524,22 @@ class InteractiveSVSApp:
                 width=30,
                 height=30,
                 margin=(22, 5),
-                stylesheets=['''
-                :host(.solid) .bk-btn {
-                    background-color: #ffc107 !important;
-                    color: #000000 !important;
-                    border: 2px solid #ffffff !important;
-                    font-weight: bold !important;
-                    font-size: 12px !important;
-                    box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                    padding: 2px 10px;
-                    margin-top: 54px;
-                    position: relative;
-                }
-                :host(.solid) .bk-btn:hover {
-                    background-color: #ffcd39 !important;
-                    box-shadow: 0 3px 7px rgba(0,0,0,0.5) !important;
-                }
-                :host(.solid) .bk-btn::after {
-                    content: 'Help (H)';
-                    position: absolute;
-                    top: 100%;
-                    left: 50%;
-                    transform: translateX(-50%);
-                    margin-top: 8px;
-                    padding: 6px 10px;
-                    background-color: #000000;
-                    color: #ffffff;
-                    font-size: 11px;
-                    font-weight: normal;
-                    white-space: nowrap;
-                    border-radius: 4px;
-                    opacity: 0;
-                    pointer-events: none;
-                    transition: opacity 0.3s;
-                    z-index: 10000;
-                    box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-                }
-                :host(.solid) .bk-btn:hover::after {
-                    opacity: 1;
-                }
-                ''']
+                stylesheets=[BUTTON_CSS, HEADER_BUTTON_CSS],
+                styles=button_css_vars('#ffc107', '#ffcd39', 'Help (H)', color='#000000', font_size='12px', padding='2px 10px')
             )
             
             # Create HTML pane with JavaScript to show help modal
             self.help_trigger = pn.pane.HTML('', width=0, height=0)
+            self._help_modal_sent = False  # The modal markup is sent with the first click only
             
             # Connect button handlers once (not per image load)
             self.done_button.on_click(self._on_done_click)
             self.ink_found_button.on_click(self._on_ink_found_click)
             self.help_button.on_click(self._show_help_modal)
-            print("DEBUG: Button handlers connected", flush=True)
             
             # Create initial tool and store it
-            print(f"DEBUG: About to load default image: {default_image}", flush=True)
             logger.info(f"Loading default image: {default_image}")
             self._load_image(default_image)
-            print("DEBUG: Default image loaded successfully", flush=True)
             logger.info("✓ Default image loaded")
             
             # Create template
@@ -520,149 +549,24 @@ class InteractiveSVSApp:
 
             # Add custom CSS for input box styling and settings modal
             logger.info("Adding custom CSS...")
-            self.template.config.raw_css.append("""
-            .custom-number-input input[type="text"] {
-                background-color: #ffc107 !important;
-                color: #000000 !important;
-                border: 3px solid #ffffff !important;
-                font-weight: bold !important;
-                font-size: 14px !important;
-                text-align: center !important;
-                box-shadow: 0 2px 5px rgba(0,0,0,0.4) !important;
-                padding: 6px 10px !important;
-                margin-top: 54px !important;
-            }
-            .custom-number-input input[type="text"]:focus {
-                background-color: #ffc107 !important;
-                color: #000000 !important;
-                outline: 2px solid #ffffff !important;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.6) !important;
-            }
-                                                
-            /* Image name with tooltip */
-            .image-name-tooltip {
-                position: relative;
-                cursor: help;
-            }
-            .image-name-tooltip:hover::after {
-                content: attr(data-full-name);
-                position: absolute;
-                top: 100%;
-                left: 0;
-                margin-top: 5px;
-                padding: 8px 12px;
-                background-color: #000000;
-                color: #ffffff;
-                font-size: 12px;
-                white-space: nowrap;
-                border-radius: 4px;
-                z-index: 10000;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.5);
-            }
-            
-            /* Settings Modal Styles */
-            #settings-modal-placeholder {
-                position: fixed !important;
-                top: 50% !important;
-                left: 50% !important;
-                transform: translate(-50%, -50%) !important;
-                z-index: 10000 !important;
-                background: white !important;
-                border-radius: 8px !important;
-                box-shadow: 0 8px 32px rgba(0, 0, 0, 0.4) !important;
-                max-height: 90vh !important;
-                max-width: 90vw !important;
-                overflow: auto !important;
-                display: none !important;
-                width: 850px;
-                padding: 20px;
-            }
-            #settings-modal-placeholder.show {
-                display: block !important;
-            }
-            #settings-backdrop {
-                display: none;
-                position: fixed;
-                top: 0;
-                left: 0;
-                width: 100vw;
-                height: 100vh;
-                background: rgba(0, 0, 0, 0.6);
-                z-index: 9998;
-            }
-            #settings-backdrop.show {
-                display: block !important;
-            }
-            """)
+            self.template.config.raw_css.append(APP_RAW_CSS)
 
             
-            print("DEBUG: Template created from current_tool", flush=True)
             logger.info("Template created from current_tool")
             
-            # Create settings button and modal
-            print("DEBUG: About to create settings button and modal", flush=True)
-            try:
-                logger.info("Creating settings button and modal...")
-                print("DEBUG: Calling create_settings_button_and_modal function", flush=True)
-                self.settings_button, self.settings_modal = create_settings_button_and_modal(
-                    self.shortcut_manager,
-                    on_save_callback=self._on_shortcuts_saved
-                )
-                print(f"DEBUG: Settings button created: {self.settings_button}", flush=True)
-                print(f"DEBUG: Settings modal created: {self.settings_modal}", flush=True)
-                logger.info("✓ Settings button and modal created successfully")
-            except Exception as e:
-                print(f"DEBUG: Exception creating settings button: {e}", flush=True)
-                logger.error(f"❌ Error creating settings button: {e}", exc_info=True)
-                # Create a dummy button as fallback
-                self.settings_button = pn.widgets.Button(name="⚙️", button_type="light", width=40, height=35)
-                self.settings_modal = pn.Column(visible=False)
-                print("DEBUG: Created fallback button", flush=True)
+            # Settings button and modal are created on first use of settings_button/settings_modal
+            # (the button is not in the header at the moment)
+            self._settings_button = None
+            self._settings_modal = None
             
-            # Add selector with Previous/Next buttons, then image name, status buttons, status title, then control buttons
-            print("DEBUG: About to add elements to template header", flush=True)
-            print(f"DEBUG: Settings button before adding to header: {self.settings_button}", flush=True)
-            self.template.header.append(
-                pn.Row(
-                    self.current_tool.button_row_live_tracking,
-                    pn.layout.HSpacer(),
-                    pn.Column(self.image_name_display),
-                    pn.layout.HSpacer(),
-                    pn.Column(self.status_title), 
-                    pn.layout.HSpacer(),                
-                    self.ink_found_button, 
-                    self.done_button,
-                    pn.layout.HSpacer(),
-                    self.prev_image_button,
-                    self.image_index_input,
-                    self.next_image_button,
-                    self.image_total_num_display,
-                    
-                    #self.image_selector,
-                    
-                    pn.layout.HSpacer(),
-                    self.current_tool.button_row_saved_views,
-                    self.saved_views_counter,
-                    pn.layout.HSpacer(width=20),
-                    self.help_button,
-                    #self.settings_button,
-                    sizing_mode='scale_width',
-                    align='center'
-                )
-            )
-            print("DEBUG: Elements added to template header successfully", flush=True)
+            # The header carries most of the widgets and their stylesheets; fill it once
+            # the page has loaded so the viewer is not held back by it
+            pn.state.onload(self._build_header)
             
             # Add help trigger to main
-            print("DEBUG: About to add help_trigger to main", flush=True)
             self.template.main.append(self.help_trigger)
             
-            # Add the actual modal content (placeholders already in template from create_dashboard)
-            print("DEBUG: Adding modal content", flush=True)
-            self.template.main.append(self.settings_modal)
-            print(f"DEBUG: Modal content added", flush=True)
-            
             logger.info(f"Image selector with navigation buttons added to header")
-            print("DEBUG: Header setup complete", flush=True)
             
             # Store reference to parent app in current_tool for keyboard shortcuts
             self.current_tool.parent_app = self
@@ -672,6 +576,37 @@ class InteractiveSVSApp:
             logger.info("✓ Callback registered on image_selector.value parameter")
             logger.info("=" * 80)
     
+    def _build_header(self):
+        """Add the navigation/status controls to the template header"""
+        # Add selector with Previous/Next buttons, then image name, status buttons, status title, then control buttons.
+        # The children are collected first so the header gets one finished row in a single update
+        spacer = pn.layout.HSpacer
+        header_children = [
+            self.current_tool.button_row_live_tracking,
+            spacer(),
+            pn.Column(self.image_name_display),
+            spacer(),
+            pn.Column(self.status_title),
+            spacer(),
+            self.ink_found_button,
+            self.done_button,
+            spacer(),
+            self.prev_image_button,
+            self.image_index_input,
+            self.next_image_button,
+            self.image_total_num_display,
+            #self.image_selector,
+            spacer(),
+            self.current_tool.button_row_saved_views,
+            self.saved_views_counter,
+            spacer(width=20),
+            self.help_button,
+            #self.settings_button,
+        ]
+        # Kept so an image switch can swap in the new tool's button rows
+        self._header_row = pn.Row(*header_children, sizing_mode='scale_width', align='center')
+        self.template.header[:] = [self._header_row]
+    
     def get_image_index_by_name(self, image_name):
         """
         Get numeric index (0, 1, 2, ...) for a given image name.
@@ -682,17 +617,42 @@ class InteractiveSVSApp:
         Returns:
             int: Numeric index, or None if not found
         """
-        available_images = self.available_images
-        
         # Remove .svs extension if present
         search_name = image_name.replace('.svs', '')
         
-        # Find the image by name
-        for idx, img in enumerate(available_images):
-            if img['name'] == search_name:
-                return idx
+        return self._name_to_index.get(search_name, 0)
+    
+    @property
+    def settings_button(self):
+        """Settings (keyboard shortcuts) button, created together with its modal on first use"""
+        if self._settings_button is None:
+            self._create_settings()
+        return self._settings_button
+    
+    @property
+    def settings_modal(self):
+        """Settings modal, created together with its button on first use"""
+        if self._settings_modal is None:
+            self._create_settings()
+        return self._settings_modal
+    
+    def _create_settings(self):
+        """Create the settings button and modal and add the modal to the page"""
+        try:
+            logger.info("Creating settings button and modal...")
+            self._settings_button, self._settings_modal = create_settings_button_and_modal(
+                self.shortcut_manager,
+                on_save_callback=self._on_shortcuts_saved
+            )
+            logger.info("✓ Settings button and modal created successfully")
+        except Exception as e:
+            logger.error(f"❌ Error creating settings button: {e}", exc_info=True)
+            # Create a dummy button as fallback
+            self._settings_button = pn.widgets.Button(name="⚙️", button_type="light", width=40, height=35)
+            self._settings_modal = pn.Column(visible=False)
         
-        return 0
+        # Add the actual modal content (placeholders already in template from create_dashboard)
+        self.template.main.append(self._settings_modal)
     
     def _on_shortcuts_saved(self):
         """Callback when keyboard shortcuts are saved"""
@@ -714,58 +674,47 @@ class InteractiveSVSApp:
     def _load_prev_image(self, event=None):
         """Load the previous image in the list"""
         if self.current_image_index > 0:
-            self.current_image_index -= 1
-            new_image_path = self.available_images[self.current_image_index]['svs_path']
-            
-            logger.info(f"◀ Loading previous image: {os.path.basename(new_image_path)}")
-            
-            # Update selector (this will trigger _on_selection_change)
-            self.image_selector.value = new_image_path
-            
-            # Update button states
-            self._update_navigation_buttons()
+            logger.info("◀ Loading previous image: %s", self._basenames[self.current_image_index - 1])
+            self._go_to_image(self.current_image_index - 1)
 
     def _load_next_image(self, event=None):
         """Load the next image in the list"""
         if self.current_image_index < len(self.available_images) - 1:
-            self.current_image_index += 1
-            new_image_path = self.available_images[self.current_image_index]['svs_path']
-            
-            logger.info(f"▶ Loading next image: {os.path.basename(new_image_path)}")
-            
-            # Update selector (this will trigger _on_selection_change)
-            self.image_selector.value = new_image_path
-            
-            # Update button states
-            self._update_navigation_buttons()
+            logger.info("▶ Loading next image: %s", self._basenames[self.current_image_index + 1])
+            self._go_to_image(self.current_image_index + 1)
+    
+    def _go_to_image(self, index):
+        """Switch to the image at index, keeping the selector in sync without going through its callback"""
+        new_image_path = self._image_paths[index]
+        with pn.io.hold():
+            # The selector write would otherwise re-enter _on_selection_change for the same switch
+            self._suppress_selection_cb = True
+            try:
+                self.image_selector.value = new_image_path
+            finally:
+                self._suppress_selection_cb = False
+            self._switch_image(new_image_path)
 
     def _on_index_text_change(self, event):
-        """Load image by direct text input"""
+        """Load image by direct text input (fires on Enter/blur, so no debounce is needed)"""
+        value = event.new
         try:
             # Convert text to integer
-            requested_index = int(event.new) - 1
+            requested_index = int(value) - 1
             
             # Validate range
             if requested_index < 0 or requested_index >= len(self.available_images):
-                logger.warning(f"Invalid index: {event.new} (valid range: 1-{len(self.available_images)})")
+                logger.warning(f"Invalid index: {value} (valid range: 1-{len(self.available_images)})")
                 # Reset to current valid index
                 self.image_index_input.value = str(self.current_image_index + 1)
                 return
             
             # Only load if different from current
             if requested_index != self.current_image_index:
-                self.current_image_index = requested_index
-                new_image_path = self.available_images[self.current_image_index]['svs_path']
-                
-                logger.info(f"🔢 Loading image by index: {event.new} ({os.path.basename(new_image_path)})")
-                
-                # Update selector (this will trigger _on_selection_change)
-                self.image_selector.value = new_image_path
-                
-                # Update button states
-                self._update_navigation_buttons()
+                logger.info("🔢 Loading image by index: %s (%s)", value, self._basenames[requested_index])
+                self._go_to_image(requested_index)
         except ValueError:
-            logger.warning(f"Invalid input: {event.new} (must be a number)")
+            logger.warning(f"Invalid input: {value} (must be a number)")
             # Reset to current valid index
             self.image_index_input.value = str(self.current_image_index + 1)
         except Exception as e:
@@ -775,18 +724,28 @@ class InteractiveSVSApp:
 
     
     def _load_image(self, svs_path):
-        """Load a new image and create new tool instance"""
-        logger.info(f"Loading image: {svs_path}")
+        """Load a new image, reusing its tool instance if it was shown recently"""
+        logger.debug("Loading image: %s", svs_path)
         
         # Find the image dictionary to get dzi_path
         dzi_path = None
-        for img in self.available_images:
-            if img['svs_path'] == svs_path:
-                dzi_path = img.get('dzi_path')
-                break
+        idx = self._path_to_index.get(svs_path)
+        if idx is not None:
+            dzi_path = self.available_images[idx].get('dzi_path')
         
-        # Create new tool instance (it will load its own metadata)
-        self.current_tool = SVSAnnotationTool(svs_path, dzi_path=dzi_path, shortcut_manager=self.shortcut_manager)
+        # Reuse a recently shown tool; otherwise create one (it will load its own metadata)
+        tool = self._tool_cache.get(svs_path)
+        if tool is None:
+            tool = SVSAnnotationTool(svs_path, dzi_path=dzi_path, shortcut_manager=self.shortcut_manager)
+            self._tool_cache[svs_path] = tool
+            if len(self._tool_cache) > TOOL_CACHE_SIZE:
+                # The oldest tool was released when it was switched away from
+                self._tool_cache.popitem(last=False)
+        else:
+            self._tool_cache.move_to_end(svs_path)
+            # Another session may have changed the status since this tool was shown
+            tool.reload_status()
+        self.current_tool = tool
         
         # Link parent app to tool for keyboard shortcuts
         self.current_tool.parent_app = self
@@ -796,9 +755,6 @@ class InteractiveSVSApp:
         
         # Update saved views counter
         self.current_tool._update_saved_views_counter()
-        
-        # Update saved views counter
-        self.current_tool._update_saved_views_counter()
     
     def _on_done_click(self, event):
         """Handle Done button click"""
@@ -815,268 +771,87 @@ class InteractiveSVSApp:
         if not self.current_tool:
             return
         
-        # Update Done button style and text
-        if self.current_tool.done_status:
-            self.done_button.button_type = 'success'
-            self.done_button.name = 'Done'
-        else:
-            self.done_button.button_type = 'default'
-            self.done_button.name = 'To Do'
-        
-        # Update Ink Found button style and text based on three states:
-        # 1. Done=False → blank/hidden (show empty text)
-        # 2. Done=True, Ink=False → "Ink Not Found"
-        # 3. Done=True, Ink=True → "Ink Found"
-        if not self.current_tool.done_status:
-            # State 1: To Do (blank ink status)
-            self.ink_found_button.button_type = 'default'
-            self.ink_found_button.name = ''  # Blank
-        elif self.current_tool.ink_found_status:
-            # State 3: Done with ink found
-            self.ink_found_button.button_type = 'success'
-            self.ink_found_button.name = 'Ink Found'
-        else:
-            # State 2: Done without ink
-            self.ink_found_button.button_type = 'success'
-            self.ink_found_button.name = 'Ink Not Found'
+        done_type, done_name, ink_type, ink_name = STATUS_BUTTON_STATES[
+            (bool(self.current_tool.done_status), bool(self.current_tool.ink_found_status))
+        ]
+        # Unchanged values are not re-sent; each button changes in one batched update
+        self.done_button.param.update(button_type=done_type, name=done_name)
+        self.ink_found_button.param.update(button_type=ink_type, name=ink_name)
         
-        logger.info(f"Updated status buttons: done={self.current_tool.done_status} ({self.done_button.name}), ink_found={self.current_tool.ink_found_status} ({self.ink_found_button.name})")
+        logger.debug("Updated status buttons: done=%s (%s), ink_found=%s (%s)",
+                     self.current_tool.done_status, self.done_button.name,
+                     self.current_tool.ink_found_status, self.ink_found_button.name)
     
     def _update_status_title(self):
         """Update status title with current counts"""
         done_count, ink_found_count = get_status_counts()
         self.status_title.object = f"**Total: Done: {done_count} Ink Images: {ink_found_count}**"
-        logger.info(f"Updated status title: Done={done_count}, Ink Area={ink_found_count}")
+        logger.debug("Updated status title: Done=%s, Ink Area=%s", done_count, ink_found_count)
     
     def _show_help_modal(self, event=None):
         """Show help modal using JavaScript"""
-        print("🔔 Help button clicked!", flush=True)
-        logger.info("🔔 Help button clicked!")
-        
-        # Create HTML with JavaScript that shows a modal dialog
         # Add timestamp to force re-execution each time
-        import time
-        timestamp = int(time.time() * 1000)
-        
-        help_html = f'''
-        <script id="help-script-{timestamp}">
-        (function() {{
-            // Remove existing modal if present
-            const existing = document.getElementById('help-modal-overlay');
-            if (existing) {{
-                existing.remove();
-            }}
-            
-            // Create modal HTML
-            const modalHTML = `
-                <div id="help-modal-overlay" style="
-                    position: fixed;
-                    top: 0;
-                    left: 0;
-                    width: 100%;
-                    height: 100%;
-                    background-color: rgba(0, 0, 0, 0.8);
-                    z-index: 99999;
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    font-family: Arial, sans-serif;
-                ">
-                    <div style="
-                        background-color: white;
-                        border-radius: 10px;
-                        box-shadow: 0 4px 20px rgba(0,0,0,0.5);
-                        max-width: 700px;
-                        max-height: 90vh;
-                        overflow-y: auto;
-                        position: relative;
-                    ">
-                        <div style="
-                            background-color: #170f90;
-                            color: white;
-                            padding: 20px;
-                            border-radius: 10px 10px 0 0;
-                            position: sticky;
-                            top: 0;
-                            z-index: 1;
-                        ">
-                            <h2 style="margin: 0; font-size: 24px;">⌨️ Keyboard Shortcuts </h2>
-                            <button onclick="document.getElementById('help-modal-overlay').remove()" style="
-                                position: absolute;
-                                top: 15px;
-                                right: 15px;
-                                background-color: #dc3545;
-                                color: white;
-                                border: none;
-                                border-radius: 5px;
-                                padding: 8px 15px;
-                                cursor: pointer;
-                                font-size: 16px;
-                                font-weight: bold;
-                            ">✕</button>
-                        </div>
-                        <div style="padding: 30px; line-height: 1.8;">
-                            <h3 style="color: #170f90; margin-top: 0;">Navigation</h3>
-                            <ul style="list-style: none; padding-left: 0;">
-                                <li><strong>←</strong> [◀ Button] : Switch to previous image in dataset</li>
-                                <li><strong>→</strong> [▶ Button] : Switch to next image in dataset</li>
-                                <li><strong>Ctrl/Cmd + R</strong> [Reset View Button] : Reset zoom and center view</li>
-                                <li><strong>V</strong> : Show/hide overview minimap</li>
-                            </ul>
-                            
-                            <h3 style="color: #170f90;">Annotation and StatusControl</h3>
-                            <ul style="list-style: none; padding-left: 0;">
-                                <li><strong>Ctrl/Cmd + Z</strong> [⟲ UNDO Button] : Revert to previous annotation state</li>
-                                <li><strong>Ctrl/Cmd + A</strong></strong> [⟳ REDO Button] : Restore undone annotation</li>
-                                <li><strong>S</strong> [💾 SAVE Button] : Save current annotation and Mark image as complete and Ink found</li>
-                                <!-- <li><strong>Ctrl/Cmd + ←</strong> [◀ Button] : Load previous saved annotation view</li> --> 
-                                <!-- <li><strong>Ctrl/Cmd + →</strong> [▶ Button] : Load next saved annotation view</li> -->
-                                <li><strong>D</strong> [Done Button] : Mark image as complete/incomplete</li>
-                            </ul>
-                            
-                            <h3 style="color: #170f90;">Drawing Tools</h3>
-                            <ul style="list-style: none; padding-left: 0;">
-                                <li><strong>Shift</strong> : Hold while dragging to draw annotations</li>
-                                <li><strong>Click + Backspace</strong> : Remove selected annotation line</li>
-                                <li><strong>Ctrl/Cmd + Alt + Backspace</strong> [🗑️ Clear All Button] : Clear all drawings</li>
-                                <li><strong>1-5</strong> : Adjust drawing line width (1=thin, 5=thick)</li>
-                                <li><strong>C</strong> : Change annotation line color</li>
-                            </ul>
-                            
-                            <hr style="margin: 20px 0; border: none; border-top: 2px solid #ddd;">
-                            <p style="text-align: center; color: #666;"><strong>Total Shortcuts: 16</strong></p>
-                        </div>
-                    </div>
-                </div>
-            `;
-            
-            // Add modal to body
-            document.body.insertAdjacentHTML('beforeend', modalHTML);
-            
-            console.log('Help modal displayed - timestamp: {timestamp}');
-        }})();
-        </script>
-        '''
-        
-        self.help_trigger.object = help_html
-        print("✓ Help modal triggered", flush=True)
-        logger.info("✓ Help modal triggered")
+        script = HELP_MODAL_SHOW_SCRIPT if self._help_modal_sent else HELP_MODAL_SCRIPT
+        self._help_modal_sent = True
+        self.help_trigger.object = script.format(timestamp=int(time.time() * 1000))
     
     def _on_selection_change(self, event):
         """Handle image selection change"""
-        print("=" * 80, flush=True)
-        print(f"🔄 SELECTION CHANGE TRIGGERED", flush=True)
-        print(f"Old value: {event.old}", flush=True)
-        print(f"New value: {event.new}", flush=True)
-        print("=" * 80, flush=True)
+        if self._suppress_selection_cb:
+            # _go_to_image switches the image itself
+            return
+        logger.debug("Selection change: %s -> %s", event.old, event.new)
 
+        # Nothing to do if the selection points at the image already loaded
+        if self.current_tool and self.current_tool.svs_path == event.new:
+            logger.debug("Selected image is already loaded - nothing to do")
+            return
+
+        # Hold document events so the browser gets the whole switch as one patch
+        with pn.io.hold():
+            self._switch_image(event.new)
+    
+    def _switch_image(self, svs_path):
+        """Show svs_path in the existing viewer and header"""
         # Update current index based on selection
-        for idx, img in enumerate(self.available_images):
-            if img['svs_path'] == event.new:
-                self.current_image_index = idx
-                break
+        idx = self._path_to_index.get(svs_path)
+        if idx is not None:
+            self.current_image_index = idx
         
         # Update button states
         self._update_navigation_buttons()
 
-        # Load new image
-        print("Step 1: Loading new image...", flush=True)
-        logger.info("Step 1: Loading new image...")
-        self._load_image(event.new)
-        filename = os.path.basename(event.new)
-        cache.set(cache_key, filename)
-
-        # Update image name display
-        current_image_name = os.path.basename(event.new).replace('.svs', '')
-        self.image_total_num_display.object = f"Total: {len(self.available_images)}"
+        # Saved views of the previous image are no longer needed
+        clear_saved_view_cache()
 
+        # The displayed viewer stays in the page; the previous tool lets go of it first
+        viewer = self.template.main[0]
+        old_tool = self.current_tool
+        old_tool.release()
 
-        # Smart truncation for display
-        max_display_length = 60
-        if len(current_image_name) > max_display_length:
-            display_name = current_image_name[:30] + '...' + current_image_name[-25:]
-        else:
-            display_name = current_image_name
-        
-        self.image_name_display.object = f"**Image:** {display_name}"
+        # Load new image
+        self._load_image(svs_path)
+        filename = os.path.basename(svs_path)
+        _cache_writer.submit(cache.set, cache_key, filename)
 
-        print("Image Reloaed")
-        if pn.state.location:
-            pn.state.location.reload = True
+        # Update image name display (the total is fixed and set once at startup)
+        self.image_name_display.object = f"**Image:** {self._display_short[self.current_image_index]}"
 
-        print(f"  ✓ New tool created for: {os.path.basename(event.new)}", flush=True)
-        print(f"  ✓ New tool dimensions: {self.current_tool.dimensions}", flush=True)
+        # Hand the displayed viewer to the new tool - DON'T replace it, its parameters are
+        # updated in place and the dzi_url change re-initializes the map in the browser
+        if self.current_tool.button_row_live_tracking is None:
+            self.current_tool.create_controls()
+        self.current_tool.adopt_viewer(viewer)
 
+        # Swap the new tool's buttons into the header (if it has been built yet)
+        header_row = getattr(self, '_header_row', None)
+        if header_row is not None:
+            objects = list(header_row.objects)
+            objects[objects.index(old_tool.button_row_live_tracking)] = self.current_tool.button_row_live_tracking
+            objects[objects.index(old_tool.button_row_saved_views)] = self.current_tool.button_row_saved_views
+            header_row.objects = objects
         
-        # Create completely new dashboard
-        logger.info("Step 2: Creating new dashboard...")
-        new_dashboard = self.current_tool.create_dashboard()
-        logger.info(f"  ✓ Dashboard created")
-        print(f"  - Dashboard has {len(new_dashboard.main)} main items", flush=True)
-        logger.info(f"  - Dashboard has {len(new_dashboard.sidebar)} sidebar items")
-        
-        # Log sidebar contents
-        print("Step 3: Inspecting new dashboard sidebar...", flush=True)
-        logger.info("Step 3: Inspecting new dashboard sidebar...")
-        for i, item in enumerate(new_dashboard.sidebar):
-            item_type = type(item).__name__
-            if hasattr(item, 'object'):
-                content_preview = str(item.object)[:200]
-            else:
-                content_preview = str(item)[:200]
-            print(f"  Sidebar[{i}]: {item_type}", flush=True)
-            print(f"    Content: {content_preview}", flush=True)
-            logger.info(f"  Sidebar[{i}]: {item_type}")
-            logger.info(f"    Content: {content_preview}")
-        
-        # Update the main viewer - DON'T replace, just update parameters
-        logger.info("Step 4: Updating viewer parameters in place...")
-        new_viewer = new_dashboard.main[0] if new_dashboard.main else None
-        
-        if new_viewer:
-            old_viewer = self.template.main[0] if self.template.main else None
-            logger.info(f"  - Old viewer exists: {old_viewer is not None}")
-            logger.info(f"  - New viewer exists: {new_viewer is not None}")
-            
-            if old_viewer and hasattr(old_viewer, 'dzi_url'):
-                # Update all viewer parameters IN PLACE (don't replace the viewer)
-                logger.info(f"  - Old dzi_url: {old_viewer.dzi_url}")
-                logger.info(f"  - New dzi_url: {new_viewer.dzi_url}")
-                
-                # Only reload if DZI URL actually changed
-                dzi_changed = old_viewer.dzi_url != new_viewer.dzi_url
-                
-                if dzi_changed:
-                    print(f"🔄 Updating viewer from {old_viewer.dzi_url} to {new_viewer.dzi_url}", flush=True)
-                else:
-                    print(f"ℹ️  DZI URL unchanged: {old_viewer.dzi_url}", flush=True)
-                    logger.info(f"  ℹ️  DZI URL unchanged, skipping reload")
-                
-                old_viewer.dzi_url = new_viewer.dzi_url
-                old_viewer.width_px = new_viewer.width_px
-                old_viewer.height_px = new_viewer.height_px
-                old_viewer.max_zoom = new_viewer.max_zoom
-                old_viewer.start_level = new_viewer.start_level
-                old_viewer.center_offset_y = new_viewer.center_offset_y
-                old_viewer.level_dimensions = new_viewer.level_dimensions
-                
-                # Note: dzi_url watch will automatically trigger map reload when DZI changes
-                if dzi_changed:
-                    print(f"  ✓ DZI URL updated, map will reload automatically", flush=True)
-                    logger.info(f"  ✓ DZI URL updated, map will reload via dzi_url watch")
-                else:
-                    print(f"  ℹ️  DZI URL unchanged, no reload needed", flush=True)
-                    logger.info(f"  ℹ️  DZI URL unchanged, no reload needed")
-
-                # No sidebar to update - sidebar is hidden
-                logger.info("Step 5: Skipping sidebar update (sidebar is hidden)")
-                print(f"  ℹ️  Sidebar hidden, no update needed", flush=True)
-                logger.info("  ℹ️ Main viewer kept (not replaced) - parameters updated in place")
-            
-                logger.info("=" * 80)
-                logger.info(f"✅ SUCCESSFULLY SWITCHED TO: {os.path.basename(event.new)}")
-                logger.info("=" * 80)
-                print(f"✅ SUCCESSFULLY SWITCHED TO: {os.path.basename(event.new)}", flush=True)
+        logger.info("Switched to image: %s", filename)
     
     def get_template(self):
         """Get the template with selector"""
@@ -1092,7 +867,6 @@ def get_token_from_url():
         if hasattr(pn.state, 'location') and pn.state.location:
             query_params = pn.state.location.search[1:] if pn.state.location.search else ""
             if query_params:
-                from urllib.parse import parse_qs
                 params = parse_qs(query_params)
                 token = params.get('token', [None])[0]
                 logger.info(f"0003_Token extracted from URL: {'present' if token else 'missing'}")
@@ -1279,7 +1053,7 @@ def monitor_sessions():
                     session_id_only = session_key_str.replace(session_key_prefix, "")
                     data = cache.get(session_id_only)
                     if data:
-                        data_dict = json.loads(data) if isinstance(data, str) else data
+                        data_dict = json_loads(data) if isinstance(data, str) else data
                         logger.info(f"  - {data_dict.get('tab_id', 'unknown')}: User {data_dict.get('user_id', 'unknown')}")
                 except Exception as e:
                     logger.error(f"Error reading session: {e}")
@@ -4,6 +4,7 @@ Provides token validation, session management, and user isolation.
 """
 
 import os
+import time
 import redis
 from typing import Optional, Dict
 from functools import wraps
@@ -11,6 +12,10 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# A validated token's Redis session is rewritten at most this often (seconds);
+# page loads in between reuse the session written last time
+SESSION_REFRESH_INTERVAL = 60
+
 
 class TokenAuthManager:
     """Manages token-based authentication and user sessions"""
@@ -19,6 +24,7 @@ class TokenAuthManager:
         self.enabled = os.getenv('ENABLE_TOKEN_AUTH', 'false').lower() == 'true'
         self.session_timeout = int(os.getenv('SESSION_TIMEOUT', '36000'))
         self.tokens = self._load_tokens()
+        self._session_written = {}  # token -> time.monotonic() of its last session write
         
         # Redis connection for session management
         try:
@@ -70,13 +76,20 @@ class TokenAuthManager:
         if user_id and self.redis_client:
             # Create/update session in Redis
             session_key = f"session:{token}"
+            now = time.monotonic()
             try:
-                self.redis_client.setex(
-                    session_key,
-                    self.session_timeout,
-                    user_id
-                )
-                logger.info(f"✓ Token validated for user: {user_id}")
+                if now - self._session_written.get(token, -SESSION_REFRESH_INTERVAL) >= SESSION_REFRESH_INTERVAL:
+                    self.redis_client.setex(
+                        session_key,
+                        self.session_timeout,
+                        user_id
+                    )
+                    self._session_written[token] = now
+                    logger.info(f"✓ Token validated for user: {user_id}")
+                else:
+                    # Written recently, but the key may since have been evicted, lost in a
+                    # Redis restart or invalidated by another worker: recreate it only if missing
+                    self.redis_client.set(session_key, user_id, ex=self.session_timeout, nx=True)
             except Exception as e:
                 logger.error(f"Failed to create session: {e}")
         elif not user_id:
@@ -109,6 +122,7 @@ class TokenAuthManager:
             return
         
         session_key = f"session:{token}"
+        self._session_written.pop(token, None)
         try:
             self.redis_client.delete(session_key)
             logger.info(f"Session invalidated for token: {token[:8]}...")
@@ -14,6 +14,9 @@ app = Flask(__name__)
 # Base directory for DZI files
 DZI_BASE_DIR = "/data/dzi_datasets"
 
+# Tile file extensions convert_to_dzi.py can write (--format png/jpeg/webp)
+TILE_EXTENSIONS = ('.png', '.jpg', '.webp')
+
 # HTML template for directory listing
 DIRECTORY_TEMPLATE = """
 <!DOCTYPE html>
@@ -67,7 +70,7 @@ def serve_file(filepath):
         
         if not os.path.exists(file_path):
             # Suppress logging for expected missing edge tiles (PNG files in _files directories)
-            if not (filepath.endswith('.png') and '_files/' in filepath):
+            if not (filepath.endswith(TILE_EXTENSIONS) and '_files/' in filepath):
                 logger.warning(f"File not found: {filepath}")
             abort(404)
         
@@ -79,7 +82,7 @@ def serve_file(filepath):
         directory = os.path.dirname(file_path)
         filename = os.path.basename(file_path)
         # Only log non-tile files to reduce noise
-        if not filepath.endswith('.png'):
+        if not filepath.endswith(TILE_EXTENSIONS):
             logger.info(f"Serving file: {filepath}")
         return send_from_directory(directory, filename)
         
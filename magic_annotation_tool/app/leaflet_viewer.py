@@ -13,6 +13,21 @@ from dotenv import load_dotenv
 from utility import *
 
 
+# Feature modules inlined into the after_layout script (read once at import)
+FEATURES_DIR = os.path.join(os.path.dirname(__file__), '..', 'Features')
+
+
+def _read_feature_js(filename):
+    """Read a JavaScript module from the Features directory"""
+    with open(os.path.join(FEATURES_DIR, filename), 'r') as f:
+        return f.read()
+
+
+FREEHAND_DRAWING_JS = _read_feature_js('freehand_drawing.js')
+SCALE_BAR_JS = _read_feature_js('scale_bar.js')
+MINIMAP_OVERVIEW_JS = _read_feature_js('minimap_overview.js')
+
+
 class SVSLeafletViewer(ReactiveHTML):
     """
     Interactive SVS viewer using Leaflet for smooth pan and zoom.
@@ -33,7 +48,9 @@ class SVSLeafletViewer(ReactiveHTML):
 
     center = param.List(default=[0, 0], doc="Current center of the map [lat, lng]")
     
-    level_dimensions = param.List(default=[], doc="List of [width, height] for each pyramid level")
+    level_dimensions_json = param.String(default='[]', doc="JSON list of [width, height] for each pyramid level")
+    
+    tile_format = param.String(default='png', doc="File extension of the DZI tiles (png, jpg or webp)")
     
     # Metadata-driven parameters for automatic configuration
     start_level = param.Integer(default=11, doc="DZI level to use as Leaflet zoom 0")
@@ -64,6 +81,7 @@ class SVSLeafletViewer(ReactiveHTML):
     next_saved_trigger = param.Integer(default=0, doc="Load next saved view")
     keyboard_trigger = param.String(default='', doc="Keyboard shortcut trigger")
     image_nav_trigger = param.String(default='', doc="Image navigation keyboard trigger")
+    minimap_trigger = param.Integer(default=0, doc="Trigger minimap visibility toggle")
     
     # Keyboard shortcuts configuration (JSON string)
     shortcuts_config = param.String(default='', doc="JSON string of keyboard shortcuts configuration")
@@ -120,6 +138,10 @@ class SVSLeafletViewer(ReactiveHTML):
         'after_layout': """
             console.log('=== after_layout v11.0: Dynamic Keyboard Shortcuts + MiniMap + Freehand Drawing ===');
             
+            // Debug logging on hot paths (per tile, per zoom, per annotation load);
+            // one-shot initialization logs are always on
+            const DEBUG = false;
+            
             // Parse shortcuts configuration from Python
             let shortcuts = {};
             try {
@@ -131,51 +153,68 @@ class SVSLeafletViewer(ReactiveHTML):
                 console.error('Error parsing shortcuts config:', e);
             }
             
-            // Helper function to check if key combination matches
-            function matchesKeyCombination(event, keyCombo) {
-                const parts = keyCombo.split('+');
-                let hasCtrl = false, hasCmd = false, hasAlt = false, hasShift = false;
-                let mainKey = null;
-                
-                for (const part of parts) {
-                    const partLower = part.toLowerCase();
-                    if (partLower === 'ctrl') hasCtrl = true;
-                    else if (partLower === 'cmd' || partLower === 'meta') hasCmd = true;
-                    else if (partLower === 'alt') hasAlt = true;
-                    else if (partLower === 'shift') hasShift = true;
-                    else mainKey = part;
-                }
-                
-                // Check modifiers
-                const ctrlMatch = hasCtrl || hasCmd ? (event.ctrlKey || event.metaKey) : (!event.ctrlKey && !event.metaKey);
-                const altMatch = hasAlt ? event.altKey : !event.altKey;
-                const shiftMatch = hasShift ? event.shiftKey : !event.shiftKey;
-                
-                // Check main key
-                let keyMatch = false;
-                if (mainKey) {
-                    keyMatch = event.key.toLowerCase() === mainKey.toLowerCase();
+            // Modifier bitmask shared by the shortcut index and the keydown handler
+            function modifierMask(ctrl, alt, shift) {
+                return (ctrl ? 1 : 0) | (alt ? 2 : 0) | (shift ? 4 : 0);
+            }
+            
+            // Precompile shortcuts once into "mask:key" -> action, so a keydown
+            // is a single Map lookup instead of re-parsing every combination
+            const shortcutIndex = new Map();
+            for (const [actionName, config] of Object.entries(shortcuts)) {
+                for (const keyCombo of config.keys || []) {
+                    let hasCtrl = false, hasAlt = false, hasShift = false;
+                    let mainKey = null;
+                    
+                    for (const part of keyCombo.split('+')) {
+                        const partLower = part.toLowerCase();
+                        if (partLower === 'ctrl' || partLower === 'cmd' || partLower === 'meta') hasCtrl = true;
+                        else if (partLower === 'alt') hasAlt = true;
+                        else if (partLower === 'shift') hasShift = true;
+                        else mainKey = partLower;
+                    }
+                    
+                    // Combinations without a main key never match; first definition wins
+                    const indexKey = modifierMask(hasCtrl, hasAlt, hasShift) + ':' + mainKey;
+                    if (mainKey && !shortcutIndex.has(indexKey)) {
+                        shortcutIndex.set(indexKey, { action: config.action || actionName, keyCombo: keyCombo });
+                    }
                 }
-                
-                return ctrlMatch && altMatch && shiftMatch && keyMatch;
             }
             
             // Keyboard shortcuts handler - set up once
             if (!window.keyboardShortcutsRegistered) {
+                // Shortcuts reach Python at most once per SHORTCUT_MIN_INTERVAL ms (a press
+                // inside the interval is sent at its end, latest press wins), and held keys
+                // only auto-repeat for actions that are safe to repeat
+                const SHORTCUT_MIN_INTERVAL = 80;
+                const REPEATABLE_ACTIONS = new Set(['undo', 'redo']);
+                let pendingShortcut = null;
+                let shortcutTimer = null;
+                let lastShortcutFired = -Infinity;
+                
+                function fireShortcut() {
+                    shortcutTimer = null;
+                    lastShortcutFired = performance.now();
+                    data.keyboard_trigger = pendingShortcut;
+                    pendingShortcut = null;
+                }
+                
                 document.addEventListener('keydown', function(e) {
-                    // Check each configured shortcut
-                    for (const [actionName, config] of Object.entries(shortcuts)) {
-                        const keys = config.keys || [];
+                    const mask = modifierMask(e.ctrlKey || e.metaKey, e.altKey, e.shiftKey);
+                    const hit = shortcutIndex.get(mask + ':' + e.key.toLowerCase());
+                    if (hit) {
+                        e.preventDefault();
+                        if (e.repeat && !REPEATABLE_ACTIONS.has(hit.action)) return;
                         
-                        // Check if any of the key combinations match
-                        for (const keyCombo of keys) {
-                            if (matchesKeyCombination(e, keyCombo)) {
-                                e.preventDefault();
-                                const action = config.action || actionName;
-                                console.log('⌨️  Keyboard:', action, '(' + keyCombo + ')');
-                                data.keyboard_trigger = action;
-                                return; // Exit after first match
-                            }
+                        console.log('⌨️  Keyboard:', hit.action, '(' + hit.keyCombo + ')');
+                        pendingShortcut = hit.action;
+                        if (shortcutTimer) return;  // Already scheduled; it sends the latest press
+                        const wait = lastShortcutFired + SHORTCUT_MIN_INTERVAL - performance.now();
+                        if (wait <= 0) {
+                            fireShortcut();
+                        } else {
+                            shortcutTimer = setTimeout(fireShortcut, wait);
                         }
                     }
                 });
@@ -184,13 +223,13 @@ class SVSLeafletViewer(ReactiveHTML):
             }
             
             // Inline freehand drawing module
-            """ + open(os.path.join(os.path.dirname(__file__), '..', 'Features', 'freehand_drawing.js'), 'r').read() + """
+            """ + FREEHAND_DRAWING_JS + """
             
             // Inline scale bar module
-            """ + open(os.path.join(os.path.dirname(__file__), '..', 'Features', 'scale_bar.js'), 'r').read() + """
+            """ + SCALE_BAR_JS + """
             
             // Inline minimap overview module
-            """ + open(os.path.join(os.path.dirname(__file__), '..', 'Features', 'minimap_overview.js'), 'r').read() + """
+            """ + MINIMAP_OVERVIEW_JS + """
             
             // Define DZITileLayer if not already defined (fallback for CDN issues)
             if (typeof DZITileLayer === 'undefined' && typeof L !== 'undefined') {
@@ -199,12 +238,116 @@ class SVSLeafletViewer(ReactiveHTML):
                     getTileUrl: function(coords) {
                         return 'http://localhost:' + data.dzi_server_port + '/' + 
                                data.dzi_url.replace('.dzi', '_files') + '/' + 
-                               coords.z + '/' + coords.x + '_' + coords.y + '.png';
+                               coords.z + '/' + coords.x + '_' + coords.y + '.' + (data.tile_format || 'png');
                     }
                 });
                 console.log('✓ DZITileLayer defined');
             }
             
+            // Custom zoom control with magnification display. Defined once per page (the
+            // class outlives map re-initializations); per-image values come in through options:
+            // startLevel, scaleAtLevel (downsample per DZI level) and baseMag (objective power)
+            function defineCustomZoomControl() {
+                L.Control.CustomZoom = L.Control.extend({
+                    options: {
+                        position: 'topleft'
+                    },
+                    
+                    onAdd: function(map) {
+                        const container = L.DomUtil.create('div', 'leaflet-bar leaflet-control');
+                        container.style.display = 'flex';
+                        container.style.flexDirection = 'column';
+                        container.style.gap = '0';
+                        
+                        // Zoom in button
+                        const zoomInButton = L.DomUtil.create('a', 'leaflet-control-zoom-in', container);
+                        zoomInButton.innerHTML = '+';
+                        zoomInButton.href = '#';
+                        zoomInButton.title = 'Zoom in';
+                        zoomInButton.setAttribute('role', 'button');
+                        zoomInButton.setAttribute('aria-label', 'Zoom in');
+                        
+                        // Magnification display
+                        const magDisplay = L.DomUtil.create('div', 'leaflet-control-zoom-mag', container);
+                        magDisplay.style.backgroundColor = 'white';
+                        magDisplay.style.padding = '2px 8px';
+                        magDisplay.style.textAlign = 'center';
+                        magDisplay.style.fontSize = '12px';
+                        magDisplay.style.fontWeight = 'bold';
+                        magDisplay.style.borderTop = '1px solid #ccc';
+                        magDisplay.style.borderBottom = '1px solid #ccc';
+                        magDisplay.style.cursor = 'default';
+                        magDisplay.innerHTML = '0x';
+                        
+                        // Zoom out button
+                        const zoomOutButton = L.DomUtil.create('a', 'leaflet-control-zoom-out', container);
+                        zoomOutButton.innerHTML = '−';
+                        zoomOutButton.href = '#';
+                        zoomOutButton.title = 'Zoom out';
+                        zoomOutButton.setAttribute('role', 'button');
+                        zoomOutButton.setAttribute('aria-label', 'Zoom out');
+                        
+                        // Event handlers
+                        L.DomEvent.on(zoomInButton, 'click', function(e) {
+                            L.DomEvent.stopPropagation(e);
+                            L.DomEvent.preventDefault(e);
+                            map.zoomIn();
+                        });
+                        
+                        L.DomEvent.on(zoomOutButton, 'click', function(e) {
+                            L.DomEvent.stopPropagation(e);
+                            L.DomEvent.preventDefault(e);
+                            map.zoomOut();
+                        });
+                        
+                        L.DomEvent.disableClickPropagation(container);
+                        L.DomEvent.disableScrollPropagation(container);
+                        
+                        // Refreshed on zoom by updateZoomInfo (one rAF-coalesced update)
+                        this._magDisplay = magDisplay;
+                        this._updateMagDisplay();
+                        
+                        return container;
+                    },
+                    
+                    // Update magnification display
+                    _updateMagDisplay: function(zoom) {
+                        const options = this.options;
+                        if (zoom === undefined) {
+                            zoom = this._map.getZoom();
+                        }
+                        
+                        // Calculate actual magnification based on SVS metadata
+                        // DZI level = startLevel + Leaflet zoom
+                        const dziLevel = options.startLevel + Math.floor(zoom);
+                        
+                        // Base magnification from SVS metadata (e.g., 40×)
+                        const baseMag = options.baseMag;
+                        
+                        // Downsample at this DZI level: 2^(maxZoom - dziLevel)
+                        const downsample = options.scaleAtLevel[dziLevel];
+                        
+                        // Actual magnification = base / downsample
+                        const actualMag = baseMag / downsample;
+                        
+                        // Format based on magnitude
+                        let magText;
+                        if (actualMag >= 1.0) {
+                            // Show whole numbers for 1× and above
+                            magText = actualMag.toFixed(0) + '×';
+                        } else if (actualMag >= 0.01) {
+                            // Show 2-3 decimals for smaller magnifications
+                            magText = actualMag.toFixed(3) + '×';
+                        } else {
+                            // Scientific notation for very small magnifications
+                            magText = actualMag.toExponential(1);
+                        }
+                        
+                        this._magDisplay.innerHTML = magText;
+                    }
+                });
+            }
+            
             // Wait for essential libraries to load before initializing
             let initAttempts = 0;
             const maxAttempts = 50; // 5 seconds max wait
@@ -252,63 +395,71 @@ class SVSLeafletViewer(ReactiveHTML):
                 // Need to find the shadow root first
                 let mapDiv = null;
                 
-                // Search ALL elements in the document for shadow roots
-                const allElements = document.querySelectorAll('*');
-                console.log('Total elements in document:', allElements.length);
-                
-                let shadowRootsFound = 0;
-                for (let element of allElements) {
-                    if (element.shadowRoot) {
-                        shadowRootsFound++;
-                        
-                        // Check specifically for ReactiveHTML component
-                        if (element.className.includes('ReactiveHTML')) {
-                            console.log('✓ Found ReactiveHTML shadow root!');
-                            
-                            // Try to find the map div by ID using querySelector (searches all descendants)
-                            mapDiv = element.shadowRoot.querySelector('#map_div');
-                            
-                            if (mapDiv) {
-                                console.log('✓ Found map_div by querySelector!');
-                                break;
-                            }
-                            
-                            // Fallback: Search ALL divs in shadow root (including nested ones)
-                            const allDivs = element.shadowRoot.querySelectorAll('div');
-                            console.log('  DIV children found:', allDivs.length);
+                // Reuse the div found on a previous initialization while it is still in the
+                // page (dzi_url changes re-run this), otherwise walk the shadow roots
+                if (state.mapDiv && state.mapDiv.isConnected) {
+                    mapDiv = state.mapDiv;
+                    console.log('✓ Reusing cached map_div');
+                } else {
+                    // Search ALL elements in the document for shadow roots
+                    const allElements = document.querySelectorAll('*');
+                    console.log('Total elements in document:', allElements.length);
+                    
+                    let shadowRootsFound = 0;
+                    for (let element of allElements) {
+                        if (element.shadowRoot) {
+                            shadowRootsFound++;
                             
-                            for (let div of allDivs) {
-                                const style = div.getAttribute('style') || '';
-                                const id = div.getAttribute('id') || '';
-                                console.log('  Checking div - id:', id, 'style:', style);
+                            // Check specifically for ReactiveHTML component
+                            if (element.className.includes('ReactiveHTML')) {
+                                console.log('✓ Found ReactiveHTML shadow root!');
+                                
+                                // Try to find the map div by ID using querySelector (searches all descendants)
+                                mapDiv = element.shadowRoot.querySelector('#map_div');
                                 
-                                // Our map_div has id="map_div"
-                                if (id === 'map_div') {
-                                    mapDiv = div;
-                                    console.log('✓ Found map_div by id attribute!');
+                                if (mapDiv) {
+                                    console.log('✓ Found map_div by querySelector!');
                                     break;
                                 }
                                 
-                                // Or look for the position: relative style with min-height
-                                if (style.includes('position: relative') && style.includes('min-height')) {
-                                    mapDiv = div;
-                                    console.log('✓ Found map_div by style attributes!');
-                                    break;
+                                // Fallback: Search ALL divs in shadow root (including nested ones)
+                                const allDivs = element.shadowRoot.querySelectorAll('div');
+                                console.log('  DIV children found:', allDivs.length);
+                                
+                                for (let div of allDivs) {
+                                    const style = div.getAttribute('style') || '';
+                                    const id = div.getAttribute('id') || '';
+                                    console.log('  Checking div - id:', id, 'style:', style);
+                                    
+                                    // Our map_div has id="map_div"
+                                    if (id === 'map_div') {
+                                        mapDiv = div;
+                                        console.log('✓ Found map_div by id attribute!');
+                                        break;
+                                    }
+                                    
+                                    // Or look for the position: relative style with min-height
+                                    if (style.includes('position: relative') && style.includes('min-height')) {
+                                        mapDiv = div;
+                                        console.log('✓ Found map_div by style attributes!');
+                                        break;
+                                    }
                                 }
+                                
+                                if (mapDiv) break;
                             }
-                            
-                            if (mapDiv) break;
                         }
                     }
+                    
+                    console.log('Total shadow roots searched:', shadowRootsFound);
                 }
                 
-                console.log('Total shadow roots searched:', shadowRootsFound);
-                
                 if (!mapDiv) {
                     console.error('Map div not found! Aborting.');
                     return;
                 }
                 
+                state.mapDiv = mapDiv;
                 console.log('✓ Map div found, initializing Leaflet map...');
                 
                 // CRITICAL: Remove existing map if it exists to prevent stale tile URLs
@@ -334,6 +485,14 @@ class SVSLeafletViewer(ReactiveHTML):
                 
                 console.log('Scale at zoom 0:', scaledWidth, 'x', scaledHeight);
                 
+                // Per-DZI-level lookup tables so tile and zoom handlers never call Math.pow
+                const tilesAtLevel = new Int32Array(maxZoom + 1);     // tiles per axis (levels below 9 have one)
+                const scaleAtLevel = new Float64Array(maxZoom + 1);   // downsample relative to full resolution
+                for (let z = 0; z <= maxZoom; z++) {
+                    tilesAtLevel[z] = z >= 8 ? (1 << (z - 8)) : 1;
+                    scaleAtLevel[z] = Math.pow(2, maxZoom - z);
+                }
+                
                 // SOLUTION AFTER INVESTIGATION:
                 // Problem: DZI level 8 tile is 182×139px, but level 9+ tiles are 257×257px
                 // This inconsistency causes Leaflet to scale incorrectly
@@ -355,7 +514,7 @@ class SVSLeafletViewer(ReactiveHTML):
                 console.log('Center offset Y multiplier:', centerOffsetY);
                 
                 // Calculate dimensions at start level
-                const scaleAtStart = Math.pow(2, maxZoom - startLevel);
+                const scaleAtStart = scaleAtLevel[startLevel];
                 const widthAtStartLevel = imageWidth / scaleAtStart;
                 const heightAtStartLevel = imageHeight / scaleAtStart;
                 
@@ -365,8 +524,13 @@ class SVSLeafletViewer(ReactiveHTML):
                 const centerY = heightAtStartLevel / 2;
                 const centerX = widthAtStartLevel / 2;
                 
+                // One shared canvas for all annotation strokes instead of an SVG node each;
+                // as the map's default renderer it is also used by the freehand drawing module
+                state.canvasRenderer = L.canvas({ padding: 0.5 });
+                
                 state.map = L.map(mapDiv, {
                     crs: L.CRS.Simple,
+                    renderer: state.canvasRenderer,
                     minZoom: 0,
                     maxZoom: maxZoom - startLevel,  // Max Leaflet zoom
                     zoomControl: false,  // Disable default zoom control, we'll add custom one
@@ -379,109 +543,15 @@ class SVSLeafletViewer(ReactiveHTML):
                 
                 console.log('Map object created, max Leaflet zoom:', maxZoom - startLevel);
                 
-                // Add custom zoom control with magnification display
-                L.Control.CustomZoom = L.Control.extend({
-                    options: {
-                        position: 'topleft'
-                    },
-                    
-                    onAdd: function(map) {
-                        const container = L.DomUtil.create('div', 'leaflet-bar leaflet-control');
-                        container.style.display = 'flex';
-                        container.style.flexDirection = 'column';
-                        container.style.gap = '0';
-                        
-                        // Zoom in button
-                        const zoomInButton = L.DomUtil.create('a', 'leaflet-control-zoom-in', container);
-                        zoomInButton.innerHTML = '+';
-                        zoomInButton.href = '#';
-                        zoomInButton.title = 'Zoom in';
-                        zoomInButton.setAttribute('role', 'button');
-                        zoomInButton.setAttribute('aria-label', 'Zoom in');
-                        
-                        // Magnification display
-                        const magDisplay = L.DomUtil.create('div', 'leaflet-control-zoom-mag', container);
-                        magDisplay.style.backgroundColor = 'white';
-                        magDisplay.style.padding = '2px 8px';
-                        magDisplay.style.textAlign = 'center';
-                        magDisplay.style.fontSize = '12px';
-                        magDisplay.style.fontWeight = 'bold';
-                        magDisplay.style.borderTop = '1px solid #ccc';
-                        magDisplay.style.borderBottom = '1px solid #ccc';
-                        magDisplay.style.cursor = 'default';
-                        magDisplay.innerHTML = '0x';
-                        
-                        // Zoom out button
-                        const zoomOutButton = L.DomUtil.create('a', 'leaflet-control-zoom-out', container);
-                        zoomOutButton.innerHTML = '−';
-                        zoomOutButton.href = '#';
-                        zoomOutButton.title = 'Zoom out';
-                        zoomOutButton.setAttribute('role', 'button');
-                        zoomOutButton.setAttribute('aria-label', 'Zoom out');
-                        
-                        // Event handlers
-                        L.DomEvent.on(zoomInButton, 'click', function(e) {
-                            L.DomEvent.stopPropagation(e);
-                            L.DomEvent.preventDefault(e);
-                            map.zoomIn();
-                        });
-                        
-                        L.DomEvent.on(zoomOutButton, 'click', function(e) {
-                            L.DomEvent.stopPropagation(e);
-                            L.DomEvent.preventDefault(e);
-                            map.zoomOut();
-                        });
-                        
-                        L.DomEvent.disableClickPropagation(container);
-                        L.DomEvent.disableScrollPropagation(container);
-                        
-                        // Update magnification display
-                        this._magDisplay = magDisplay;
-                        this._updateMagDisplay = function() {
-                            const zoom = map.getZoom();
-                            
-                            // Calculate actual magnification based on SVS metadata
-                            // DZI level = startLevel + Leaflet zoom
-                            const dziLevel = startLevel + Math.floor(zoom);
-                            
-                            // Base magnification from SVS metadata (e.g., 40×)
-                            const baseMag = data.objective_power || 40.0;
-                            
-                            // Downsample at this DZI level: 2^(maxZoom - dziLevel)
-                            const downsample = Math.pow(2, maxZoom - dziLevel);
-                            
-                            // Actual magnification = base / downsample
-                            const actualMag = baseMag / downsample;
-                            
-                            // Format based on magnitude
-                            let magText;
-                            if (actualMag >= 1.0) {
-                                // Show whole numbers for 1× and above
-                                magText = actualMag.toFixed(0) + '×';
-                            } else if (actualMag >= 0.01) {
-                                // Show 2-3 decimals for smaller magnifications
-                                magText = actualMag.toFixed(3) + '×';
-                            } else {
-                                // Scientific notation for very small magnifications
-                                magText = actualMag.toExponential(1);
-                            }
-                            
-                            magDisplay.innerHTML = magText;
-                        };
-                        
-                        map.on('zoomend', this._updateMagDisplay, this);
-                        this._updateMagDisplay();
-                        
-                        return container;
-                    },
-                    
-                    onRemove: function(map) {
-                        map.off('zoomend', this._updateMagDisplay, this);
-                    }
-                });
-                
                 // Add the custom zoom control
-                new L.Control.CustomZoom().addTo(state.map);
+                if (!L.Control.CustomZoom) {
+                    defineCustomZoomControl();
+                }
+                state.magControl = new L.Control.CustomZoom({
+                    startLevel: startLevel,
+                    scaleAtLevel: scaleAtLevel,
+                    baseMag: data.objective_power || 40.0
+                }).addTo(state.map);
                 console.log('✓ Custom zoom control with magnification display added');
                 
                 // Set initial view at zoom 0 with center adjusted from metadata
@@ -493,10 +563,135 @@ class SVSLeafletViewer(ReactiveHTML):
                 // Add DZI tile layer with proper coordinate system
                 const dziBaseName = data.dzi_url.replace('.dzi', '');
                 const baseUrl = 'http://' + window.location.hostname + ':' + data.dzi_server_port + '/' + dziBaseName + '_files';
+                const tileSuffix = '.' + (data.tile_format || 'png');
                 
                 console.log('DZI base URL:', baseUrl);
+                
+                // Tile URL builder specialized for this image: the base URL is baked in
+                // as a string literal (JSON.stringify escapes it), so each call is a plain
+                // concatenation. Falls back to a closure if eval is blocked by a CSP.
+                try {
+                    state.buildTileUrl = new Function('z', 'x', 'y',
+                        'return ' + JSON.stringify(baseUrl + '/') + ' + z + "/" + x + "_" + y + ' + JSON.stringify(tileSuffix) + ';');
+                } catch (e) {
+                    state.buildTileUrl = function(z, x, y) {
+                        return baseUrl + '/' + z + '/' + x + '_' + y + tileSuffix;
+                    };
+                }
+                const buildTileUrl = state.buildTileUrl;
                 console.log('DZI zoom levels: 0 (small) to', maxZoom, '(full res)');
                 
+                // DZI tile configuration
+                const baseTileSize = 256;  // Base tile size without overlap
+                const overlap = 1;  // Standard DZI overlap
+                const fullTileSize = baseTileSize + overlap;  // Expected: 257
+                
+                // Grid size and edge tile dimensions are the same for every tile of a
+                // level, so compute them once per DZI level (integer pixel sizes)
+                const levelInfo = new Map();
+                function getLevelInfo(dziZoom) {
+                    let info = levelInfo.get(dziZoom);
+                    if (info === undefined) {
+                        const levelWidth = Math.ceil(imageWidth / scaleAtLevel[dziZoom]);
+                        const levelHeight = Math.ceil(imageHeight / scaleAtLevel[dziZoom]);
+                        const tileCols = Math.ceil(levelWidth / baseTileSize);
+                        const tileRows = Math.ceil(levelHeight / baseTileSize);
+                        info = {
+                            levelWidth: levelWidth,
+                            levelHeight: levelHeight,
+                            tileCols: tileCols,
+                            tileRows: tileRows,
+                            edgeTileW: Math.min(levelWidth - (tileCols - 1) * baseTileSize + overlap, fullTileSize),
+                            edgeTileH: Math.min(levelHeight - (tileRows - 1) * baseTileSize + overlap, fullTileSize)
+                        };
+                        levelInfo.set(dziZoom, info);
+                    }
+                    return info;
+                }
+                
+                // Tiles come in a handful of sizes (257×257 interior plus the edge sizes of
+                // each level), so every size gets one shared CSS class instead of eight
+                // inline style writes per tile. Leaflet sets the inline width/height of
+                // each tile, hence !important. The sheet lives next to the map (shadow root).
+                const styleRoot = mapDiv.getRootNode();
+                if (!state.tileSizeStyle || state.tileSizeStyle.getRootNode() !== styleRoot) {
+                    state.tileSizeStyle = document.createElement('style');
+                    (styleRoot === document ? document.head : styleRoot).appendChild(state.tileSizeStyle);
+                    state.tileSizeClasses = new Set();
+                }
+                function tileSizeClass(width, height) {
+                    const cls = 'dzi-tile-' + width + 'x' + height;
+                    if (!state.tileSizeClasses.has(cls)) {
+                        const sheet = state.tileSizeStyle.sheet;
+                        const w = width + 'px !important';
+                        const h = height + 'px !important';
+                        sheet.insertRule(`.${cls} { width: ${w}; max-width: ${w}; min-width: ${w}; ` +
+                                         `height: ${h}; max-height: ${h}; min-height: ${h}; }`, sheet.cssRules.length);
+                        state.tileSizeClasses.add(cls);
+                    }
+                    return cls;
+                }
+                
+                // Tile load/error handlers, shared by every tile instead of two closures per tile
+                // (`this` is the tile; createTile stamps the layer, done callback and coords on it)
+                function onTileLoad() {
+                    const tile = this;
+                    if (!tile._dziLayer) return;  // pruned and pooled before it finished loading
+                    
+                    // Get actual loaded image dimensions - THIS is the truth
+                    const actualWidth = tile.naturalWidth;
+                    const actualHeight = tile.naturalHeight;
+                    
+                    // Set exact dimensions based on what was actually loaded
+                    tile.classList.add(tileSizeClass(actualWidth, actualHeight));
+                    
+                    // Now show the properly sized tile
+                    tile.style.visibility = 'visible';
+                    
+                    // Debug logging at low zoom levels
+                    const coords = tile._dziCoords;
+                    if (DEBUG && coords.z <= 2) {
+                        // Expected dimensions (for reference/debugging only)
+                        const dziZoom = coords.z + startLevel;
+                        const info = getLevelInfo(dziZoom);
+                        const expectedWidth = coords.x < info.tileCols - 1 ? fullTileSize : info.edgeTileW;
+                        const expectedHeight = coords.y < info.tileRows - 1 ? fullTileSize : info.edgeTileH;
+                        const mismatch = (actualWidth !== expectedWidth || actualHeight !== expectedHeight);
+                        if (mismatch) {
+                            console.log(`[TILE SIZE] DZI level ${dziZoom}, tile (${coords.x},${coords.y}): ` +
+                                       `Expected ${expectedWidth}×${expectedHeight}px, ` +
+                                       `Got ${actualWidth}×${actualHeight}px ` +
+                                       `(grid: ${info.tileCols}×${info.tileRows}, level: ${info.levelWidth}×${info.levelHeight})`);
+                        }
+                    }
+                    
+                    tile._dziLayer._tileOnLoad(tile._dziDone, tile);
+                }
+                
+                function onTileError(e) {
+                    const tile = this;
+                    if (!tile._dziLayer) return;  // pruned and pooled before it finished loading
+                    const coords = tile._dziCoords;
+                    console.error(`[TILE ERROR] DZI level ${coords.z + startLevel}, tile (${coords.x},${coords.y}): ${tile.src}`);
+                    tile._dziLayer._tileOnError(tile._dziDone, tile, e);
+                }
+                
+                // Free list of <img> elements from pruned tiles, reused by createTile
+                const TILE_POOL_SIZE = 64;
+                const tileImgPool = [];
+                function acquireTileImg() {
+                    return tileImgPool.pop() || document.createElement('img');
+                }
+                function releaseTileImg(tile) {
+                    // Leaflet already pointed src at its empty image to cancel the request
+                    tile.className = '';
+                    tile.style.cssText = '';
+                    tile._dziLayer = tile._dziDone = tile._dziCoords = null;
+                    if (tileImgPool.length < TILE_POOL_SIZE) {
+                        tileImgPool.push(tile);
+                    }
+                }
+                
                 // Create custom tile layer with DZI-specific getTileUrl and proper edge tile handling
                 const DZITileLayer = L.TileLayer.extend({
                     getTileUrl: function(coords) {
@@ -505,22 +700,23 @@ class SVSLeafletViewer(ReactiveHTML):
                         
                         // Calculate how many tiles exist at this DZI zoom level
                         // Tiles double at each level starting from level 9
-                        const tilesAtThisZoom = Math.pow(2, Math.max(0, dziZoom - 8));
+                        const tilesAtThisZoom = tilesAtLevel[dziZoom];
                         
                         // ONLY accept coordinates in the valid range [0, tilesAtThisZoom)
-                        if (coords.x < 0 || coords.x >= tilesAtThisZoom || 
-                            coords.y < 0 || coords.y >= tilesAtThisZoom) {
+                        // tilesAtThisZoom is a power of two, so x|y stays below it exactly when
+                        // both do; >>> 0 turns negative coordinates into huge unsigned values
+                        if (((coords.x | coords.y) >>> 0) >= tilesAtThisZoom) {
                             return '';  // Don't load tiles outside valid range
                         }
                         
                         // Valid coordinates - request the tile from DZI
-                        const url = baseUrl + '/' + dziZoom + '/' + coords.x + '_' + coords.y + '.png';
+                        const url = buildTileUrl(dziZoom, coords.x, coords.y);
                         
                         // DETAILED LOGGING for debugging aspect ratio issues
-                        if (coords.z <= 2) {  // Only log first few zoom levels to avoid spam
+                        if (DEBUG && coords.z <= 2) {  // Only log first few zoom levels to avoid spam
                             console.log(`[TILE] Leaflet zoom=${coords.z}, DZI level=${dziZoom}, ` +
                                        `coords=(${coords.x},${coords.y}), tiles=${tilesAtThisZoom}x${tilesAtThisZoom}, ` +
-                                       `url=${dziZoom}/${coords.x}_${coords.y}.png`);
+                                       `url=${url}`);
                         }
                         
                         return url;
@@ -528,8 +724,17 @@ class SVSLeafletViewer(ReactiveHTML):
                     
                     // CRITICAL FIX: Override createTile to handle variable tile sizes
                     // DZI tiles can be ANY size at ANY zoom level - we must use actual loaded dimensions
+                    // Return pruned tiles to the pool once Leaflet has detached them
+                    _removeTile: function(key) {
+                        const tileObj = this._tiles[key];
+                        L.TileLayer.prototype._removeTile.call(this, key);
+                        if (tileObj) {
+                            releaseTileImg(tileObj.el);
+                        }
+                    },
+                    
                     createTile: function(coords, done) {
-                        const tile = document.createElement('img');
+                        const tile = acquireTileImg();
                         
                         // Get the tile URL
                         const url = this.getTileUrl(coords);
@@ -540,38 +745,6 @@ class SVSLeafletViewer(ReactiveHTML):
                             return tile;
                         }
                         
-                        // Calculate image dimensions at this DZI level for reference
-                        const dziZoom = coords.z + startLevel;
-                        const scaleAtLevel = Math.pow(2, maxZoom - dziZoom);
-                        const levelWidth = imageWidth / scaleAtLevel;
-                        const levelHeight = imageHeight / scaleAtLevel;
-                        
-                        // DZI tile configuration
-                        const baseTileSize = 256;  // Base tile size without overlap
-                        const overlap = 1;  // Standard DZI overlap
-                        const fullTileSize = baseTileSize + overlap;  // Expected: 257
-                        
-                        // Calculate tile grid dimensions
-                        const tileCols = Math.ceil(levelWidth / baseTileSize);
-                        const tileRows = Math.ceil(levelHeight / baseTileSize);
-                        
-                        // Calculate expected dimensions (for reference/debugging only)
-                        let expectedWidth, expectedHeight;
-                        
-                        if (coords.x < tileCols - 1) {
-                            expectedWidth = fullTileSize;
-                        } else {
-                            const remainingWidth = levelWidth - (coords.x * baseTileSize);
-                            expectedWidth = Math.ceil(Math.min(remainingWidth + overlap, fullTileSize));
-                        }
-                        
-                        if (coords.y < tileRows - 1) {
-                            expectedHeight = fullTileSize;
-                        } else {
-                            const remainingHeight = levelHeight - (coords.y * baseTileSize);
-                            expectedHeight = Math.ceil(Math.min(remainingHeight + overlap, fullTileSize));
-                        }
-                        
                         // Set tile properties
                         tile.alt = '';
                         tile.setAttribute('role', 'presentation');
@@ -579,43 +752,12 @@ class SVSLeafletViewer(ReactiveHTML):
                         // **KEY FIX**: Hide tile until we know its actual dimensions
                         tile.style.visibility = 'hidden';
                         
-                        // Load the image and use its ACTUAL dimensions
-                        L.DomEvent.on(tile, 'load', function() {
-                            // Get actual loaded image dimensions - THIS is the truth
-                            const actualWidth = tile.naturalWidth;
-                            const actualHeight = tile.naturalHeight;
-                            
-                            // Set exact dimensions based on what was actually loaded
-                            tile.width = actualWidth;
-                            tile.height = actualHeight;
-                            tile.style.width = actualWidth + 'px';
-                            tile.style.height = actualHeight + 'px';
-                            tile.style.maxWidth = actualWidth + 'px';
-                            tile.style.maxHeight = actualHeight + 'px';
-                            tile.style.minWidth = actualWidth + 'px';
-                            tile.style.minHeight = actualHeight + 'px';
-                            
-                            // Now show the properly sized tile
-                            tile.style.visibility = 'visible';
-                            
-                            // Debug logging at low zoom levels
-                            if (coords.z <= 2) {
-                                const mismatch = (actualWidth !== expectedWidth || actualHeight !== expectedHeight);
-                                if (mismatch) {
-                                    console.log(`[TILE SIZE] DZI level ${dziZoom}, tile (${coords.x},${coords.y}): ` +
-                                               `Expected ${expectedWidth}×${expectedHeight}px, ` +
-                                               `Got ${actualWidth}×${actualHeight}px ` +
-                                               `(grid: ${tileCols}×${tileRows}, level: ${Math.round(levelWidth)}×${Math.round(levelHeight)})`);
-                                }
-                            }
-                            
-                            this._tileOnLoad(done, tile);
-                        }.bind(this));
-                        
-                        L.DomEvent.on(tile, 'error', function(e) {
-                            console.error(`[TILE ERROR] DZI level ${dziZoom}, tile (${coords.x},${coords.y}): ${url}`);
-                            this._tileOnError(done, tile, e);
-                        }.bind(this));
+                        // Shared handlers read everything they need from the tile itself
+                        tile._dziLayer = this;
+                        tile._dziDone = done;
+                        tile._dziCoords = coords;
+                        tile.addEventListener('load', onTileLoad, { once: true, passive: true });
+                        tile.addEventListener('error', onTileError, { once: true, passive: true });
                         
                         if (this.options.crossOrigin || this.options.crossOrigin === '') {
                             tile.crossOrigin = this.options.crossOrigin === true ? '' : this.options.crossOrigin;
@@ -634,34 +776,67 @@ class SVSLeafletViewer(ReactiveHTML):
                     minNativeZoom: 0,
                     maxNativeZoom: maxZoom - startLevel,
                     tms: false,
-                    updateWhenIdle: false,  // Update tiles while panning
+                    updateWhenIdle: true,  // Request tiles when a pan settles (long pans: see below)
                     updateWhenZooming: true,  // Update tiles while zooming
-                    keepBuffer: 2  // Keep 2 tile rows/cols around viewport
+                    keepBuffer: 4  // Keep 4 tile rows/cols around viewport
                 }).addTo(state.map);
                 
+                // A pan that runs past the kept buffer would show blank tiles until it ends,
+                // so refresh the grid mid-pan each time it travels that far (updateWhenIdle
+                // is only read when the layer is added, so it cannot simply be toggled)
+                const panRefreshDistance = state.tileLayer.options.keepBuffer * state.tileLayer.getTileSize().x;
+                let panOrigin = null;
+                let panZoom = null;
+                state.map.on('movestart', function() {
+                    panZoom = state.map.getZoom();
+                    panOrigin = state.map.project(state.map.getCenter(), panZoom);
+                });
+                state.map.on('move', function() {
+                    if (!panOrigin || state.map.getZoom() !== panZoom) return;  // zooms update on their own
+                    const current = state.map.project(state.map.getCenter(), panZoom);
+                    if (current.distanceTo(panOrigin) > panRefreshDistance) {
+                        panOrigin = current;
+                        state.tileLayer._update();
+                    }
+                });
+                state.map.on('moveend', function() {
+                    panOrigin = null;
+                });
+                
                 console.log('DZI tile layer added with edge tile handling');
+                
                 console.log('Map center:', state.map.getCenter());
                 console.log('Map zoom:', state.map.getZoom());
                 console.log('Map pixel bounds:', state.map.getPixelBounds());
                 console.log('Map size:', state.map.getSize());
                 
-                // Log on every zoom to see coordinate space changes
-                state.map.on('zoomend', function() {
+            // Log on every zoom to see coordinate space changes
+            function logZoom(zoom) {
+                const center = state.map.getCenter();
+                const bounds = state.map.getBounds();
+                const pixelBounds = state.map.getPixelBounds();
+                console.log(`[ZOOM] Level=${zoom}, Center=[${center.lat.toFixed(1)}, ${center.lng.toFixed(1)}], ` +
+                           `Bounds=${JSON.stringify([[bounds.getSouth().toFixed(1), bounds.getWest().toFixed(1)], ` +
+                           `[bounds.getNorth().toFixed(1), bounds.getEast().toFixed(1)]])}, ` +
+                           `PixelBounds=${JSON.stringify(pixelBounds)}`);
+            }
+            
+            // Single zoomend handler: zoom indicator, magnification display and debug log
+            // all run from one animation frame and share one getZoom() call
+            let zoomInfoFrame = 0;
+            function updateZoomInfo() {
+                if (zoomInfoFrame) return;
+                zoomInfoFrame = requestAnimationFrame(function() {
+                    zoomInfoFrame = 0;
+                    if (!state.map) return;
                     const zoom = state.map.getZoom();
-                    const center = state.map.getCenter();
-                    const bounds = state.map.getBounds();
-                    const pixelBounds = state.map.getPixelBounds();
-                    console.log(`[ZOOM] Level=${zoom}, Center=[${center.lat.toFixed(1)}, ${center.lng.toFixed(1)}], ` +
-                               `Bounds=${JSON.stringify([[bounds.getSouth().toFixed(1), bounds.getWest().toFixed(1)], ` +
-                               `[bounds.getNorth().toFixed(1), bounds.getEast().toFixed(1)]])}, ` +
-                               `PixelBounds=${JSON.stringify(pixelBounds)}`);
+                    applyZoomInfo(zoom);
+                    if (DEBUG) logZoom(zoom);
                 });
+            }
             
-            // Update zoom indicator
-            function updateZoomInfo() {
-                if (!state.map) return;
+            function applyZoomInfo(currentZoom) {
                 try {
-                    const currentZoom = state.map.getZoom();
                     if (typeof currentZoom === 'undefined' || isNaN(currentZoom)) return;
                     
                     // Calculate DZI level from Leaflet zoom
@@ -679,72 +854,136 @@ class SVSLeafletViewer(ReactiveHTML):
                         }
                     }
                     
-                    console.log('Zoom updated - Leaflet zoom:', currentZoom, 'DZI level:', dziLevel, 'Magnification:', magnification.toFixed(2) + 'x');
+                    if (state.magControl) {
+                        state.magControl._updateMagDisplay(currentZoom);
+                    }
+                    
+                    if (DEBUG) console.log('Zoom updated - Leaflet zoom:', currentZoom, 'DZI level:', dziLevel, 'Magnification:', magnification.toFixed(2) + 'x');
                 } catch (e) {
                     console.error('Error in updateZoomInfo:', e);
                 }
             }
             
             // Event listeners
-            state.map.on('zoom', updateZoomInfo);
-            state.map.on('zoomend', updateZoomInfo);  // Also update on zoomend
-            state.map.on('move', () => {
+            state.map.on('zoomend', updateZoomInfo);
+            // Pan fires 'move' per pointer event; send the center to Python at most
+            // once per animation frame, plus a final exact value on moveend
+            let centerFrame = 0;
+            function syncCenter() {
+                centerFrame = 0;
                 if (!state.map) return;
                 const center = state.map.getCenter();
                 data.center = [center.lat, center.lng];
+            }
+            state.map.on('move', () => {
+                if (!centerFrame) {
+                    centerFrame = requestAnimationFrame(syncCenter);
+                }
+            });
+            state.map.on('moveend', () => {
+                if (centerFrame) {
+                    cancelAnimationFrame(centerFrame);
+                }
+                syncCenter();
             });
             
             // Initialize zoom display
             updateZoomInfo();
             
-            // Initialize minimap from external module
-            if (typeof initializeMiniMap === 'function') {
-                initializeMiniMap(state.map, DZITileLayer, imageWidth, imageHeight, startLevel, maxZoom, state);
-            } else {
-                console.error('initializeMiniMap function not found. Make sure minimap_overview.js is loaded.');
-            }
+            // ADD DRAWING CAPABILITIES
+            // Create feature group to store drawn items (now, so annotations can load right away)
+            state.drawnItems = new L.FeatureGroup();
+            state.map.addLayer(state.drawnItems);
+            
+            // Polylines in drawnItems, keyed by Leaflet id, so saving can iterate a Map
+            // instead of walking the group's _layers object. Kept in sync through the
+            // group's events, which fire for freehand drawing, deletes and clearLayers
+            state.annotationList = new Map();
+            state.drawnItems.on('layeradd', function(e) {
+                if (e.layer instanceof L.Polyline) {
+                    state.annotationList.set(L.stamp(e.layer), e.layer);
+                }
+            });
+            state.drawnItems.on('layerremove', function(e) {
+                state.annotationList.delete(L.stamp(e.layer));
+            });
             
-            // Initialize scale bar from external module
             // mm/pixel ratio at base resolution (DZI max zoom level)
             const mmPerPixel = data.mm_per_pixel || 0.0004;
             
             console.log('Using mm_per_pixel from metadata:', mmPerPixel);
-
-            if (typeof initializeScaleBar === 'function') {
-                initializeScaleBar(state.map, mmPerPixel, startLevel, maxZoom);
-            } else {
-                console.error('initializeScaleBar function not found. Make sure scale_bar.js is loaded.');
-            }
-            
-            // ADD DRAWING CAPABILITIES
-            // Create feature group to store drawn items
-            state.drawnItems = new L.FeatureGroup();
-            state.map.addLayer(state.drawnItems);
             
-            // Initialize freehand drawing from external module
-            if (typeof initializeFreehandDrawing === 'function') {
-                initializeFreehandDrawing(state.map, state.drawnItems);
-                console.log('Map initialized successfully with freehand drawing tool');
-            } else {
-                console.error('initializeFreehandDrawing function not found. Make sure freehand_drawing.js is loaded.');
+            // Minimap, scale bar and freehand drawing are set up after the first tiles
+            // have painted (or after a timeout if they never settle), so they do not
+            // delay the first frame of the main map
+            const deferredInitMap = state.map;
+            let deferredInitDone = false;
+            function initializeDeferredModules() {
+                // Skip if already done, or if the map was re-initialized in the meantime
+                if (deferredInitDone || state.map !== deferredInitMap) return;
+                deferredInitDone = true;
+                
+                // Initialize minimap from external module
+                if (typeof initializeMiniMap === 'function') {
+                    initializeMiniMap(state.map, DZITileLayer, imageWidth, imageHeight, startLevel, maxZoom, state);
+                } else {
+                    console.error('initializeMiniMap function not found. Make sure minimap_overview.js is loaded.');
+                }
+                
+                // Initialize scale bar from external module
+                if (typeof initializeScaleBar === 'function') {
+                    initializeScaleBar(state.map, mmPerPixel, startLevel, maxZoom);
+                } else {
+                    console.error('initializeScaleBar function not found. Make sure scale_bar.js is loaded.');
+                }
+                
+                // Initialize freehand drawing from external module
+                if (typeof initializeFreehandDrawing === 'function') {
+                    initializeFreehandDrawing(state.map, state.drawnItems);
+                    console.log('Map initialized successfully with freehand drawing tool');
+                } else {
+                    console.error('initializeFreehandDrawing function not found. Make sure freehand_drawing.js is loaded.');
+                }
             }
+            state.tileLayer.once('load', function() {
+                if (window.requestIdleCallback) {
+                    window.requestIdleCallback(initializeDeferredModules, { timeout: 500 });
+                } else {
+                    setTimeout(initializeDeferredModules, 0);
+                }
+            });
+            setTimeout(initializeDeferredModules, 2000);
             
             // ANNOTATION SAVE/LOAD FUNCTIONS
+            // Vertices are stored as integer full-resolution pixel coordinates
+            // ([x, y] = [lng, lat] × coordinate_scale): much shorter JSON than raw doubles
+            const coordinateScale = scaleAtStart;
+            function quantizeLatLngs(latlngs) {
+                if (!L.LineUtil.isFlat(latlngs)) {
+                    return latlngs.map(quantizeLatLngs);  // nested rings
+                }
+                const coordinates = new Array(latlngs.length);
+                for (let i = 0; i < latlngs.length; i++) {
+                    const ll = latlngs[i];
+                    coordinates[i] = [Math.round(ll.lng * coordinateScale), Math.round(ll.lat * coordinateScale)];
+                }
+                return coordinates;
+            }
+            
             window.getAnnotationsData = function() {
                 if (!state.drawnItems) return null;
                 
-                const annotations = [];
-                state.drawnItems.eachLayer(function(layer) {
-                    if (layer instanceof L.Polyline) {
-                        const geojson = layer.toGeoJSON();
-                        annotations.push({
-                            type: 'polyline',
-                            coordinates: geojson.geometry.coordinates,
-                            color: layer.options.originalColor || layer.options.color,
-                            weight: layer.options.originalWeight || layer.options.weight
-                        });
-                    }
-                });
+                const annotations = new Array(state.annotationList.size);
+                let index = 0;
+                for (const layer of state.annotationList.values()) {
+                    // Read the vertices directly instead of building a GeoJSON Feature
+                    annotations[index++] = {
+                        type: 'polyline',
+                        coordinates: quantizeLatLngs(layer.getLatLngs()),
+                        color: layer.options.originalColor || layer.options.color,
+                        weight: layer.options.originalWeight || layer.options.weight
+                    };
+                }
                 
                 const currentZoom = state.map.getZoom();
                 const currentCenter = state.map.getCenter();
@@ -753,6 +992,7 @@ class SVSLeafletViewer(ReactiveHTML):
                     image_name: data.image_name,
                     zoom: currentZoom,
                     center: [currentCenter.lat, currentCenter.lng],
+                    coordinate_scale: coordinateScale,
                     annotations: annotations,
                     timestamp: new Date().toISOString()
                 };
@@ -761,21 +1001,45 @@ class SVSLeafletViewer(ReactiveHTML):
             window.loadAnnotationsData = function(data) {
                 if (!state.drawnItems || !state.map) return;
                 
-                console.log('Loading annotations:', data);
+                if (DEBUG) console.log('Loading annotations:', data);
                 
                 // Clear existing annotations
                 state.drawnItems.clearLayers();
                 
                 // Load annotations
                 if (data.annotations && data.annotations.length > 0) {
+                    // Older saves hold raw [lng, lat] floats and have no coordinate_scale
+                    const scale = data.coordinate_scale || 1;
+                    
+                    // Python packs flat polylines into one base64 float32 blob of x,y pairs
+                    // (encode_annotation_payload); decode it once for all annotations
+                    let packed = null;
+                    if (data.coordinates_blob) {
+                        const binary = atob(data.coordinates_blob);
+                        const bytes = new Uint8Array(binary.length);
+                        for (let i = 0; i < binary.length; i++) {
+                            bytes[i] = binary.charCodeAt(i);
+                        }
+                        packed = new Float32Array(bytes.buffer);
+                    }
+                    
                     data.annotations.forEach(function(anno) {
                         if (anno.type === 'polyline') {
-                            // Convert GeoJSON coordinates to LatLng
-                            const latlngs = anno.coordinates.map(function(coord) {
-                                return [coord[1], coord[0]]; // GeoJSON is [lng, lat], Leaflet is [lat, lng]
-                            });
+                            // Convert [x, y] coordinates to LatLng (stored as [lng, lat], Leaflet is [lat, lng])
+                            let latlngs;
+                            if (packed && anno.start !== undefined) {
+                                latlngs = new Array(anno.length);
+                                for (let i = 0, j = anno.start * 2; i < anno.length; i++, j += 2) {
+                                    latlngs[i] = [packed[j + 1] / scale, packed[j] / scale];
+                                }
+                            } else {
+                                latlngs = anno.coordinates.map(function(coord) {
+                                    return [coord[1] / scale, coord[0] / scale];
+                                });
+                            }
                             
                             const polyline = L.polyline(latlngs, {
+                                renderer: state.canvasRenderer,
                                 color: anno.color,
                                 weight: anno.weight,
                                 originalColor: anno.color,
@@ -844,25 +1108,23 @@ class SVSLeafletViewer(ReactiveHTML):
             if (data.annotation_data && typeof window.loadAnnotationsData === 'function') {
                 try {
                     const annotationsData = JSON.parse(data.annotation_data);
-                    
-                    // Check if this is a special action (like toggle_minimap)
-                    if (annotationsData.action === 'toggle_minimap') {
-                        console.log('🗺️  Toggle minimap action received');
-                        if (typeof state !== 'undefined' && state.miniMap && state.miniMap._toggleButton) {
-                            state.miniMap._toggleButton.click();
-                            console.log('✓ Minimap toggled via keyboard shortcut');
-                        } else {
-                            console.warn('⚠️ Minimap not available or not initialized');
-                        }
-                    } else {
-                        // Normal annotation loading
-                        window.loadAnnotationsData(annotationsData);
-                        console.log('Annotations loaded successfully');
-                    }
+                    window.loadAnnotationsData(annotationsData);
+                    console.log('Annotations loaded successfully');
                 } catch (e) {
                     console.error('Error loading annotations:', e);
                 }
             }
+        """,
+        
+        'minimap_trigger': """
+            // Triggered when the minimap toggle is requested from Python
+            console.log('🗺️  Toggle minimap trigger:', data.minimap_trigger);
+            if (state.miniMap && state.miniMap._toggleButton) {
+                state.miniMap._toggleButton.click();
+                console.log('✓ Minimap toggled via keyboard shortcut');
+            } else {
+                console.warn('⚠️ Minimap not available or not initialized');
+            }
         """
     }
     
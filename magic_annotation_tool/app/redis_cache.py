@@ -9,6 +9,23 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Set a JSON hash field and move counters by the change in its boolean flags, in one step
+# KEYS: hash, counters hash  ARGV: field, JSON value, flag names...
+HSET_COUNTED_SCRIPT = """
+local previous = redis.call('HGET', KEYS[1], ARGV[1])
+local old = previous and cjson.decode(previous) or {}
+local new = cjson.decode(ARGV[2])
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+for i = 3, #ARGV do
+    local flag = ARGV[i]
+    local delta = (new[flag] == true and 1 or 0) - (old[flag] == true and 1 or 0)
+    if delta ~= 0 then
+        redis.call('HINCRBY', KEYS[2], flag, delta)
+    end
+end
+return 1
+"""
+
 class RedisCache:
     """Redis cache manager for annotation tool"""
     
@@ -27,6 +44,7 @@ class RedisCache:
                 socket_connect_timeout=5
             )
             self.client.ping()
+            self._hset_counted = self.client.register_script(HSET_COUNTED_SCRIPT)
             logger.info(f"✓ Redis connected: {self.host}:{self.port}")
         except Exception as e:
             logger.error(f"Redis connection failed: {e}")
@@ -95,6 +113,87 @@ class RedisCache:
             logger.error(f"Cache clear error for pattern {pattern}: {e}")
             return 0
     
+    def exists(self, *keys: str) -> int:
+        """Count how many of the given keys exist"""
+        if not self.client:
+            return 0
+        
+        try:
+            return self.client.exists(*keys)
+        except Exception as e:
+            logger.error(f"Cache exists error for {keys}: {e}")
+            return 0
+    
+    def hget(self, name: str, field: str) -> Optional[Any]:
+        """Get one field of a hash (no TTL, values are JSON encoded)"""
+        if not self.client:
+            return None
+        
+        try:
+            value = self.client.hget(name, field)
+            return json.loads(value) if value else None
+        except Exception as e:
+            logger.error(f"Cache hget error for {name}[{field}]: {e}")
+            return None
+    
+    def hset(self, name: str, mapping: dict) -> bool:
+        """Set one or more fields of a hash (no TTL, values are JSON encoded)"""
+        if not self.client:
+            return False
+        if not mapping:
+            return True
+        
+        try:
+            self.client.hset(name, mapping={field: json.dumps(value) for field, value in mapping.items()})
+            logger.debug(f"Cache HSET: {name} ({len(mapping)} fields)")
+            return True
+        except Exception as e:
+            logger.error(f"Cache hset error for {name}: {e}")
+            return False
+    
+    def hreplace_many(self, mappings: dict) -> bool:
+        """Replace whole hashes (name -> mapping) in one MULTI/EXEC transaction (no TTL, values are JSON encoded)"""
+        if not self.client:
+            return False
+        
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            for name, mapping in mappings.items():
+                pipe.delete(name)
+                if mapping:
+                    pipe.hset(name, mapping={field: json.dumps(value) for field, value in mapping.items()})
+            pipe.execute()
+            logger.debug(f"Cache HREPLACE: {', '.join(mappings)}")
+            return True
+        except Exception as e:
+            logger.error(f"Cache hreplace error for {', '.join(mappings)}: {e}")
+            return False
+    
+    def hgetall_int(self, name: str) -> dict:
+        """Get all fields of an integer counter hash"""
+        if not self.client:
+            return {}
+        
+        try:
+            return {field: int(value) for field, value in self.client.hgetall(name).items()}
+        except Exception as e:
+            logger.error(f"Cache hgetall error for {name}: {e}")
+            return {}
+    
+    def hset_counted(self, name: str, field: str, value: dict, counts_name: str, flags: tuple) -> bool:
+        """Set one JSON field of a hash and adjust the counters in counts_name by how
+        each boolean flag of the value changed, atomically (no TTL)"""
+        if not self.client:
+            return False
+        
+        try:
+            self._hset_counted(keys=[name, counts_name], args=[field, json.dumps(value), *flags])
+            logger.debug(f"Cache HSET counted: {name}[{field}]")
+            return True
+        except Exception as e:
+            logger.error(f"Cache hset_counted error for {name}[{field}]: {e}")
+            return False
+    
     def get_metadata(self, image_name: str) -> Optional[dict]:
         """Get cached metadata for an image"""
         return self.get(f"metadata:{image_name}")
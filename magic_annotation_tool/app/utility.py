@@ -9,33 +9,158 @@ This module contains all utility functions for:
 """
 
 import os
+import re
+import sys
 import json
-import glob
+import atexit
+import fcntl
+import base64
+import heapq
 import logging
+import mmap
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 from datetime import datetime
+from redis_cache import cache
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback keeps the helpers working without orjson
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # without ijson a large mapping is simply parsed in one go
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
+# Fixed storage locations (absolute POSIX paths, so plain string concatenation is safe)
+ANNOTATION_BASE_DIR = "/data/anno"
+INK_STATUS_DIR = "/data/ink_status"
+INK_STATUS_FILE = f"{INK_STATUS_DIR}/ink_status.json"
+# flock()ed by every process while it changes the ink status file or the Redis copy
+INK_STATUS_LOCK_FILE = f"{INK_STATUS_DIR}/ink_status.lock"
+# Redis hashes shared by every app process; the JSON file stays the durable copy
+INK_STATUS_REDIS_KEY = "ink_status"
+INK_STATUS_COUNTS_REDIS_KEY = "ink_status:counts"
+# Always present in the statuses hash, so it exists even before any image has a status
+INK_STATUS_SENTINEL_FIELD = "_seeded"
+IMAGE_MAPPING_FILE = "/data/tiles_directory_list.json"
+
+# Host tiles directory prefix -> container mount point, per collection
+TILES_PATH_PREFIXES = (
+    ('/local/data/magicscan/dzi_ink_datasets/HnE/BRACS/', '/data/dzi_datasets/BRACS/'),
+    ('/local/data/magicscan/dzi_ink_datasets/HnE/TCGA-BRCA/', '/data/dzi_datasets/TCGA/'),
+    ('/local/data/magicscan/dzi_ink_datasets/HnE/BACH/', '/data/dzi_datasets/BACH/'),
+)
+
+# Collections searched for {image}_metadata.json when no DZI path is known, then the old location
+METADATA_SEARCH_DIRS = (
+    '/data/dzi_datasets/BRACS',
+    '/data/dzi_datasets/TCGA',
+    '/data/dzi_datasets/BACH',
+)
+METADATA_FALLBACK_DIR = "/data/dzi_output"
+# Collection listings are reused this long (seconds) before a miss re-lists the directory
+METADATA_LISTING_TTL = 60
+
+# get_status_counts serves its last result for this many seconds; this
+# process's own status saves invalidate it immediately
+STATUS_COUNTS_TTL = 5
+
+# Metadata files at least this large are memory-mapped instead of read into a bytes copy
+MMAP_JSON_THRESHOLD = 64 * 1024
+
+# Mapping files larger than this are streamed entry by entry (with ijson) instead of parsed whole
+IMAGE_MAPPING_STREAM_THRESHOLD = 10 * 1024 * 1024
+
+# Background annotation saves wait this long (seconds) so a burst of saves is written together
+ANNOTATION_WRITE_DELAY = 0.2
+
+# Saved views kept parsed (and packed for the viewer) by load_saved_view; small,
+# since entries can be several MB and are only useful while the image is open
+SAVED_VIEW_CACHE_SIZE = 16
+
+# Thread count for reading per-image metadata files in get_available_images
+METADATA_READ_WORKERS = 16
+
+
+def json_loads(raw):
+    """Parse JSON from bytes or str (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def json_dumps(data, indent=False):
+    """Serialize data to UTF-8 JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def load_json_file(path):
+    """Load a JSON file, memory-mapping it for orjson when it is large"""
+    with open(path, 'rb') as f:
+        if orjson is None or os.fstat(f.fileno()).st_size < MMAP_JSON_THRESHOLD:
+            return json_loads(f.read())
+        # orjson parses straight from the mapped pages, avoiding the copy into a bytes object
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
 
 def load_metadata(metadata_path):
     """Load viewer metadata from JSON file generated during DZI conversion"""
-    if os.path.exists(metadata_path):
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-            logger.info(f"✓ Loaded metadata from {metadata_path}")
-            logger.info(f"  Image dimensions: {metadata['original_dimensions']['width']}x{metadata['original_dimensions']['height']}")
-            logger.info(f"  Aspect ratio: {metadata['aspect_ratio']}")
-            logger.info(f"  Recommended start level: {metadata['recommended_start_level']}")
-            logger.info(f"  Center offset Y: {metadata['center_offset_y']}")
-            return metadata
-    else:
-        logger.warning(f"⚠ Metadata file not found: {metadata_path}")
+    try:
+        metadata = load_json_file(metadata_path)
+    except FileNotFoundError:
+        logger.warning("⚠ Metadata file not found: %s", metadata_path)
         logger.warning("Using default values. Run convert_to_dzi.py to generate metadata.")
         return {
             "recommended_start_level": 8,
             "center_offset_y": -1.15,
             "dzi_levels": 18
         }
+    
+    logger.info("✓ Loaded metadata from %s", metadata_path)
+    logger.info("  Image dimensions: %sx%s", metadata['original_dimensions']['width'], metadata['original_dimensions']['height'])
+    logger.info("  Aspect ratio: %s", metadata['aspect_ratio'])
+    logger.info("  Recommended start level: %s", metadata['recommended_start_level'])
+    logger.info("  Center offset Y: %s", metadata['center_offset_y'])
+    return metadata
+
+
+_metadata_listings = {}  # directory -> (listed_at, set of entry names)
+
+
+def find_metadata_path(base_name):
+    """Find {base_name}_metadata.json in the collections, falling back to METADATA_FALLBACK_DIR
+    
+    Each collection directory is listed once and the listing is reused, so
+    looking up another image costs no syscalls. A listing older than
+    METADATA_LISTING_TTL is refreshed when it misses, so newly converted images
+    are picked up.
+    """
+    filename = f"{base_name}_metadata.json"
+    now = time.monotonic()
+    for directory in METADATA_SEARCH_DIRS:
+        listed_at, names = _metadata_listings.get(directory, (None, None))
+        if names is None or (filename not in names and now - listed_at > METADATA_LISTING_TTL):
+            names = _list_dir_names(directory)
+            _metadata_listings[directory] = (now, names)
+        if filename in names:
+            return f"{directory}/{filename}"
+    return f"{METADATA_FALLBACK_DIR}/{filename}"
 
 
 def load_scalebar_metadata(image_name, metadata_base_path):
@@ -44,206 +169,484 @@ def load_scalebar_metadata(image_name, metadata_base_path):
 
     metadata_path = os.path.join(metadata_base_path, f"{image_name}_svs_scalebar_metadata.json")
     
-    if os.path.exists(metadata_path):
-        try:
-            with open(metadata_path, 'r') as f:
-                scalebar_data = json.load(f)
-                mpp_x = scalebar_data.get('mpp_x', None)  # microns per pixel
+    try:
+        with open(metadata_path, 'rb') as f:
+            scalebar_data = json_loads(f.read())
+            mpp_x = scalebar_data.get('mpp_x', None)  # microns per pixel
+            
+            if mpp_x is not None:
+                # Convert to float if it's a string
+                try:
+                    mpp_x_float = float(mpp_x)
+                except (ValueError, TypeError) as e:
+                    logger.error(f"mpp_x value '{mpp_x}' is not a valid number: {e}")
+                    logger.info("Using default mm_per_pixel: 0.0004")
+                    return 0.0004
                 
-                if mpp_x is not None:
-                    # Convert to float if it's a string
-                    try:
-                        mpp_x_float = float(mpp_x)
-                    except (ValueError, TypeError) as e:
-                        logger.error(f"mpp_x value '{mpp_x}' is not a valid number: {e}")
-                        logger.info("Using default mm_per_pixel: 0.0004")
-                        return 0.0004
-                    
-                    # Convert from microns per pixel to mm per pixel
-                    # 1 micron = 0.001 mm
-                    mm_per_pixel = mpp_x_float * 0.001
-                    print(f"✓ Loaded scalebar metadata: mpp_x={mpp_x_float} µm/px → {mm_per_pixel} mm/px")
-                    logger.info(f"✓ Loaded scalebar metadata: mpp_x={mpp_x_float} µm/px → {mm_per_pixel} mm/px")
-                    return mm_per_pixel
-                else:
-                    logger.warning(f"⚠ mpp_x not found in {metadata_path}")
-        except Exception as e:
-            logger.error(f"Error loading scalebar metadata from {metadata_path}: {e}")
-    else:
+                # Convert from microns per pixel to mm per pixel
+                # 1 micron = 0.001 mm
+                mm_per_pixel = mpp_x_float * 0.001
+                logger.info("✓ Loaded scalebar metadata: mpp_x=%s µm/px → %s mm/px", mpp_x_float, mm_per_pixel)
+                return mm_per_pixel
+            else:
+                logger.warning(f"⚠ mpp_x not found in {metadata_path}")
+    except FileNotFoundError:
         logger.warning(f"⚠ Scalebar metadata file not found: {metadata_path}")
+    except Exception as e:
+        logger.error(f"Error loading scalebar metadata from {metadata_path}: {e}")
     
     # Default fallback: 0.0005 mm/px (0.5 µm/px = 40x magnification)
     logger.info("Using default mm_per_pixel: 0.0004")
     return 0.0004
 
 
+def _ensure_shared_directory(directory):
+    """Create directory if needed and make it rwx for everyone, chmod-ing only when required"""
+    try:
+        mode = os.stat(directory).st_mode
+    except FileNotFoundError:
+        os.makedirs(directory, mode=0o777)
+        logger.info(f"Created directory: {directory}")
+        mode = 0  # makedirs mode is masked by the umask, so always fix it up
+    
+    # Ensure permissions are set correctly
+    if mode & 0o777 != 0o777:
+        os.chmod(directory, 0o777)
+
+
+def _atomic_write(path, payload, mode=0o666):
+    """Write bytes to path via a temporary file and os.replace, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 def ensure_annotation_directories(image_name):
     """Ensure annotation directories exist with proper permissions for an image"""
-    base_dir = "/data/anno"
-    image_dir = os.path.join(base_dir, image_name)
-    live_dir = os.path.join(image_dir, "live_tracking")
-    saved_dir = os.path.join(image_dir, "saved_views")
+    base_dir = ANNOTATION_BASE_DIR
+    image_dir = f"{base_dir}/{image_name}"
+    live_dir = f"{image_dir}/live_tracking"
+    saved_dir = f"{image_dir}/saved_views"
     
     # Create directories if they don't exist
     for directory in [base_dir, image_dir, live_dir, saved_dir]:
-        if not os.path.exists(directory):
-            os.makedirs(directory, mode=0o777)
-            logger.info(f"Created directory: {directory}")
-        # Ensure permissions are set correctly
-        os.chmod(directory, 0o777)
+        _ensure_shared_directory(directory)
     
     return live_dir, saved_dir
 
 
-def save_annotation_json(filepath, data):
-    """Save annotation data to JSON file with proper permissions"""
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
-    os.chmod(filepath, 0o666)  # rw-rw-rw-
-    logger.info(f"Saved annotation: {filepath}")
+# Serialized annotations waiting for the background writer, by file path
+_pending_writes = {}
+_pending_cond = threading.Condition()
+_flush_lock = threading.Lock()
+_writer_thread = None
+
+
+def flush_annotation_writes():
+    """Write out any annotation files queued by background saves"""
+    # Held for the whole batch so a caller listing files afterwards sees them all
+    with _flush_lock:
+        with _pending_cond:
+            batch = list(_pending_writes.items())
+            _pending_writes.clear()
+        for filepath, payload in batch:
+            try:
+                _atomic_write(filepath, payload)
+            except Exception as e:
+                logger.error(f"Error writing annotation {filepath}: {e}")
+        if batch:
+            logger.debug("Flushed %d queued annotation file(s)", len(batch))
+
+
+def _annotation_writer():
+    """Background loop that flushes queued annotation saves in batches"""
+    while True:
+        with _pending_cond:
+            while not _pending_writes:
+                _pending_cond.wait()
+        time.sleep(ANNOTATION_WRITE_DELAY)
+        flush_annotation_writes()
+
+
+atexit.register(flush_annotation_writes)
+
+
+def save_annotation_json(filepath, data, background=False):
+    """Save annotation data to JSON file with proper permissions
+    
+    With background=True the write is queued and done shortly afterwards by a
+    writer thread; call flush_annotation_writes() before listing the directory.
+    """
+    global _writer_thread
+    # Serialize up front so the file is written with a single write() call,
+    # and so later changes to data cannot leak into a queued save
+    payload = json_dumps(data, indent=True)
+    
+    if not background:
+        _atomic_write(filepath, payload)  # rw-rw-rw-
+        logger.info("Saved annotation: %s", filepath)
+        return
+    
+    with _pending_cond:
+        _pending_writes[filepath] = payload
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_annotation_writer, name="annotation-writer", daemon=True)
+            _writer_thread.start()
+        _pending_cond.notify()
+    logger.debug("Queued annotation: %s", filepath)
+
+
+def load_annotation_raw_and_json(filepath):
+    """Load an annotation file as (raw bytes, parsed data), or (None, None) if missing"""
+    try:
+        # Whole-file read: unbuffered FileIO.readall sizes one bytes object from fstat,
+        # skipping the BufferedReader copy
+        with open(filepath, 'rb', buffering=0) as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None, None
+    return raw, json_loads(raw)
 
 
 def load_annotation_json(filepath):
     """Load annotation data from JSON file"""
-    if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    return None
+    return load_annotation_raw_and_json(filepath)[1]
 
 
-def get_next_live_tracking_number(live_dir):
-    """Get the next number for live tracking file"""
-    existing_files = glob.glob(os.path.join(live_dir, "*.json"))
-    if not existing_files:
-        return 0
+def encode_annotation_payload(annotation_json, raw=None):
+    """Serialize an annotation state for the viewer's annotation_data
     
-    numbers = []
-    for f in existing_files:
-        basename = os.path.basename(f)
-        try:
-            num = int(basename.replace('.json', ''))
-            numbers.append(num)
-        except ValueError:
-            continue
+    Flat polyline coordinates are packed into one base64 little-endian float32
+    blob ('coordinates_blob'); each packed annotation gets 'start'/'length' in
+    vertices instead of 'coordinates'. Other annotations are sent unchanged.
+    When nothing needs packing, raw (the file bytes annotation_json was parsed
+    from) is decoded and passed through instead of serializing the state again;
+    packed payloads never decode it.
+    """
+    packed = array('f')
+    annotations = []
+    for anno in annotation_json.get('annotations', []):
+        coords = anno.get('coordinates')
+        if anno.get('type') == 'polyline' and coords and not isinstance(coords[0][0], list):
+            anno = {key: value for key, value in anno.items() if key != 'coordinates'}
+            anno['start'] = len(packed) // 2
+            anno['length'] = len(coords)
+            packed.extend(chain.from_iterable(coords))
+        annotations.append(anno)
+    
+    if not packed:
+        if raw is not None:
+            return raw.decode('utf-8')
+        return json_dumps(annotation_json).decode('utf-8')
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    payload = dict(annotation_json, annotations=annotations,
+                   coordinates_blob=base64.b64encode(packed.tobytes()).decode('ascii'))
+    return json_dumps(payload).decode('utf-8')
+
+
+def decode_annotation_payload(annotation_json):
+    """Undo encode_annotation_payload in place (no-op for plain annotation states)"""
+    blob = annotation_json.pop('coordinates_blob', None)
+    if blob is None:
+        return annotation_json
     
-    return max(numbers) + 1 if numbers else 0
+    packed = array('f')
+    packed.frombytes(base64.b64decode(blob))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    for anno in annotation_json.get('annotations', []):
+        if 'start' in anno:
+            start = anno.pop('start') * 2
+            end = start + anno.pop('length') * 2
+            anno['coordinates'] = [[packed[i], packed[i + 1]] for i in range(start, end, 2)]
+    return annotation_json
 
 
-def cleanup_old_live_tracking(live_dir, max_files=3000):
-    """Remove oldest live tracking files if count exceeds max_files"""
-    existing_files = glob.glob(os.path.join(live_dir, "*.json"))
-    if len(existing_files) <= max_files:
+_NUMBERED_JSON_RE = re.compile(r'(\d+)\.json')
+
+
+@lru_cache(maxsize=SAVED_VIEW_CACHE_SIZE)
+def _load_saved_view(filepath, mtime_ns):
+    raw, annotation_json = load_annotation_raw_and_json(filepath)
+    if not annotation_json:
+        return None, None
+    return annotation_json, encode_annotation_payload(annotation_json, raw)
+
+
+def load_saved_view(filepath):
+    """Load a saved view and its viewer payload (encode_annotation_payload)
+
+    Results are cached by path and modification time, so stepping back and
+    forth through saved views does not re-read or re-encode unchanged files.
+    The returned dict is shared with the cache and must not be modified.
+    """
+    try:
+        mtime_ns = os.stat(filepath).st_mtime_ns
+    except FileNotFoundError:
+        return None, None
+    return _load_saved_view(filepath, mtime_ns)
+
+
+def clear_saved_view_cache():
+    """Drop every cached saved view (e.g. when switching to another image)"""
+    _load_saved_view.cache_clear()
+
+
+def _numbered_entries(directory):
+    """Yield (number, path) for every NNNNN.json file in directory"""
+    match = _NUMBERED_JSON_RE.fullmatch
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                m = match(entry.name)
+                if m:
+                    yield int(m.group(1)), entry.path
+    except FileNotFoundError:
         return
+
+
+def get_live_tracking_numbers(live_dir):
+    """Get the sorted numbers of all live tracking files"""
+    flush_annotation_writes()  # queued saves must count, or their numbers would be reused
+    numbers = [num for num, _ in _numbered_entries(live_dir)]
+    numbers.sort()
+    return numbers
+
+
+def get_next_live_tracking_number(live_dir):
+    """Get the next number for live tracking file"""
+    numbers = get_live_tracking_numbers(live_dir)
+    return numbers[-1] + 1 if numbers else 0
+
+
+def cleanup_old_live_tracking(live_dir, max_files=3000):
+    """Remove oldest live tracking files if count exceeds max_files
     
-    # Sort by number (filename)
-    files_with_nums = []
-    for f in existing_files:
-        basename = os.path.basename(f)
-        try:
-            num = int(basename.replace('.json', ''))
-            files_with_nums.append((num, f))
-        except ValueError:
-            continue
-    
-    files_with_nums.sort(key=lambda x: x[0])
+    Returns the numbers of the removed files (empty if nothing was removed).
+    """
+    files_with_nums = list(_numbered_entries(live_dir))
+    if len(files_with_nums) <= max_files:
+        return []
     
-    # Remove oldest files
+    # Remove oldest files - usually only a handful, so select them without a full sort
     num_to_remove = len(files_with_nums) - max_files
-    for i in range(num_to_remove):
-        os.remove(files_with_nums[i][1])
-        logger.info(f"Removed old live tracking file: {files_with_nums[i][1]}")
+    oldest = heapq.nsmallest(num_to_remove, files_with_nums, key=itemgetter(0))
+    for num, path in oldest:
+        os.unlink(path)
+    logger.info("Removed %d old live tracking file(s) from %s (up to #%05d)",
+                len(oldest), live_dir, oldest[-1][0])
+    return [num for num, _ in oldest]
+
+
+def remove_live_tracking_files(live_dir, numbers):
+    """Remove the given live tracking files by number, without listing live_dir"""
+    removed = 0
+    for num in numbers:
+        try:
+            os.unlink(os.path.join(live_dir, f"{num:05d}.json"))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        logger.info("Removed %d old live tracking file(s) from %s", removed, live_dir)
+    return removed
 
 
-def get_saved_views_list(saved_dir):
-    """Get list of saved view files sorted by number"""
-    existing_files = glob.glob(os.path.join(saved_dir, "*.json"))
+def save_numbered_annotation_json(directory, first_num, data):
+    """Save annotation data as the first free NNNNN.json in directory, from first_num up
     
-    files_with_nums = []
-    for f in existing_files:
-        basename = os.path.basename(f)
-        try:
-            num = int(basename.replace('.json', ''))
-            files_with_nums.append((num, f))
-        except ValueError:
-            continue
+    The file is published with os.link from a complete temporary file. The link
+    fails if the name is already taken, so sessions saving into the same
+    directory at once never overwrite each other.
     
-    files_with_nums.sort(key=lambda x: x[0])
+    Returns:
+        tuple: (number, filepath) of the file written
+    """
+    payload = json_dumps(data, indent=True)
+    tmp_path = os.path.join(directory, f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp_path, 0o666)  # rw-rw-rw-
+        num = first_num
+        while True:
+            filepath = os.path.join(directory, f"{num:05d}.json")
+            try:
+                os.link(tmp_path, filepath)
+                break
+            except FileExistsError:
+                num += 1
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    logger.info("Saved annotation: %s", filepath)
+    return num, filepath
+
+
+def get_saved_views_list(saved_dir, ordered=True):
+    """Get list of saved view files, sorted by number unless ordered=False"""
+    files_with_nums = list(_numbered_entries(saved_dir))
+    if ordered:
+        files_with_nums.sort(key=itemgetter(0))
     return files_with_nums
 
 
 def load_image_mapping():
     """Load the JSON mapping file"""
-    json_path = '/data/tiles_directory_list.json'
+    json_path = IMAGE_MAPPING_FILE
     try:
-        with open(json_path, 'r') as f:
-            return json.load(f)
+        with open(json_path, 'rb') as f:
+            return json_loads(f.read())
     except Exception as e:
         logger.error(f"Error loading tiles directory mapping: {e}")
         return []
 
 
+def iter_image_mapping():
+    """Yield the entries of the JSON mapping file, streaming it when it is large"""
+    json_path = IMAGE_MAPPING_FILE
+    try:
+        size = os.path.getsize(json_path)
+    except OSError:
+        size = 0
+    
+    if ijson is None or size <= IMAGE_MAPPING_STREAM_THRESHOLD:
+        yield from load_image_mapping()
+        return
+    
+    try:
+        with open(json_path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+    except Exception as e:
+        logger.error(f"Error streaming tiles directory mapping: {e}")
+
+
+def _list_dir_names(directory):
+    """Return the set of entry names in directory (empty if it cannot be listed)"""
+    try:
+        with os.scandir(directory) as it:
+            return {entry.name for entry in it}
+    except OSError:
+        return set()
+
+
+def _load_json_or_empty(path):
+    """Load a JSON file, returning {} if it is missing or unreadable"""
+    try:
+        return load_json_file(path)
+    except Exception:
+        return {}
+
+
+# Last get_available_images result, valid while the mapping file's mtime is unchanged
+_images_cache = {'mtime': None, 'result': None}
+
+
 def get_available_images():
-    """Get list of available DZI images from JSON mapping"""
-    image_mapping = load_image_mapping()
+    """Get list of available DZI images from JSON mapping
     
-    if not image_mapping:
-        logger.warning("No image mapping loaded, falling back to directory scan")
-        return get_available_images_from_dir()
+    The result is cached per process and rebuilt when the mapping file
+    changes (touch it to pick up newly converted images).
+    """
+    try:
+        mapping_mtime = os.stat(IMAGE_MAPPING_FILE).st_mtime_ns
+    except OSError:
+        mapping_mtime = None
+    
+    if mapping_mtime is not None and _images_cache['mtime'] == mapping_mtime:
+        return list(_images_cache['result'])
     
+    images = _build_available_images()
+    if mapping_mtime is not None:
+        _images_cache['mtime'] = mapping_mtime
+        _images_cache['result'] = images
+    return list(images)
+
+
+def _build_available_images():
+    """Scan the JSON mapping and build the image list for get_available_images"""
     images = []
-    for entry in image_mapping:
+    parent_listings = {}
+    metadata_to_read = []  # (index into images, metadata path) for files that exist
+    mapping_loaded = False
+    for entry in iter_image_mapping():
+        mapping_loaded = True
         svs_file = entry.get('svs_file', '')
         tiles_dir = entry.get('tiles_directory', '')
         collection = entry.get('collection_name', '')
         entry_num = entry.get('entry_number', 0)
         
         # Extract base name without .svs extension
-        base_name = svs_file.replace('.svs', '')
+        base_name = svs_file.removesuffix('.svs')
         
         # Map host paths to container paths
-        if '/BRACS/' in tiles_dir:
-            container_tiles_dir = tiles_dir.replace('/local/data/magicscan/dzi_ink_datasets/HnE/BRACS/', '/data/dzi_datasets/BRACS/')
-        elif '/TCGA-BRCA/' in tiles_dir:
-            container_tiles_dir = tiles_dir.replace('/local/data/magicscan/dzi_ink_datasets/HnE/TCGA-BRCA/', '/data/dzi_datasets/TCGA/')
-        elif '/BACH/' in tiles_dir:
-            container_tiles_dir = tiles_dir.replace('/local/data/magicscan/dzi_ink_datasets/HnE/BACH/', '/data/dzi_datasets/BACH/')
+        for host_prefix, container_prefix in TILES_PATH_PREFIXES:
+            if tiles_dir.startswith(host_prefix):
+                container_tiles_dir = container_prefix + tiles_dir[len(host_prefix):]
+                break
         else:
             container_tiles_dir = tiles_dir
         
         # tiles_directory is the _files folder, parent has .dzi file
-        dzi_parent = os.path.dirname(container_tiles_dir)
+        dzi_parent, _, tiles_name = container_tiles_dir.rpartition('/')
         #print(f"0008_DZI parent directory: {dzi_parent}") # Debugging line
-        dzi_file = os.path.join(dzi_parent, base_name + '.dzi')
+        dzi_file = f"{dzi_parent}/{base_name}.dzi"
         #print(f"0009_DZI file path: {dzi_file}") # Debugging line
         
-        if os.path.exists(container_tiles_dir):
-            # Look for metadata file
-            metadata_path = os.path.join(dzi_parent, f"{base_name}_metadata.json")
-            metadata = {}
-            if os.path.exists(metadata_path):
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                except:
-                    pass
+        # Many images share a parent directory: list each one once instead of
+        # stat-ing the tiles folder and metadata file of every entry
+        parent_names = parent_listings.get(dzi_parent)
+        if parent_names is None:
+            parent_names = parent_listings[dzi_parent] = _list_dir_names(dzi_parent)
+        
+        if tiles_name in parent_names:
+            # Look for metadata file (read below, in parallel)
+            metadata_name = f"{base_name}_metadata.json"
+            metadata_path = f"{dzi_parent}/{metadata_name}"
+            if metadata_name in parent_names:
+                metadata_to_read.append((len(images), metadata_path))
             
+            short_name = base_name if len(base_name) <= 50 else base_name[:50] + '...'
             images.append({
                 'name': base_name,
-                'display_name': f"[{entry_num}] {base_name[:50]}..." if len(base_name) > 50 else f"[{entry_num}] {base_name}",
+                'display_name': f"[{entry_num}] {short_name}",
                 'svs_path': f"/data/{svs_file}",
                 'dzi_path': dzi_file,
                 'tiles_directory': container_tiles_dir,
                 'metadata_path': metadata_path,
                 'collection': collection,
                 'entry_number': entry_num,
-                'dimensions': metadata.get('original_dimensions', {}),
-                'aspect_ratio': metadata.get('aspect_ratio', 0)
+                'dimensions': {},
+                'aspect_ratio': 0
             })
         else:
-            logger.debug(f"Tiles not found: {container_tiles_dir}")
+            logger.debug("Tiles not found: %s", container_tiles_dir)
     
-    logger.info(f"Loaded {len(images)} images from JSON mapping")
-    return sorted(images, key=lambda x: x.get('entry_number', 0))
+    if not mapping_loaded:
+        logger.warning("No image mapping loaded, falling back to directory scan")
+        return get_available_images_from_dir()
+    
+    # Metadata files are small and latency-bound (network mounts), so overlap the reads
+    with ThreadPoolExecutor(max_workers=METADATA_READ_WORKERS) as executor:
+        all_metadata = executor.map(_load_json_or_empty, [path for _, path in metadata_to_read])
+        for (index, _), metadata in zip(metadata_to_read, all_metadata):
+            images[index]['dimensions'] = metadata.get('original_dimensions', {})
+            images[index]['aspect_ratio'] = metadata.get('aspect_ratio', 0)
+    
+    logger.info("Loaded %d images from JSON mapping", len(images))
+    return sorted(images, key=itemgetter('entry_number'))
 
 
 def get_available_images_from_dir():
@@ -255,17 +658,18 @@ def get_available_images_from_dir():
     images = []
     for file in os.listdir(dzi_dir):
         if file.endswith('.dzi'):
-            base_name = file.replace('.dzi', '')
+            base_name = file.removesuffix('.dzi')
             svs_path = f"/data/{base_name}.svs"
             metadata_path = f"{dzi_dir}/{base_name}_metadata.json"
             
             metadata = {}
-            if os.path.exists(metadata_path):
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                except Exception as e:
-                    logger.error(f"Error loading metadata: {e}")
+            try:
+                with open(metadata_path, 'rb') as f:
+                    metadata = json_loads(f.read())
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error loading metadata: {e}")
             
             images.append({
                 'name': base_name,
@@ -280,91 +684,213 @@ def get_available_images_from_dir():
     return sorted(images, key=lambda x: x['name'])
 
 
+# Last ISO timestamp handed out by _iso_now, as [epoch seconds, string]
+_last_iso = [0.0, ""]
+
+
+def _iso_now():
+    """Current local time in ISO format, recomputed at most once per second"""
+    t = time.time()
+    if t - _last_iso[0] >= 1.0:
+        _last_iso[0] = t
+        _last_iso[1] = datetime.fromtimestamp(t).isoformat()
+    return _last_iso[1]
+
+
 def ensure_ink_status_directory():
     """Ensure ink status directory exists with proper permissions"""
-    ink_status_dir = "/data/ink_status"
-    if not os.path.exists(ink_status_dir):
-        os.makedirs(ink_status_dir, mode=0o777)
-        logger.info(f"Created ink status directory: {ink_status_dir}")
-    os.chmod(ink_status_dir, 0o777)
+    ink_status_dir = INK_STATUS_DIR
+    _ensure_shared_directory(ink_status_dir)
     return ink_status_dir
 
 
+# In-memory copy of ink_status.json, refreshed only when the file changes on disk.
+# The done/ink_found totals are kept alongside so get_status_counts is O(1).
+_ink_statuses = None
+_ink_statuses_mtime = None
+_ink_status_counts = [0, 0]  # [done, ink_found]
+_status_counts_cache = [None, (0, 0)]  # [read_at (monotonic), (done, ink_found)]
+
+
+def _recount_ink_statuses():
+    """Recompute the cached done/ink_found totals from the in-memory statuses"""
+    done_count = 0
+    ink_found_count = 0
+    # Single pass over the values; counters stay in locals until the end
+    for status in _ink_statuses.values():
+        if status.get('done'):
+            done_count += 1
+        if status.get('ink_found'):
+            ink_found_count += 1
+    _ink_status_counts[0] = done_count
+    _ink_status_counts[1] = ink_found_count
+
+
+def _get_ink_statuses(status_file):
+    """Return the authoritative status dict, re-reading only after an external edit"""
+    global _ink_statuses, _ink_statuses_mtime
+    try:
+        st = os.stat(status_file)
+        mtime = st.st_mtime_ns
+    except FileNotFoundError:
+        st = None
+        mtime = None
+    
+    if _ink_statuses is None or mtime != _ink_statuses_mtime:
+        _ink_statuses = {}
+        # A missing file, or one too small to hold more than "{}", has no statuses
+        if st is not None and st.st_size > 2:
+            try:
+                with open(status_file, 'rb') as f:
+                    _ink_statuses = json_loads(f.read())
+            except Exception as e:
+                logger.error(f"Error loading existing ink status: {e}")
+        _ink_statuses_mtime = mtime
+        _recount_ink_statuses()
+    return _ink_statuses
+
+
+def _remember_ink_statuses_mtime(status_file):
+    """Record the mtime of our own write so it is not mistaken for an external edit"""
+    global _ink_statuses_mtime
+    _ink_statuses_mtime = os.stat(status_file).st_mtime_ns
+
+
+@contextmanager
+def _ink_status_lock():
+    """Hold an exclusive flock() on INK_STATUS_LOCK_FILE, shared by all processes and threads"""
+    fd = os.open(INK_STATUS_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # Releases the lock
+
+
+def _redis_ink_statuses_ready(locked=False):
+    """Make sure the Redis status hashes exist, seeding them from the JSON file if needed
+    
+    Seeding happens under the ink status lock (pass locked=True if it is
+    already held), so it cannot interleave with a save.
+    """
+    if not cache.client:
+        return False
+    if cache.exists(INK_STATUS_REDIS_KEY, INK_STATUS_COUNTS_REDIS_KEY) == 2:
+        return True
+    if not locked:
+        with _ink_status_lock():
+            return _redis_ink_statuses_ready(locked=True)
+    
+    # First use, or the keys were evicted (allkeys-lru): rebuild both from the file at once
+    all_statuses = _get_ink_statuses(INK_STATUS_FILE)
+    done_count, ink_found_count = _ink_status_counts
+    seeded = cache.hreplace_many({
+        INK_STATUS_REDIS_KEY: dict(all_statuses, **{INK_STATUS_SENTINEL_FIELD: True}),
+        INK_STATUS_COUNTS_REDIS_KEY: {'done': done_count, 'ink_found': ink_found_count},
+    })
+    if seeded:
+        logger.info("Seeded Redis ink status from %s (%s images)", INK_STATUS_FILE, len(all_statuses))
+    return seeded
+
+
 def load_ink_status(image_name):
-    """Load ink status for an image from consolidated JSON file"""
-    ink_status_dir = ensure_ink_status_directory()
-    status_file = os.path.join(ink_status_dir, "ink_status.json")
+    """Load ink status for an image from Redis, or the consolidated JSON file"""
+    ensure_ink_status_directory()
     
-    # Load all statuses
-    all_statuses = {}
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r') as f:
-                all_statuses = json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading ink status file: {e}")
+    if _redis_ink_statuses_ready():
+        status = cache.hget(INK_STATUS_REDIS_KEY, image_name)
+        if status is not None:
+            return status
+        return {
+            'done': False,
+            'ink_found': False,
+            'last_updated': _iso_now()
+        }
+    
+    # Served from the in-memory statuses; the file is only re-parsed if it changed
+    all_statuses = _get_ink_statuses(INK_STATUS_FILE)
     
     # Return status for this image or default
     if image_name in all_statuses:
-        return all_statuses[image_name]
+        return dict(all_statuses[image_name])
     
     return {
         'done': False,
         'ink_found': False,
-        'last_updated': datetime.now().isoformat()
+        'last_updated': _iso_now()
     }
 
 
 def save_ink_status(image_name, done=False, ink_found=False):
     """Save ink status for an image to consolidated JSON file with proper permissions"""
-    ink_status_dir = ensure_ink_status_directory()
-    status_file = os.path.join(ink_status_dir, "ink_status.json")
+    global _ink_statuses
+    ensure_ink_status_directory()
+    status_file = INK_STATUS_FILE
     
-    # Load existing statuses
-    all_statuses = {}
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r') as f:
-                all_statuses = json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading existing ink status: {e}")
-    
-    # Update status for this image
-    all_statuses[image_name] = {
+    status = {
         'done': done,
         'ink_found': ink_found,
-        'last_updated': datetime.now().isoformat()
+        'last_updated': _iso_now()
     }
     
-    try:
-        with open(status_file, 'w') as f:
-            json.dump(all_statuses, f, indent=2)
-        os.chmod(status_file, 0o666)  # rw-rw-rw-
-        logger.info(f"✓ Saved ink status for {image_name}: done={done}, ink_found={ink_found}")
-        return all_statuses[image_name]
-    except Exception as e:
-        logger.error(f"Error saving ink status: {e}")
-        return None
+    # Every process writes the file by read-modify-write, so saves are serialized
+    # across processes; otherwise one could drop another's status from the file
+    with _ink_status_lock():
+        # Redis is the shared copy: this image's field and the totals are updated
+        # together by one script, so concurrent sessions cannot both count a change
+        if _redis_ink_statuses_ready(locked=True):
+            cache.hset_counted(INK_STATUS_REDIS_KEY, image_name,
+                               dict(status, done=bool(done), ink_found=bool(ink_found)),
+                               INK_STATUS_COUNTS_REDIS_KEY, ('done', 'ink_found'))
+        
+        # Existing statuses (kept in memory, only re-parsed if the file changed)
+        all_statuses = _get_ink_statuses(status_file)
+        previous = all_statuses.get(image_name, {})
+        
+        # Update status for this image
+        all_statuses[image_name] = status
+        
+        # Adjust the cached totals by the difference for this image only
+        _ink_status_counts[0] += bool(done) - bool(previous.get('done', False))
+        _ink_status_counts[1] += bool(ink_found) - bool(previous.get('ink_found', False))
+        
+        # Totals changed with this save; the next get_status_counts re-reads them
+        _status_counts_cache[0] = None
+        
+        try:
+            # Replace the file in one step so other sessions never read a torn document
+            _atomic_write(status_file, json_dumps(all_statuses, indent=True))  # rw-rw-rw-
+            _remember_ink_statuses_mtime(status_file)
+            logger.info("✓ Saved ink status for %s: done=%s, ink_found=%s", image_name, done, ink_found)
+            return all_statuses[image_name]
+        except Exception as e:
+            # Force a re-read next time so memory does not drift from disk
+            _ink_statuses = None
+            logger.error(f"Error saving ink status: {e}")
+            return None
 
 
 def get_status_counts():
-    """Get counts of done and ink_found images from consolidated status file"""
-    ink_status_dir = ensure_ink_status_directory()
-    status_file = os.path.join(ink_status_dir, "ink_status.json")
+    """Get counts of done and ink_found images from Redis, or the consolidated status file
     
-    done_count = 0
-    ink_found_count = 0
+    Results are reused for STATUS_COUNTS_TTL seconds, so opening the app or
+    refreshing the header does not hit Redis or stat the status file each time.
+    """
+    now = time.monotonic()
+    read_at, counts = _status_counts_cache
+    if read_at is not None and now - read_at < STATUS_COUNTS_TTL:
+        return counts
     
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r') as f:
-                all_statuses = json.load(f)
-                for image_name, status in all_statuses.items():
-                    if status.get('done', False):
-                        done_count += 1
-                    if status.get('ink_found', False):
-                        ink_found_count += 1
-        except Exception as e:
-            logger.error(f"Error reading status counts: {e}")
+    ensure_ink_status_directory()
+    
+    if _redis_ink_statuses_ready():
+        redis_counts = cache.hgetall_int(INK_STATUS_COUNTS_REDIS_KEY)
+        counts = (redis_counts.get('done', 0), redis_counts.get('ink_found', 0))
+    else:
+        # Totals are maintained with the in-memory statuses; this only re-parses
+        # the file if it changed on disk since we last read or wrote it
+        _get_ink_statuses(INK_STATUS_FILE)
+        counts = tuple(_ink_status_counts)
     
-    return done_count, ink_found_count
+    _status_counts_cache[:] = [now, counts]
+    return counts
@@ -2,6 +2,13 @@ import openslide
 import json
 import os
 import glob
+from contextlib import closing
+from multiprocessing import Pool, cpu_count
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Base directory where your .svs subdirectories live
 SVS_DIR = "/local/data/magicscan/HnE/TCGA-BRCA/tissue_slides/primary_tumor"
@@ -11,71 +18,80 @@ OUT_DIR = "/local/data/magicscan/dzi_ink_datasets/HnE/TCGA-BRCA/tissue_slides/pr
 
 os.makedirs(OUT_DIR, exist_ok=True)
 
-def read_svs_metadata(svs_path):
-    slide = openslide.OpenSlide(svs_path)
-
-    meta = {
-        "filename": os.path.basename(svs_path),
-        "full_path": svs_path,
-        "dimensions": {
-            "width": slide.dimensions[0],
-            "height": slide.dimensions[1],
-        },
-        "level_count": slide.level_count,
-        "level_dimensions": [
-            {"width": w, "height": h} for (w, h) in slide.level_dimensions
-        ],
-        "level_downsamples": list(slide.level_downsamples),
-        "associated_images": list(slide.associated_images.keys()),
-        # Convenience fields:
-        "mpp_x": slide.properties.get(openslide.PROPERTY_NAME_MPP_X),
-        "mpp_y": slide.properties.get(openslide.PROPERTY_NAME_MPP_Y),
-        "objective_power": slide.properties.get(openslide.PROPERTY_NAME_OBJECTIVE_POWER),
-        "vendor": slide.properties.get(openslide.PROPERTY_NAME_VENDOR),
-    }
-
-    slide.close()
-    return meta
+# Slides read in parallel; opening a slide is mostly waiting on (network) disk
+READ_WORKERS = min(16, cpu_count())
 
-def main():
-    found_any = False
+def read_svs_metadata(svs_path):
+    # Header/property reads only; associated_images is a lazy mapping, so listing
+    # its keys does not decode the label/macro images
+    with closing(openslide.OpenSlide(svs_path)) as slide:
+        meta = {
+            "filename": os.path.basename(svs_path),
+            "full_path": svs_path,
+            "dimensions": {
+                "width": slide.dimensions[0],
+                "height": slide.dimensions[1],
+            },
+            "level_count": slide.level_count,
+            "level_dimensions": [
+                {"width": w, "height": h} for (w, h) in slide.level_dimensions
+            ],
+            "level_downsamples": list(slide.level_downsamples),
+            "associated_images": list(slide.associated_images.keys()),
+            # Convenience fields:
+            "mpp_x": slide.properties.get(openslide.PROPERTY_NAME_MPP_X),
+            "mpp_y": slide.properties.get(openslide.PROPERTY_NAME_MPP_Y),
+            "objective_power": slide.properties.get(openslide.PROPERTY_NAME_OBJECTIVE_POWER),
+            "vendor": slide.properties.get(openslide.PROPERTY_NAME_VENDOR),
+        }
 
-    # Walk through all subdirectories of SVS_DIR
-    for root, dirs, files in os.walk(SVS_DIR):
-        # Collect .svs files in this directory
-        svs_files = [f for f in files if f.lower().endswith(".svs")]
-        if not svs_files:
-            continue  # nothing to do in this folder
+    return meta
 
-        found_any = True
+def _iter_svs(root):
+    """Yield the paths of all .svs files under root"""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_svs(entry.path)
+            elif entry.name.lower().endswith(".svs"):
+                yield entry.path
+
+def _write_metadata(meta, out_path):
+    """Write one metadata JSON file (indented, like json.dump(indent=2))"""
+    if orjson is not None:
+        with open(out_path, "wb") as f:
+            f.write(orjson.dumps(meta, option=orjson.OPT_INDENT_2))
+    else:
+        with open(out_path, "w") as f:
+            json.dump(meta, f, indent=2)
 
-        # Compute relative path from SVS_DIR to current folder
-        rel_dir = os.path.relpath(root, SVS_DIR)
+def main():
+    svs_paths = list(_iter_svs(SVS_DIR))
+    if not svs_paths:
+        print(f"No .svs files found under {SVS_DIR}")
+        return
 
-        # Mirror that structure under OUT_DIR
-        out_dir_for_root = os.path.join(OUT_DIR, rel_dir)
-        os.makedirs(out_dir_for_root, exist_ok=True)
+    # Read slides in worker processes; the JSON files are written here
+    with Pool(READ_WORKERS) as pool:
+        for meta in pool.imap_unordered(read_svs_metadata, svs_paths, chunksize=8):
+            svs_path = meta["full_path"]
 
-        for svs_file in svs_files:
-            svs_path = os.path.join(root, svs_file)
-            base = os.path.splitext(svs_file)[0]
+            # Mirror the structure of SVS_DIR under OUT_DIR
+            rel_dir = os.path.relpath(os.path.dirname(svs_path), SVS_DIR)
+            out_dir_for_root = os.path.join(OUT_DIR, rel_dir)
+            os.makedirs(out_dir_for_root, exist_ok=True)
 
+            base = os.path.splitext(meta["filename"])[0]
             out_path = os.path.join(
                 out_dir_for_root,
                 f"{base}_svs_scalebar_metadata.json"
             )
 
-            print(f"Reading metadata for {svs_path} -> {out_path}")
-            meta = read_svs_metadata(svs_path)
-
-            with open(out_path, "w") as f:
-                json.dump(meta, f, indent=2)
+            print(f"Read metadata for {svs_path} -> {out_path}")
+            _write_metadata(meta, out_path)
 
             # Optional permissions
             os.chmod(out_path, 0o666)
 
-    if not found_any:
-        print(f"No .svs files found under {SVS_DIR}")
-
 if __name__ == "__main__":
     main()
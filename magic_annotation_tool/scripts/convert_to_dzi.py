@@ -1,50 +1,297 @@
 import openslide
 from openslide import deepzoom
+from PIL import Image
 import os
+import shutil
 import logging
 import json
 import sys
-from multiprocessing import Pool, cpu_count
+import argparse
+import multiprocessing
+from multiprocessing import cpu_count
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from functools import partial
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyvips  # Optional: libvips dzsave is much faster than the OpenSlide tile pool
+except ImportError:
+    pyvips = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def save_tile_worker(args):
-    """Worker function to save a single tile"""
-    level, col, row, tiles_dir, svs_path, tile_size, overlap = args
+# Tile format name -> (file extension, PIL save options, libvips dzsave suffix). PNG is
+# lossless but slow to encode and large for photographic slides; JPEG/WebP are much
+# smaller and faster. The viewer reads the extension from the metadata's "tile_format"
+TILE_FORMATS = {
+    'png': ('png', {'format': 'PNG', 'compress_level': 1}, '.png[compression=1]'),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 85, 'subsampling': 2}, '.jpg[Q=85]'),
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 4}, '.webp[Q=80]'),
+}
+
+# Strips submitted ahead per worker, so workers never wait on the parent for their next task
+TILE_PREFETCH_PER_WORKER = 4
+
+# Tiles per strip; one read_region covers this many tiles of a row, which also
+# bounds the strip a worker holds in memory on the largest levels
+TILE_STRIP_COLS = 32
+
+# Decoded slide regions each worker keeps for reuse, bounded by their RGB size in bytes
+REGION_CACHE_BYTES = 64 * 1024 * 1024
+
+# Present in a _files directory whose existing tiles are all complete, so a rerun may keep
+# them: the pool writes each tile under a temporary name first, while dzsave writes final
+# names directly and only marks its output once it has finished
+RESUMABLE_MARKER = ".resumable"
+
+# Slides are converted from several threads at once, so tile workers must not be forked
+# from this process while another thread holds libopenslide/libvips locks
+POOL_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+# Progress is logged each time this many more percent of the tasks are done
+PROGRESS_STEP_PCT = 5
+
+# Per-process slide state, set up once by _init_worker
+_worker_slide = None
+_worker_dz = None
+_worker_bg = None
+_worker_level_dirs = None  # "<tiles_dir>/<level>/" per DZI level
+_worker_level_tiles = None
+_worker_tile_format = None
+_worker_force = False
+_worker_regions = None  # (l0_location, slide_level, size) -> composited strip, least recently used first
+_worker_region_bytes = 0
+
+def _init_worker(svs_path, tiles_dir, tile_size, overlap, tile_format, force):
+    """Executor initializer: open the slide and build the DeepZoom generator once per worker"""
+    global _worker_slide, _worker_dz, _worker_bg, _worker_level_dirs, _worker_tile_format, _worker_force
+    global _worker_level_tiles, _worker_regions
+    _worker_slide = openslide.OpenSlide(svs_path)
+    _worker_dz = deepzoom.DeepZoomGenerator(_worker_slide, tile_size=tile_size, overlap=overlap, limit_bounds=True)
+    # Same background DeepZoomGenerator.get_tile puts behind transparent areas
+    _worker_bg = '#' + _worker_slide.properties.get(openslide.PROPERTY_NAME_BACKGROUND_COLOR, 'ffffff')
+    _worker_level_dirs = [os.path.join(tiles_dir, str(level)) + os.sep for level in range(_worker_dz.level_count)]
+    _worker_level_tiles = _worker_dz.level_tiles
+    _worker_tile_format = TILE_FORMATS[tile_format]
+    _worker_force = force
+    _worker_regions = OrderedDict()
+
+def _read_strip(l0_location, slide_level, size, cache=False):
+    """
+    Read a slide region composited onto the slide background
+    
+    With cache=True the region goes through the worker's region LRU. Only the
+    single-strip levels use it: they all cover the whole image at the smallest
+    slide level, so they read the very same region and it is decoded once.
+    Larger levels never request a region twice, so caching them would only
+    pin dead strips.
+    """
+    global _worker_region_bytes
+    key = (l0_location, slide_level, size)
+    if cache:
+        strip = _worker_regions.get(key)
+        if strip is not None:
+            _worker_regions.move_to_end(key)
+            return strip
+    
+    region = _worker_slide.read_region(l0_location, slide_level, size)
+    # Flatten the RGBA region straight into the RGB background, dropping alpha without another copy
+    strip = Image.new('RGB', region.size, _worker_bg)
+    strip.paste(region, None, region)
+    nbytes = size[0] * size[1] * 3
+    if cache and nbytes <= REGION_CACHE_BYTES:
+        _worker_regions[key] = strip
+        _worker_region_bytes += nbytes
+        while _worker_region_bytes > REGION_CACHE_BYTES:
+            (_, _, (width, height)), _ = _worker_regions.popitem(last=False)
+            _worker_region_bytes -= width * height * 3
+    return strip
+
+def save_tile_worker(args, cache=False):
+    """
+    Worker function to save a strip of tiles from one row of a level
+    
+    The strip is read with a single read_region and cut into tiles, instead of
+    one read_region per tile. Tile geometry (region, slide level and output
+    size) comes from the DeepZoomGenerator, exactly as get_tile uses it.
+    Tiles that already exist are kept unless the conversion was forced; tiles
+    are written to a temporary name and renamed, so an existing tile is complete
+    (convert_svs_to_dzi only resumes directories carrying RESUMABLE_MARKER).
+    
+    cache is passed on to _read_strip.
+    
+    Returns:
+        int: Number of tiles saved or already present
+    """
+    level, row, col_start, col_end = args
+    extension, save_options, _ = _worker_tile_format
+    level_dir = _worker_level_dirs[level]
+    name_suffix = f"_{row}.{extension}"
     try:
-        # Each worker opens its own slide instance
-        slide = openslide.OpenSlide(svs_path)
-        dz = deepzoom.DeepZoomGenerator(slide, tile_size=tile_size, overlap=overlap, limit_bounds=True)
+        tile_paths = [f"{level_dir}{col}{name_suffix}" for col in range(col_start, col_end)]
+        missing = [True] * len(tile_paths) if _worker_force else [not os.path.exists(path) for path in tile_paths]
+        if not any(missing):
+            return len(tile_paths)
+        
+        tiles = [_worker_dz._get_tile_info(level, (col, row)) for col in range(col_start, col_end)]
+        (l0_start, slide_level, _), _ = tiles[0]
+        (l0_last, _, l_size_last), _ = tiles[-1]
+        downsample = _worker_slide.level_downsamples[slide_level]
         
-        # Generate and save tile
-        tile = dz.get_tile(level, (col, row))
-        tile_path = os.path.join(tiles_dir, str(level), f"{col}_{row}.png")
-        tile.save(tile_path, format='PNG')
+        # Tiles of a row share their vertical extent, so the strip spans the first to the last tile
+        def strip_x(l0_location):
+            return round((l0_location[0] - l0_start[0]) / downsample)
+        strip = _read_strip(l0_start, slide_level, (strip_x(l0_last) + l_size_last[0], l_size_last[1]), cache)
         
-        slide.close()
-        return True
+        for tile_path, is_missing, ((l0_location, _, l_size), z_size) in zip(tile_paths, missing, tiles):
+            if not is_missing:
+                continue
+            x = strip_x(l0_location)
+            tile = strip.crop((x, 0, x + l_size[0], l_size[1]))
+            if tile.size != z_size:
+                tile.thumbnail(z_size, Image.LANCZOS)
+            tile.save(tile_path + '.tmp', **save_options)
+            os.replace(tile_path + '.tmp', tile_path)
+        
+        return col_end - col_start
+    except Exception as e:
+        logger.error(f"Failed to generate tiles {level}/{col_start}-{col_end - 1}_{row}: {e}")
+        return 0
+
+def save_single_tile_levels(levels):
+    """
+    Worker function to save the levels that are a single tile each
+    
+    Only the finest of them is read from the slide; every coarser level is
+    downsampled from the level above it, instead of resampling the whole
+    slide level again for each one.
+    
+    Returns:
+        int: Number of tiles saved or already present
+    """
+    extension, save_options, _ = _worker_tile_format
+    tile_paths = [f"{_worker_level_dirs[level]}0_0.{extension}" for level in levels]
+    if not _worker_force and all(os.path.exists(path) for path in tile_paths):
+        return len(levels)
+    try:
+        image = None
+        for level, tile_path in zip(reversed(levels), reversed(tile_paths)):
+            (l0_location, slide_level, l_size), z_size = _worker_dz._get_tile_info(level, (0, 0))
+            if image is None:
+                image = _read_strip(l0_location, slide_level, l_size, cache=True)
+            if image.size != z_size:
+                image = image.resize(z_size, Image.LANCZOS)
+            if _worker_force or not os.path.exists(tile_path):
+                image.save(tile_path + '.tmp', **save_options)
+                os.replace(tile_path + '.tmp', tile_path)
+        return len(levels)
     except Exception as e:
-        logger.error(f"Failed to generate tile {level}/{col}_{row}: {e}")
-        return False
+        logger.error(f"Failed to generate single-tile levels {levels[0]}-{levels[-1]}: {e}")
+        return 0
+
+def save_tiles_task(strips):
+    """Worker function to save a task's strips; returns the number of tiles saved or already present"""
+    global _worker_region_bytes
+    single_tile_levels = [strip[0] for strip in strips if _worker_level_tiles[strip[0]] == (1, 1)]
+    saved = save_single_tile_levels(single_tile_levels) if single_tile_levels else 0
+    saved += sum(
+        save_tile_worker(strip, cache=_is_single_strip(*_worker_level_tiles[strip[0]]))
+        for strip in strips if _worker_level_tiles[strip[0]] != (1, 1)
+    )
+    # The single-strip levels are all in this one task, so nothing will ask for their regions again
+    _worker_regions.clear()
+    _worker_region_bytes = 0
+    return saved
+
+def _is_single_strip(cols, rows):
+    return rows == 1 and cols <= TILE_STRIP_COLS
+
+def _iter_tile_tasks(level_tiles):
+    """
+    Yield tasks, each a tuple of (level, row, col_start, col_end) strips of up to
+    TILE_STRIP_COLS tiles, level by level from the smallest
+    
+    The leading levels that fit in a single strip form one task, so a single
+    worker reads the slide region they share and reuses it from its region LRU.
+    """
+    small_levels = []
+    for level, (cols, rows) in enumerate(level_tiles):
+        if _is_single_strip(cols, rows):
+            small_levels.append((level, 0, 0, cols))
+            continue
+        if small_levels:
+            yield tuple(small_levels)
+            small_levels = []
+        for row in range(rows):
+            for col_start in range(0, cols, TILE_STRIP_COLS):
+                yield ((level, row, col_start, min(col_start + TILE_STRIP_COLS, cols)),)
+    if small_levels:
+        yield tuple(small_levels)
 
-def convert_svs_to_dzi(svs_path, output_dir, tile_size=256, overlap=1, num_workers=None):
+def _iter_task_results(executor, tasks, window):
+    """Submit tasks keeping at most `window` in flight; yield each result as it completes"""
+    pending = set()
+    for task in tasks:
+        pending.add(executor.submit(save_tiles_task, task))
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in as_completed(pending):
+        yield future.result()
+    
+def save_tiles_vips(slide, svs_path, output_dir, base_name, tile_size, overlap, tile_format):
+    """
+    Write the .dzi descriptor and all tiles with libvips dzsave
+    
+    autocrop matches DeepZoomGenerator's limit_bounds, and the slide is
+    flattened onto its background color as get_tile does.
+    """
+    background = slide.properties.get(openslide.PROPERTY_NAME_BACKGROUND_COLOR, 'ffffff')
+    image = pyvips.Image.openslideload(svs_path, autocrop=True, access='sequential')
+    image = image.flatten(background=[int(background[i:i + 2], 16) for i in (0, 2, 4)])
+    image.dzsave(
+        os.path.join(output_dir, base_name),
+        layout='dz',
+        tile_size=tile_size,
+        overlap=overlap,
+        depth='onepixel',
+        suffix=TILE_FORMATS[tile_format][2]
+    )
+    
+def convert_svs_to_dzi(svs_path, output_dir, tile_size=256, overlap=1, num_workers=None, tile_format='png',
+                       force=False):
     """
     Convert SVS file to DZI format with parallel tile generation
     
+    Uses libvips dzsave when pyvips is installed, otherwise a process pool
+    reading the slide through OpenSlide. The process pool also resumes an
+    earlier, incomplete conversion: tiles that already exist are kept. Only
+    output marked with RESUMABLE_MARKER is resumed; anything else, such as an
+    interrupted dzsave run that may have left truncated tiles, is removed and
+    regenerated.
+    
     Args:
         svs_path: Path to SVS file
         output_dir: Directory to save DZI files
         tile_size: Size of each tile (default 256)
         overlap: Overlap between tiles (default 1)
         num_workers: Number of parallel workers (default: CPU count)
+        tile_format: Tile image format, a key of TILE_FORMATS (default 'png')
+        force: Regenerate tiles that already exist (default False)
     """
     if num_workers is None:
         num_workers = cpu_count()
     
     logger.info(f"Converting {svs_path} to DZI format...")
-    logger.info(f"  Using {num_workers} parallel workers")
     
     # Open slide
     slide = openslide.OpenSlide(svs_path)
@@ -62,62 +309,97 @@ def convert_svs_to_dzi(svs_path, output_dir, tile_size=256, overlap=1, num_worke
         overlap=overlap,
         limit_bounds=True
     )
+    # Read the generator's pyramid layout once
+    level_tiles = dz.level_tiles
+    level_count = dz.level_count
+    dzi_xml = dz.get_dzi(TILE_FORMATS[tile_format][0])
     
     logger.info(f"Slide dimensions: {slide.dimensions}")
     logger.info(f"Levels: {slide.level_count}")
-    logger.info(f"DZI levels: {dz.level_count}")
+    logger.info(f"DZI levels: {level_count}")
     
     # Save DZI descriptor (XML file) and tiles
     dzi_file = os.path.join(output_dir, f"{base_name}.dzi")
     tiles_dir = os.path.join(output_dir, f"{base_name}_files")
     
-    logger.info(f"Saving DZI tiles to {output_dir}...")
-    
-    # Create DZI XML descriptor file
-    with open(dzi_file, 'w') as f:
-        f.write(dz.get_dzi('png'))
-    
-    logger.info(f"✓ DZI descriptor saved: {dzi_file}")
-    
-    # Generate all tiles in parallel
-    os.makedirs(tiles_dir, exist_ok=True)
-    
-    # Create level directories first
-    for level in range(dz.level_count):
-        level_dir = os.path.join(tiles_dir, str(level))
-        os.makedirs(level_dir, exist_ok=True)
-    
-    # Build list of all tiles to generate
-    tile_coords = []
+    # Count tiles and tasks per level; the tasks themselves are generated lazily
     total_tiles = 0
-    for level in range(dz.level_count):
-        cols, rows = dz.level_tiles[level]
-        level_tiles = cols * rows
-        total_tiles += level_tiles
-        logger.info(f"  Level {level}: {cols}x{rows} = {level_tiles} tiles")
-        
-        for col in range(cols):
-            for row in range(rows):
-                tile_coords.append((level, col, row, tiles_dir, svs_path, tile_size, overlap))
+    total_tasks = 0
+    for level, (cols, rows) in enumerate(level_tiles):
+        total_tiles += cols * rows
+        if _is_single_strip(cols, rows):
+            # Consecutive single-strip levels share one task
+            if level == 0 or not _is_single_strip(*level_tiles[level - 1]):
+                total_tasks += 1
+        else:
+            total_tasks += rows * -(-cols // TILE_STRIP_COLS)
+        logger.info(f"  Level {level}: {cols}x{rows} = {cols * rows} tiles")
     
-    logger.info(f"  Generating {total_tiles} tiles in parallel...")
+    logger.info(f"Saving DZI tiles to {output_dir}...")
     
-    # Generate tiles using multiprocessing
-    with Pool(processes=num_workers) as pool:
-        results = []
-        for i, result in enumerate(pool.imap_unordered(save_tile_worker, tile_coords), 1):
-            results.append(result)
-            if i % 100 == 0 or i == total_tiles:
-                logger.info(f"    Progress: {i}/{total_tiles} tiles ({i*100//total_tiles}%)")
+    # Unmarked output (e.g. an interrupted dzsave run) may hold truncated tiles: start over
+    marker_file = os.path.join(tiles_dir, RESUMABLE_MARKER)
+    if os.path.isdir(tiles_dir) and not os.path.exists(marker_file):
+        logger.info(f"  {tiles_dir} is not marked resumable, removing it and regenerating all tiles")
+        shutil.rmtree(tiles_dir)
+    
+    # dzsave always writes the whole pyramid, so existing output is resumed with the pool
+    if pyvips is not None and (force or not os.path.isdir(tiles_dir)):
+        logger.info(f"  Generating {total_tiles} tiles with libvips dzsave...")
+        # dzsave needs a fresh directory: it may refuse an existing one, or leave stale
+        # tiles (e.g. .png next to new .jpg) among its own
+        if os.path.isdir(tiles_dir):
+            shutil.rmtree(tiles_dir)
+        save_tiles_vips(slide, svs_path, output_dir, base_name, tile_size, overlap, tile_format)
+        open(marker_file, 'w').close()
+        success_count = total_tiles
+    else:
+        # Create DZI XML descriptor file
+        with open(dzi_file, 'w') as f:
+            f.write(dzi_xml)
+        
+        logger.info(f"✓ DZI descriptor saved: {dzi_file}")
+        
+        # Generate all tiles in parallel
+        os.makedirs(tiles_dir, exist_ok=True)
+        
+        # Create level directories first
+        for level in range(level_count):
+            level_dir = os.path.join(tiles_dir, str(level))
+            os.makedirs(level_dir, exist_ok=True)
+        
+        # Every tile the pool leaves behind is complete, even if this run is interrupted
+        open(marker_file, 'w').close()
+        
+        logger.info(f"  Using {num_workers} parallel workers")
+        logger.info(f"  Generating {total_tiles} tiles in parallel...")
+        
+        # Generate tiles using multiprocessing; each worker opens the slide once
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=POOL_CONTEXT, initializer=_init_worker,
+                                 initargs=(svs_path, tiles_dir, tile_size, overlap, tile_format, force)) as executor:
+            success_count = 0
+            next_pct = PROGRESS_STEP_PCT
+            tasks = _iter_tile_tasks(level_tiles)
+            results = _iter_task_results(executor, tasks, num_workers * TILE_PREFETCH_PER_WORKER)
+            for i, saved in enumerate(results, 1):
+                success_count += saved
+                pct = i * 100 // total_tasks
+                if pct >= next_pct:
+                    logger.info(f"    Progress: {i}/{total_tasks} tasks ({pct}%)")
+                    next_pct = pct - pct % PROGRESS_STEP_PCT + PROGRESS_STEP_PCT
     
-    success_count = sum(results)
     logger.info(f"  Successfully generated {success_count}/{total_tiles} tiles")
     
     # Calculate optimal viewing parameters and save metadata
     metadata = calculate_viewer_metadata(slide, dz, base_name)
+    metadata["tile_format"] = TILE_FORMATS[tile_format][0]
     metadata_file = os.path.join(output_dir, f"{base_name}_metadata.json")
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    if orjson is not None:
+        with open(metadata_file, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    else:
+        with open(metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
     
     logger.info(f"✓ Metadata saved: {metadata_file}")
     logger.info(f"✓ DZI conversion complete!")
@@ -206,6 +488,15 @@ def calculate_viewer_metadata(slide, dz, base_name):
     return metadata
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert SVS slides to DZI tiles")
+    parser.add_argument('--format', choices=sorted(TILE_FORMATS), default='png',
+                        help="Tile image format (default: png)")
+    parser.add_argument('--force', action='store_true',
+                        help="Regenerate tiles that already exist instead of resuming")
+    parser.add_argument('--slides', type=int, default=2,
+                        help="Slides converted concurrently, sharing the CPUs between them (default: 2)")
+    args = parser.parse_args()
+    
     # Detect if running inside container or locally
     if os.path.exists("/data/test_data"):
         # Running inside container
@@ -234,21 +525,32 @@ if __name__ == "__main__":
     
     logger.info(f"Found {len(svs_files)} SVS file(s) to convert")
     
-    # Convert each SVS file
-    for svs_file in svs_files:
-        svs_path = os.path.join(svs_dir, svs_file)
-        logger.info(f"\n{'='*60}")
-        logger.info(f"Processing: {svs_file}")
-        logger.info(f"{'='*60}")
+    # Convert several SVS files at once so one slide's serial steps (opening, metadata)
+    # overlap another's tile generation; each slide gets its share of the CPUs for its
+    # tile workers, which run in their own processes
+    concurrent_slides = max(1, min(args.slides, len(svs_files)))
+    workers_per_slide = max(1, cpu_count() // concurrent_slides)
+    logger.info(f"Converting {concurrent_slides} slide(s) at a time with {workers_per_slide} workers each")
+    
+    with ThreadPoolExecutor(max_workers=concurrent_slides) as slide_executor:
+        futures = {}
+        for svs_file in svs_files:
+            svs_path = os.path.join(svs_dir, svs_file)
+            logger.info(f"Queued: {svs_file}")
+            futures[slide_executor.submit(
+                convert_svs_to_dzi, svs_path, output_dir, num_workers=workers_per_slide,
+                tile_format=args.format, force=args.force
+            )] = svs_file
         
-        try:
-            convert_svs_to_dzi(svs_path, output_dir)
-            logger.info(f"✓ Successfully converted {svs_file}")
-        except Exception as e:
-            logger.error(f"✗ Failed to convert {svs_file}: {e}")
-            import traceback
-            traceback.print_exc()
-            continue
+        for future in as_completed(futures):
+            svs_file = futures[future]
+            try:
+                future.result()
+                logger.info(f"✓ Successfully converted {svs_file}")
+            except Exception as e:
+                logger.error(f"✗ Failed to convert {svs_file}: {e}")
+                import traceback
+                traceback.print_exc()
     
     logger.info(f"\n{'='*60}")
     logger.info(f"All conversions complete!")
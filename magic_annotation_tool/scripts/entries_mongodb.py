@@ -1,6 +1,11 @@
 from pymongo import MongoClient
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # --- Config ---
 MONGO_URL = MONGO_URL
 DATABASE_NAME = DATABASE_NAME
@@ -8,50 +13,72 @@ DATABASE_NAME = DATABASE_NAME
 client = MongoClient(MONGO_URL)
 db = client[DATABASE_NAME]
 
-entries = []
-entry_number = 1
-
 collection = db["BACH-Challenge"]
 
-# Only docs that have tiles_directory
-cursor = collection.find(
-    {"tiles_directory": {"$exists": True}},
-    {"tiles_directory": 1, "svs_file": 1, "filename": 1}  # projection
-)
+# --- Split into JSON files of CHUNK_SIZE entries each (without changing entry_number) ---
+CHUNK_SIZE = 30
+NUM_JSONS = 1
 
-for doc in cursor:
-    # Try a few common field names for the svs file
-    svs_file = (
-        doc.get("svs_file") or
-        doc.get("filename") or
-        doc.get("svs") or
-        doc.get("slide_name") or
-        "UNKNOWN"
-    )
-
-    entry = {
-        "entry_number": entry_number,
-        "svs_file": svs_file,
-        "tiles_directory": doc.get("tiles_directory"),
-        "collection_name": collection.name
-    }
 
-    entries.append(entry)
-    entry_number += 1
+def first_non_empty(fields, default):
+    """Aggregation expression for the first field that is neither missing, null nor "" (like an `or` chain)"""
+    expr = default
+    for field in reversed(fields):
+        expr = {"$cond": [{"$ne": [{"$ifNull": [f"${field}", ""]}, ""]}, f"${field}", expr]}
+    return expr
 
-print(f"Total entries collected: {len(entries)}")
 
-# --- Split into 4 JSON files, 247 entries each (without changing entry_number) ---
-CHUNK_SIZE = 30
-NUM_JSONS = 1
+# Only docs that have tiles_directory. The svs file name falls back through a few
+# common field names on the server, so only the two output fields come over the wire
+cursor = collection.aggregate(
+    [
+        {"$match": {"tiles_directory": {"$exists": True}}},
+        {"$project": {
+            "_id": 0,
+            "svs_file": first_non_empty(["svs_file", "filename", "svs", "slide_name"], "UNKNOWN"),
+            "tiles_directory": 1,
+        }},
+    ],
+    batchSize=1000
+)
 
-for i in range(NUM_JSONS):
-    start = i * CHUNK_SIZE
-    end = start + CHUNK_SIZE
-    chunk = entries[start:end]
 
+def save_chunk(i, chunk):
     output_json = f"tiles_directory_list_bach_{i+1}.json"
-    with open(output_json, "w") as f:
-        json.dump(chunk, f, indent=2)
+    if orjson is not None:
+        with open(output_json, "wb") as f:
+            f.write(orjson.dumps(chunk, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_json, "w") as f:
+            json.dump(chunk, f, indent=2)
 
     print(f"Saved {len(chunk)} entries to {output_json}")
+
+
+# Stream the cursor: each chunk is written as soon as it is full, and
+# entries past the last file are only counted
+chunk = []
+chunks_saved = 0
+entry_number = 0
+for entry_number, doc in enumerate(cursor, 1):
+    if chunks_saved == NUM_JSONS:
+        continue
+
+    chunk.append({
+        "entry_number": entry_number,
+        "svs_file": doc["svs_file"],
+        "tiles_directory": doc.get("tiles_directory"),
+        "collection_name": collection.name
+    })
+    if len(chunk) == CHUNK_SIZE:
+        save_chunk(chunks_saved, chunk)
+        chunks_saved += 1
+        chunk = []
+
+print(f"Total entries collected: {entry_number}")
+
+# Remaining (partially filled or empty) files
+while chunks_saved < NUM_JSONS:
+    save_chunk(chunks_saved, chunk)
+    chunks_saved += 1
+    chunk = []
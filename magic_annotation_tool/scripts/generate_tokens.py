@@ -4,45 +4,48 @@ Generate secure tokens for users.
 Run this script to generate new tokens for your .env file.
 """
 
+import os
+import sys
 import uuid
 
 
 def generate_user_tokens(num_users=12):
     """Generate unique UUID tokens for users"""
-    tokens = []
+    # One urandom call for all users; each 16-byte slice becomes a UUID4 (same format as uuid.uuid4())
+    raw = os.urandom(16 * num_users)
+    tokens = [
+        f"user{i + 1}:{uuid.UUID(bytes=raw[i * 16:(i + 1) * 16], version=4)}"
+        for i in range(num_users)
+    ]
     
-    print(f"Generating {num_users} secure tokens...\n")
-    
-    for i in range(1, num_users + 1):
-        token = str(uuid.uuid4())
-        tokens.append(f"user{i}:{token}")
+    # The report is assembled first and written once, rather than one print per line
+    rule = "=" * 80
+    lines = [f"Generating {num_users} secure tokens...", ""]
     
     # Output for .env file
-    print("=" * 80)
-    print("Add this line to your .env file:")
-    print("=" * 80)
-    env_line = f"USER_TOKENS={','.join(tokens)}"
-    print(env_line)
-    print()
+    lines += [rule, "Add this line to your .env file:", rule]
+    lines.append(f"USER_TOKENS={','.join(tokens)}")
+    lines.append("")
     
     # Output individual user access URLs
-    print("=" * 80)
-    print("User Access URLs:")
-    print("=" * 80)
-    
+    lines += [rule, "User Access URLs:", rule]
     for token_pair in tokens:
         user_id, token = token_pair.split(':', 1)
-        print(f"{user_id:8s}: http://localhost:10333/annotation_tool?token={token}")
-    
-    print("\n" + "=" * 80)
-    print("IMPORTANT SECURITY NOTES:")
-    print("=" * 80)
-    print("1. Keep these tokens secure - treat them like passwords")
-    print("2. Share each URL only with its designated user")
-    print("3. Tokens are cryptographically random (UUID4)")
-    print("4. To revoke access, remove the token from USER_TOKENS and restart")
-    print("5. Sessions expire after SESSION_TIMEOUT (default: 3600 seconds)")
-    print("=" * 80)
+        lines.append(f"{user_id:8s}: http://localhost:10333/annotation_tool?token={token}")
+    
+    lines += [
+        "",
+        rule,
+        "IMPORTANT SECURITY NOTES:",
+        rule,
+        "1. Keep these tokens secure - treat them like passwords",
+        "2. Share each URL only with its designated user",
+        "3. Tokens are cryptographically random (UUID4)",
+        "4. To revoke access, remove the token from USER_TOKENS and restart",
+        "5. Sessions expire after SESSION_TIMEOUT (default: 3600 seconds)",
+        rule,
+    ]
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":